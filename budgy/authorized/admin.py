@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.models import Group
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from .models import OutboundEmail
 
 
 class UserAdmin(BaseUserAdmin):
@@ -36,3 +37,21 @@ admin.site.unregister(Group)
 
 # Register your custom one
 admin.site.register(User, UserAdmin)
+
+
+# คิว email: ดูแถวที่ dead แล้วแก้ / ตั้งกลับเป็น pending เพื่อส่งใหม่
+# (แถวแบบ template สร้างเนื้อหาใหม่ตอนส่ง) ไม่แสดงเนื้อหา email ใน admin
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "to_email",
+        "subject",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("to_email", "subject")
+    exclude = ("text_content", "context")
+    readonly_fields = ("user", "template", "created_at", "sent_at", "last_error")
@@ -0,0 +1,89 @@
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from authorized.utils import email
+from authorized.utils.mailersend_stub import StubMailerSend
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark sending N messages to a local MailerSend stand-in: a new "
+        "connection per message (the old requests.post), the pooled client one "
+        "message per request, and the pooled client through the bulk endpoint. "
+        "The stand-in simulates provider latency and the TCP+TLS handshake cost "
+        "of every new connection. Nothing is sent to the real provider."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=20,
+            help="Simulated provider time per request (default: 20).",
+        )
+        parser.add_argument(
+            "--handshake-ms",
+            type=float,
+            default=30,
+            help="Simulated cost of opening a connection (default: 30).",
+        )
+        parser.add_argument("--bulk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        messages = [
+            (f"user{i}@example.com", "Reset Your Password", "Click the link ...")
+            for i in range(options["messages"])
+        ]
+        self.stdout.write(
+            f"{len(messages)} messages, {options['latency_ms']:g} ms per request, "
+            f"{options['handshake_ms']:g} ms per new connection"
+        )
+
+        def new_connection_each(client):
+            for message in messages:
+                response = requests.post(
+                    settings.MAILERSEND_API_URL,
+                    json=client.message(*message),
+                    timeout=email.TIMEOUT,
+                )
+                response.raise_for_status()
+
+        def pooled(client):
+            for message in messages:
+                client.send(*message)
+
+        def bulk(client):
+            client.send_many(messages)
+
+        for label, run in (
+            ("new connection per message", new_connection_each),
+            ("pooled session", pooled),
+            (f"pooled + bulk ({options['bulk_size']}/request)", bulk),
+        ):
+            self.measure(label, run, options)
+
+    def measure(self, label, run, options):
+        stub = StubMailerSend(
+            latency=options["latency_ms"] / 1000,
+            handshake=options["handshake_ms"] / 1000,
+        )
+        with stub, override_settings(
+            MAILERSEND_API_KEY="bench",
+            MAILERSEND_API_URL=stub.url,
+            MAILERSEND_BULK_API_URL=stub.bulk_url,
+            MAILERSEND_BULK_SIZE=options["bulk_size"],
+        ):
+            with email.MailerSendClient() as client:
+                started = time.perf_counter()
+                run(client)
+                elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{label:<36} {elapsed:7.2f} s  {stub.messages() / elapsed:8.1f} msg/s  "
+            f"{len(stub.requests):4d} requests  {stub.connections:4d} connections"
+        )
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from authorized.utils import email, mail_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued outbound email (OutboundEmail) in batches through the "
+        "MailerSend bulk endpoint over pooled keep-alive connections, then "
+        "confirms each message from the bulk status, retrying failures with "
+        "backoff. Runs until interrupted; use --once to drain the queue and exit "
+        "(e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=mail_queue.DEFAULT_BATCH_SIZE,
+            help=f"Messages claimed per batch (default: {mail_queue.DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to sleep when nothing is due (default: 5).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no queued message is due instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        totals = {"sent": 0, "submitted": 0, "retried": 0, "dead": 0}
+        client = email.get_client()
+        try:
+            while True:
+                counts = mail_queue.deliver(client, options["batch_size"])
+                for key, count in counts.items():
+                    totals[key] += count
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"sent={counts['sent']} submitted={counts['submitted']} "
+                        f"retried={counts['retried']} dead={counts['dead']}"
+                    )
+                    continue
+                if options["once"]:
+                    break
+                # worker รันยาว: อย่าถือ DB connection ที่หมดอายุ/หลุดไว้
+                close_old_connections()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {totals['sent']}, retrying {totals['retried']}, "
+                f"dead {totals['dead']}."
+            )
+        )
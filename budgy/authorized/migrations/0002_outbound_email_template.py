@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_finished_bodies(apps, schema_editor):
+    # แถวที่ส่งแล้ว / dead ไม่ต้องเก็บเนื้อหา (เช่นลิงก์ reset password ที่ยังใช้ได้)
+    OutboundEmail = apps.get_model('authorized', 'OutboundEmail')
+    OutboundEmail.objects.filter(status__in=('sent', 'dead')).update(text_content='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authorized', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='context',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='template',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='user',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='text_content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(clear_finished_bodies, migrations.RunPython.noop),
+    ]
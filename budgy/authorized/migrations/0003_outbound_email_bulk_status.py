@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authorized', '0002_outbound_email_template'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='bulk_email_id',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('pending', 'Pending'),
+                    ('submitted', 'Submitted'),
+                    ('sent', 'Sent'),
+                    ('dead', 'Dead'),
+                ],
+                default='pending',
+                max_length=10,
+            ),
+        ),
+    ]
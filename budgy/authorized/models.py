@@ -1,3 +1,50 @@
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
+
+
+# Outbound Email Model
+# คิว email ที่รอส่งผ่าน MailerSend (ดู authorized/utils/mail_queue.py)
+# view แค่ enqueue แล้วตอบทันที worker (manage.py send_queued_email) เป็นคนส่ง
+class OutboundEmail(models.Model):
+    PENDING = "pending"
+    # bulk endpoint ตอบ 202 แล้ว (รับไว้ประมวลผล) รอผลต่อฉบับจาก bulk status
+    SUBMITTED = "submitted"
+    SENT = "sent"
+    DEAD = "dead"  # ส่งไม่สำเร็จจนหมดสิทธิ์ retry หรือ provider ปฏิเสธถาวร
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SUBMITTED, "Submitted"),
+        (SENT, "Sent"),
+        (DEAD, "Dead"),
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    # ว่างเมื่อส่งแล้ว / dead (ไม่เก็บเนื้อหาไว้หลังหมดหน้าที่)
+    text_content = models.TextField(blank=True)
+    # email ที่มีข้อมูลลับ (ลิงก์ reset password) ไม่เก็บเนื้อหาเลย:
+    # เก็บ user + template แล้ว worker สร้างเนื้อหาตอนส่ง (mail_queue.TEMPLATES)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
+    template = models.CharField(max_length=50, blank=True)
+    context = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # worker หยิบเฉพาะ pending ที่ถึงเวลาแล้ว (ใช้ทั้ง backoff และ lease ตอนกำลังส่ง)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    bulk_email_id = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbound_status_next_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email}: {self.subject} ({self.status})"
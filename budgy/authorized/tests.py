@@ -2,7 +2,7 @@ from django.test import TestCase
 
 # authorized/tests.py
 from django.test import TestCase, Client
-from django.urls import reverse
+from django.urls import resolve, reverse
 from django.contrib.auth.models import User
 from home.models import Account
 
@@ -10,6 +10,19 @@ from unittest.mock import patch
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
+from django.utils import timezone
+from django.test import override_settings
+from django.core.management import call_command
+from datetime import timedelta
+from io import StringIO
+import requests
+
+from authorized.models import OutboundEmail
+from authorized.urls import urlpatterns
+from authorized.utils import email, mail_queue
+from authorized.utils.mailersend_stub import StubMailerSend
+from home import metrics
+from home.tests import QueryBudgetMixin
 
 
 class AuthorizedViewsTests(TestCase):
@@ -137,10 +150,10 @@ class PasswordViewsTests(TestCase):
             username="testuser", email="test@example.com", password="123456"
         )
 
-    @patch("authorized.views.send_email")
+    @patch("authorized.utils.email.send_email")
     def test_forgot_password_success(self, mock_send_email):
         """
-        กรณีใส่ email ถูกต้อง → ส่งลิงก์ reset และ redirect ไป login
+        กรณีใส่ email ถูกต้อง → เข้าคิวลิงก์ reset และ redirect ไป login
         """
         response = self.client.post(
             reverse("forgot_password"),
@@ -151,8 +164,19 @@ class PasswordViewsTests(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, reverse("login"))
 
-        # มีการส่ง email
-        mock_send_email.assert_called_once()
+        # เข้าคิวไว้ให้ worker ส่ง ไม่ได้ส่งใน request
+        mock_send_email.assert_not_called()
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.to_email, "test@example.com")
+        self.assertEqual(queued.status, OutboundEmail.PENDING)
+        # ไม่เก็บลิงก์ reset ในตาราง: สร้างตอนส่ง
+        self.assertEqual(queued.text_content, "")
+        self.assertEqual((queued.user, queued.template), (self.user, "password_reset"))
+
+        link = mail_queue.render(queued).splitlines()[-1]
+        self.assertTrue(link.startswith("http://testserver/reset/"))
+        response = self.client.get(link.removeprefix("http://testserver"))
+        self.assertTemplateUsed(response, "authorized/reset_password.html")
 
     def test_forgot_password_email_not_found(self):
         """
@@ -225,3 +249,321 @@ class PasswordViewsTests(TestCase):
         # เช็คว่า login ผ่านจริง
         login_success = self.client.login(username="testuser", password="newpass123")
         self.assertTrue(login_success)
+
+
+@override_settings(
+    MAILERSEND_API_KEY="test-key",
+    EMAIL_MAX_ATTEMPTS=3,
+    EMAIL_RETRY_BASE_DELAY=30,
+    EMAIL_RETRY_MAX_DELAY=3600,
+    EMAIL_BULK_CHECK_DELAY=0,
+)
+class MailQueueTests(TestCase):
+    """
+    ทดสอบคิว email (authorized/utils/mail_queue.py) กับ MailerSend จำลอง
+    """
+
+    def _deliver(self, stub, batch_size=mail_queue.DEFAULT_BATCH_SIZE, bulk_size=500):
+        with override_settings(
+            MAILERSEND_API_URL=stub.url,
+            MAILERSEND_BULK_API_URL=stub.bulk_url,
+            MAILERSEND_BULK_SIZE=bulk_size,
+        ):
+            with email.MailerSendClient() as client:
+                return mail_queue.deliver(client, batch_size)
+
+    def _make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_sends_batch_in_bulk_requests_over_one_connection(self):
+        for i in range(5):
+            mail_queue.enqueue(f"user{i}@example.com", "Hello", f"Body {i}")
+
+        with StubMailerSend() as stub:
+            counts = self._deliver(stub, bulk_size=2)
+            # 202 = รับไว้เท่านั้น: sent หลังถามผลของ bulk แล้ว
+            self.assertEqual(counts, {"sent": 0, "submitted": 5, "retried": 0, "dead": 0})
+            self.assertFalse(OutboundEmail.objects.exclude(status="submitted").exists())
+            connections = stub.connections
+            counts = self._deliver(stub, bulk_size=2)
+
+        self.assertEqual(counts, {"sent": 5, "submitted": 0, "retried": 0, "dead": 0})
+        self.assertEqual(sorted(stub.status_checks), ["bulk-1", "bulk-2", "bulk-3"])
+        # 5 ฉบับ = bulk 3 ครั้ง (2 + 2 + 1) ผ่าน connection เดียว
+        self.assertEqual([len(r["json"]) for r in stub.requests], [2, 2, 1])
+        self.assertEqual({r["path"] for r in stub.requests}, {"/v1/bulk-email"})
+        self.assertEqual(connections, 1)
+        self.assertEqual(stub.requests[0]["authorization"], "Bearer test-key")
+        self.assertEqual(
+            stub.requests[0]["json"][0]["to"], [{"email": "user0@example.com"}]
+        )
+        self.assertFalse(
+            OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists()
+        )
+        self.assertFalse(OutboundEmail.objects.filter(sent_at=None).exists())
+
+    def test_sent_and_dead_messages_do_not_keep_bodies(self):
+        sent = mail_queue.enqueue("ok@example.com", "Hello", "secret link")
+        dead = mail_queue.enqueue("bad@example.com", "Hello", "secret link")
+        with StubMailerSend(statuses=[422, 202, 422]) as stub:
+            counts = self._deliver(stub)
+        self.assertEqual(counts, {"sent": 1, "submitted": 0, "retried": 0, "dead": 1})
+
+        self.assertEqual(stub.requests[1]["json"]["text"], "secret link")
+        for message in (sent, dead):
+            message.refresh_from_db()
+            self.assertEqual(message.text_content, "")
+
+    def test_template_is_rendered_when_sent(self):
+        user = User.objects.create_user(
+            username="resetme", email="reset@example.com", password="pw"
+        )
+        mail_queue.enqueue(
+            "reset@example.com",
+            "Reset Your Password",
+            user=user,
+            template="password_reset",
+            context={"base_url": "https://budgy.example/"},
+        )
+        with StubMailerSend() as stub:
+            self.assertEqual(self._deliver(stub)["submitted"], 1)
+            self.assertEqual(self._deliver(stub)["sent"], 1)
+
+        text = stub.requests[0]["json"][0]["text"]
+        self.assertIn("https://budgy.example/reset/", text)
+        token = text.rstrip("/").rsplit("/", 1)[-1]
+        self.assertTrue(default_token_generator.check_token(user, token))
+
+    def test_batch_size_limits_claim(self):
+        for i in range(3):
+            mail_queue.enqueue(f"user{i}@example.com", "Hello", "Body")
+        with StubMailerSend() as stub:
+            self.assertEqual(self._deliver(stub, batch_size=2)["submitted"], 2)
+            self.assertEqual(self._deliver(stub, batch_size=2)["submitted"], 1)
+            self.assertEqual(self._deliver(stub, batch_size=2)["submitted"], 0)
+
+    def test_server_error_retries_with_backoff_then_dead_letter(self):
+        message = mail_queue.enqueue("user@example.com", "Hello", "Body")
+
+        with StubMailerSend(statuses=[503, 502, 500]) as stub:
+            started = timezone.now()
+            self.assertEqual(self._deliver(stub)["retried"], 1)
+            message.refresh_from_db()
+            self.assertEqual(message.status, OutboundEmail.PENDING)
+            self.assertEqual(message.attempts, 1)
+            self.assertIn("503", message.last_error)
+            self.assertGreaterEqual(
+                message.next_attempt_at, started + timedelta(seconds=30)
+            )
+
+            # ยังไม่ถึงเวลา: ไม่ส่งซ้ำ
+            self.assertEqual(self._deliver(stub)["retried"], 0)
+
+            self._make_due()
+            started = timezone.now()
+            self.assertEqual(self._deliver(stub)["retried"], 1)
+            message.refresh_from_db()
+            self.assertGreaterEqual(
+                message.next_attempt_at, started + timedelta(seconds=60)
+            )
+
+            # ครั้งที่ 3 = EMAIL_MAX_ATTEMPTS
+            self._make_due()
+            self.assertEqual(self._deliver(stub)["dead"], 1)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundEmail.DEAD)
+        self.assertEqual(message.attempts, 3)
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_rejected_bulk_falls_back_to_single_sends(self):
+        rejected = mail_queue.enqueue("bad@example.com", "Hello", "Body")
+        throttled = mail_queue.enqueue("ok@example.com", "Hello", "Body")
+
+        # bulk: 422 ทั้งก้อน -> ส่งทีละฉบับ: ฉบับแรก 422 (dead), ฉบับสอง 429 (retry)
+        with StubMailerSend(statuses=[422, 422, 429]) as stub:
+            counts = self._deliver(stub)
+        self.assertEqual(
+            [r["path"] for r in stub.requests],
+            ["/v1/bulk-email", "/v1/email", "/v1/email"],
+        )
+
+        self.assertEqual(counts, {"sent": 0, "submitted": 0, "retried": 1, "dead": 1})
+        rejected.refresh_from_db()
+        throttled.refresh_from_db()
+        self.assertEqual(rejected.status, OutboundEmail.DEAD)
+        self.assertEqual(throttled.status, OutboundEmail.PENDING)
+
+    def test_bulk_failures_are_read_from_bulk_status(self):
+        for address in ("ok@example.com", "bad@example.com", "also-ok@example.com"):
+            mail_queue.enqueue(address, "Hello", "Body")
+
+        # bulk ตอบ 202 ทั้งก้อน แต่ผลของ bulk บอกว่าฉบับที่สองไม่ผ่าน validation
+        with StubMailerSend(rejected=["bad@example.com"], in_progress=1) as stub:
+            self.assertEqual(self._deliver(stub)["submitted"], 3)
+            # ยังประมวลผลไม่เสร็จ: ยังไม่ตัดสินฉบับไหน
+            self.assertFalse(any(self._deliver(stub).values()))
+            counts = self._deliver(stub)
+
+        self.assertEqual(counts, {"sent": 2, "submitted": 0, "retried": 0, "dead": 1})
+        self.assertEqual(stub.status_checks, ["bulk-1", "bulk-1"])
+        dead = OutboundEmail.objects.get(status=OutboundEmail.DEAD)
+        self.assertEqual(dead.to_email, "bad@example.com")
+        self.assertIn("message.1.to.0.email", dead.last_error)
+        self.assertEqual(
+            OutboundEmail.objects.filter(status=OutboundEmail.SENT).count(), 2
+        )
+
+    def test_unknown_bulk_goes_back_to_pending(self):
+        message = mail_queue.enqueue("user@example.com", "Hello", "Body")
+        with StubMailerSend() as stub:
+            self._deliver(stub)
+            stub.bulks.clear()
+            # ไม่รู้ผล: กลับเป็น pending แล้วถูกส่งใหม่ (EMAIL_BULK_CHECK_DELAY=0)
+            counts = self._deliver(stub)
+
+        self.assertEqual(counts, {"sent": 0, "submitted": 1, "retried": 1, "dead": 0})
+        message.refresh_from_db()
+        self.assertEqual((message.bulk_email_id, message.attempts), ("bulk-2", 2))
+        self.assertEqual(len(stub.requests), 2)
+
+    def test_unreachable_provider_retries(self):
+        mail_queue.enqueue("user@example.com", "Hello", "Body")
+        stub = StubMailerSend()
+        stub.server.server_close()  # ไม่มีใครฟังที่ port นี้แล้ว
+
+        self.assertEqual(self._deliver(stub)["retried"], 1)
+
+    def test_claimed_messages_are_leased(self):
+        mail_queue.enqueue("user@example.com", "Hello", "Body")
+        self.assertEqual(len(mail_queue.claim()), 1)
+        # worker อื่นหยิบซ้ำไม่ได้จนกว่า lease จะหมด
+        self.assertEqual(mail_queue.claim(), [])
+
+    def test_retry_delay_is_capped(self):
+        self.assertEqual(mail_queue.retry_delay(1), 30)
+        self.assertEqual(mail_queue.retry_delay(3), 120)
+        self.assertEqual(mail_queue.retry_delay(20), 3600)
+
+    def test_worker_command_drains_queue(self):
+        for i in range(3):
+            mail_queue.enqueue(f"user{i}@example.com", "Hello", "Body")
+        out = StringIO()
+        with StubMailerSend() as stub, override_settings(
+            MAILERSEND_BULK_API_URL=stub.bulk_url
+        ):
+            call_command("send_queued_email", "--once", "--batch-size", "2", stdout=out)
+
+        self.assertIn("Sent 3, retrying 0, dead 0.", out.getvalue())
+        self.assertEqual(stub.messages(), 3)
+
+    def test_client_reuses_connection_for_single_sends(self):
+        with StubMailerSend() as stub, override_settings(MAILERSEND_API_URL=stub.url):
+            with email.MailerSendClient() as client:
+                for i in range(3):
+                    client.send(f"user{i}@example.com", "Hello", "Body")
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual(stub.connections, 1)
+
+    def test_client_records_metrics(self):
+        def count(endpoint, result):
+            key = ("budgy_email_requests_total", (endpoint, result))
+            return metrics.REGISTRY.local_values().get(key, 0)
+
+        before = count("email", "ok"), count("email", "error"), count("bulk", "ok")
+        with StubMailerSend(statuses=[500]) as stub, override_settings(
+            MAILERSEND_API_URL=stub.url, MAILERSEND_BULK_API_URL=stub.bulk_url
+        ):
+            with email.MailerSendClient() as client:
+                with self.assertRaises(requests.HTTPError):
+                    client.send("user@example.com", "Hello", "Body")
+                client.send("user@example.com", "Hello", "Body")
+                client.send_many([("user@example.com", "Hello", "Body")])
+        after = count("email", "ok"), count("email", "error"), count("bulk", "ok")
+        self.assertEqual([b - a for a, b in zip(before, after)], [1, 1, 1])
+
+
+class AuthorizedQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    จำนวน query และเวลาสูงสุดของทุก URL ใน authorized/urls.py
+    (ดู home.tests.QueryBudgetMixin)
+    """
+
+    # (ชื่อ, method, path, data, จำนวน query, ms, status)
+    BUDGETS = [
+        ("login page", "get", "/login/", None, 0, 100, 200),
+        (
+            "login",
+            "post",
+            "/login/",
+            {"username": "testuser", "password": "testpass"},
+            9,
+            1000,
+            302,
+        ),
+        ("logout", "get", "/logout/", None, 0, 100, 302),
+        ("register page", "get", "/register/", None, 0, 100, 200),
+        (
+            "register",
+            "post",
+            "/register/",
+            {"Username": "newuser", "Password": "pw", "confirm_password": "pw",
+             "email": "new@example.com"},
+            8,
+            1000,
+            200,
+        ),
+        ("forgot password page", "get", "/forgot-password/", None, 0, 100, 200),
+        (
+            "forgot password",
+            "post",
+            "/forgot-password/",
+            {"email": "test@example.com"},
+            2,
+            100,
+            302,
+        ),
+        ("reset password page", "get", "/reset/{uid}/{token}/", None, 1, 100, 200),
+        (
+            "reset password",
+            "post",
+            "/reset/{uid}/{token}/",
+            {"password": "new-pass", "confirm": "new-pass"},
+            2,
+            1000,
+            302,
+        ),
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass", email="test@example.com"
+        )
+        Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="cash", balance=0.0
+        )
+        self.uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        self.token = default_token_generator.make_token(self.user)
+
+    def before_request(self):
+        # logout / login ในรอบก่อนเปลี่ยน session ของ client
+        self.client = Client()
+
+    def test_budgets(self):
+        for label, method, path, data, queries, max_ms, status in self.BUDGETS:
+            path = path.format(uid=self.uid, token=self.token)
+            with self.subTest(label):
+                self.assertBudget(
+                    label,
+                    lambda: getattr(self.client, method)(path, data),
+                    queries,
+                    max_ms,
+                    status,
+                )
+
+    def test_every_url_has_a_budget(self):
+        covered = {
+            resolve(path.format(uid=self.uid, token=self.token)).route
+            for _, _, path, _, _, _, _ in self.BUDGETS
+        }
+        self.assertEqual({str(url.pattern) for url in urlpatterns} - covered, set())
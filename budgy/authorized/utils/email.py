@@ -1,29 +1,128 @@
+"""
+MailerSend HTTP client
+
+ทุก request ผ่าน requests.Session เดียวของ process (get_client()) ที่ keep-alive
+และ pool connection ไว้ต่อ host: ส่งหลายฉบับติดกันไม่ต้อง TCP + TLS handshake ใหม่
+ทุกฉบับ (ขนาด pool ตั้งได้ด้วย MAILERSEND_POOL_SIZE)
+
+send_many() ส่งทีละหลายฉบับผ่าน bulk endpoint (MAILERSEND_BULK_API_URL)
+ครั้งละไม่เกิน MAILERSEND_BULK_SIZE ฉบับ MailerSend ตอบ 202 แค่ว่ารับ request ไว้แล้ว
+(ยังไม่ได้ validate / ส่งทีละฉบับ) ผลต่อฉบับดูได้จาก bulk_status(bulk_email_id)
+"""
+
+import threading
+import time
+
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from home import metrics
+
+TIMEOUT = 10
+FROM_NAME = "Budgy: Manage Your Finances"
+
+
+class MailerSendClient:
+    def __init__(self, pool_size=None, timeout=TIMEOUT):
+        self.pool_size = pool_size or settings.MAILERSEND_POOL_SIZE
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def message(to_email, subject, text_content):
+        """payload ของ email หนึ่งฉบับ (รูปแบบเดียวกันทั้ง /email และ /bulk-email)"""
+        return {
+            "from": {"email": settings.DEFAULT_FROM_EMAIL, "name": FROM_NAME},
+            "to": [{"email": to_email}],
+            "subject": subject,
+            "text": text_content,
+        }
+
+    def _post(self, url, payload, endpoint):
+        return self._request("post", url, endpoint, json=payload)
+
+    def _request(self, method, url, endpoint, **kwargs):
+        # อ่าน key / url ตอนส่ง (ไม่ผูกกับ settings ตอนสร้าง client)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                url,
+                **kwargs,
+                headers={"Authorization": f"Bearer {settings.MAILERSEND_API_KEY}"},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            metrics.EMAIL_REQUESTS.inc(endpoint, "error")
+            raise
+        finally:
+            metrics.EMAIL_LATENCY.observe(time.perf_counter() - started, endpoint)
+        metrics.EMAIL_REQUESTS.inc(endpoint, "ok")
+        return response
+
+    def send(self, to_email, subject, text_content):
+        self._post(
+            settings.MAILERSEND_API_URL,
+            self.message(to_email, subject, text_content),
+            "email",
+        )
+
+    def send_many(self, messages):
+        """
+        ส่ง [(to_email, subject, text_content), ...] ผ่าน bulk endpoint
+        แบ่งเป็นครั้งละ MAILERSEND_BULK_SIZE ฉบับ คืน bulk_email_id ของแต่ละครั้ง
+        error ของครั้งใดครั้งหนึ่ง raise ทันที (ครั้งก่อนหน้าส่งไปแล้ว)
+        """
+        size = settings.MAILERSEND_BULK_SIZE
+        bulk_ids = []
+        for start in range(0, len(messages), size):
+            chunk = [self.message(*message) for message in messages[start : start + size]]
+            response = self._post(settings.MAILERSEND_BULK_API_URL, chunk, "bulk")
+            bulk_ids.append(_json(response).get("bulk_email_id"))
+        return bulk_ids
+
+    def bulk_status(self, bulk_email_id):
+        """
+        ผลของ bulk request: dict "data" ของ GET /v1/bulk-email/{bulk_email_id}
+        (state, validation_errors, suppressed_recipients, ...)
+        """
+        url = f"{settings.MAILERSEND_BULK_API_URL.rstrip('/')}/{bulk_email_id}"
+        return _json(self._request("get", url, "bulk_status")).get("data") or {}
+
+
+def _json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return {}
+
+
+_client = None
+_client_lock = threading.Lock()
+
 
-MAILERSEND_API_URL = "https://api.mailersend.com/v1/email"
+def get_client():
+    """client (และ connection pool) เดียวของ process"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MailerSendClient()
+        return _client
 
 
 def send_email(to_email, subject, text_content):
-    headers = {
-        "Authorization": f"Bearer {settings.MAILERSEND_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    data = {
-        "from": {
-            "email": settings.DEFAULT_FROM_EMAIL,
-            "name": "Budgy: Manage Your Finances",
-        },
-        "to": [
-            {
-                "email": to_email,
-            }
-        ],
-        "subject": subject,
-        "text": text_content,
-    }
-
-    response = requests.post(MAILERSEND_API_URL, json=data, headers=headers, timeout=10)
-
-    response.raise_for_status()
+    get_client().send(to_email, subject, text_content)
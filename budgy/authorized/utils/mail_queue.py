@@ -0,0 +1,297 @@
+"""
+คิว email ขาออกแบบ durable (ตาราง OutboundEmail) แทนการส่งใน request
+
+view เรียก enqueue() แล้วตอบทันที worker (manage.py send_queued_email) เรียก
+deliver() เป็นรอบ ๆ: หยิบ pending ที่ถึงเวลาทีละ batch แล้วส่งผ่าน bulk endpoint
+ของ MailerSend ด้วย client ที่ pool connection ไว้ (authorized/utils/email.py)
+ถ้า bulk ถูกปฏิเสธถาวร (4xx) จะส่งทีละฉบับเพื่อแยกฉบับที่ผิดออก
+
+bulk ตอบ 202 แปลว่ารับ request ไว้เท่านั้น: แถวเป็น status="submitted" พร้อม
+bulk_email_id แล้ว deliver() รอบถัดไป (หลัง EMAIL_BULK_CHECK_DELAY วินาที) ถาม
+bulk status เมื่อ state เป็น completed ฉบับที่มี validation error หรือผู้รับถูก
+suppress เป็น dead ที่เหลือเป็น sent (ยังไม่ completed = ถามใหม่รอบหน้า)
+
+- claim() ขยับ next_attempt_at ของแถวที่หยิบไปเป็น "lease" worker อื่นจึงไม่หยิบซ้ำ
+  ถ้า worker ตายกลางทาง แถวจะกลับมาให้ส่งใหม่เมื่อ lease หมด
+  (PostgreSQL ใช้ SELECT ... FOR UPDATE SKIP LOCKED ให้หลาย worker หยิบพร้อมกันได้)
+- ส่งไม่สำเร็จ (network, 5xx, 408, 429) retry แบบ exponential backoff
+  ครบ EMAIL_MAX_ATTEMPTS หรือ provider ตอบ 4xx อื่น (ข้อมูลผิด ส่งซ้ำก็ไม่ผ่าน)
+  จะเป็น dead letter (status="dead") พร้อม last_error ให้ตรวจใน admin
+- เนื้อหาถูกล้างเมื่อส่งแล้วหรือ dead และ email ที่มีข้อมูลลับ (ลิงก์ reset password)
+  ไม่เก็บเนื้อหาเลย: enqueue ด้วย template + user แล้วสร้างเนื้อหาตอนส่ง (TEMPLATES)
+"""
+
+import json
+import re
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from ..models import OutboundEmail
+from . import email
+
+DEFAULT_BATCH_SIZE = 50
+# เวลาเผื่อนอกจาก timeout ของแต่ละ request ก่อน lease หมด (วินาที)
+LEASE_MARGIN = 60
+# status ที่ส่งซ้ำแล้วอาจผ่าน (นอกนั้นใน 4xx ถือว่าถาวร)
+RETRYABLE_STATUS = {408, 429}
+
+
+def enqueue(to_email, subject, text_content="", user=None, template="", context=None):
+    """
+    เพิ่ม email เข้าคิว (worker จะส่งให้)
+    template: ชื่อใน TEMPLATES แทน text_content สำหรับเนื้อหาที่ห้ามเก็บใน database
+    """
+    return OutboundEmail.objects.create(
+        to_email=to_email,
+        subject=subject,
+        text_content=text_content,
+        user=user,
+        template=template,
+        context=context or {},
+    )
+
+
+def _password_reset(message):
+    # token สร้างตอนส่ง: ไม่อยู่ในตาราง และอายุนับจากตอนที่ส่งจริง
+    user = message.user
+    path = reverse(
+        "reset_password",
+        kwargs={
+            "uidb64": urlsafe_base64_encode(force_bytes(user.pk)),
+            "token": default_token_generator.make_token(user),
+        },
+    )
+    link = message.context["base_url"].rstrip("/") + path
+    return f"Click the link to reset your password:\n{link}"
+
+
+# template -> ฟังก์ชันสร้าง text_content จาก OutboundEmail (user, context)
+TEMPLATES = {"password_reset": _password_reset}
+
+
+def render(message):
+    """เนื้อหาที่จะส่งของ message"""
+    if message.template:
+        return TEMPLATES[message.template](message)
+    return message.text_content
+
+
+def claim(batch_size=DEFAULT_BATCH_SIZE):
+    """หยิบ pending ที่ถึงเวลาแล้วไม่เกิน batch_size แถว และ lease ไว้ให้ worker นี้"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        # ส่งครบทั้ง batch ได้ก่อน lease หมด แม้ทุกตัวจะ timeout
+        lease = timedelta(seconds=len(ids) * email.TIMEOUT + LEASE_MARGIN)
+        OutboundEmail.objects.filter(id__in=ids).update(
+            attempts=F("attempts") + 1, next_attempt_at=now + lease
+        )
+    return list(
+        OutboundEmail.objects.filter(id__in=ids).select_related("user").order_by("id")
+    )
+
+
+def retry_delay(attempts):
+    """backoff ของครั้งที่ attempts (1, 2, ...): base, 2*base, 4*base ... สูงสุด max"""
+    delay = settings.EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    return min(delay, settings.EMAIL_RETRY_MAX_DELAY)
+
+
+def deliver(client=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    ตรวจผล bulk ที่ถึงเวลาแล้วส่งหนึ่ง batch คืนจำนวน
+    {"sent", "submitted", "retried", "dead"} (ทั้งหมดเป็น 0 = ไม่มีอะไรให้ทำแล้ว)
+    """
+    client = client or email.get_client()
+    counts = {"sent": 0, "submitted": 0, "retried": 0, "dead": 0}
+    check_submitted(client, batch_size, counts)
+    messages = claim(batch_size)
+    size = settings.MAILERSEND_BULK_SIZE
+    for start in range(0, len(messages), size):
+        _deliver_chunk(client, messages[start : start + size], counts)
+    return counts
+
+
+def _deliver_chunk(client, messages, counts):
+    """ส่งหลายฉบับใน bulk request เดียว"""
+    try:
+        bulk_ids = client.send_many([_fields(message) for message in messages])
+    except requests.RequestException as e:
+        if len(messages) > 1 and _is_permanent(e):
+            # bulk ถูกปฏิเสธทั้งก้อน (เช่น address ผิดฉบับเดียว):
+            # ส่งทีละฉบับ ให้ dead เฉพาะฉบับที่ผิดจริง
+            for message in messages:
+                _deliver_one(client, message, counts)
+            return
+        for message in messages:
+            counts[_failed(message, e)] += 1
+        return
+
+    ids = [message.pk for message in messages]
+    if not bulk_ids or not bulk_ids[0]:
+        # ไม่มี bulk_email_id ให้ตรวจผล: ถือตาม 202
+        _sent(ids)
+        counts["sent"] += len(ids)
+        return
+    OutboundEmail.objects.filter(pk__in=ids).update(
+        status=OutboundEmail.SUBMITTED,
+        bulk_email_id=bulk_ids[0],
+        next_attempt_at=_check_at(),
+        last_error="",
+    )
+    counts["submitted"] += len(ids)
+
+
+def _deliver_one(client, message, counts):
+    try:
+        client.send(*_fields(message))
+    except requests.RequestException as e:
+        counts[_failed(message, e)] += 1
+    else:
+        _sent([message.pk])
+        counts["sent"] += 1
+
+
+def _fields(message):
+    return message.to_email, message.subject, render(message)
+
+
+def _sent(ids):
+    OutboundEmail.objects.filter(pk__in=ids).update(
+        status=OutboundEmail.SENT,
+        sent_at=timezone.now(),
+        last_error="",
+        text_content="",
+    )
+
+
+def _check_at():
+    return timezone.now() + timedelta(seconds=settings.EMAIL_BULK_CHECK_DELAY)
+
+
+def check_submitted(client, batch_size, counts):
+    """ตรวจผลของ bulk ที่ถึงเวลาตรวจ (ไม่เกิน batch_size bulk) แล้วบันทึกผลต่อฉบับ"""
+    now = timezone.now()
+    with transaction.atomic():
+        bulk_ids = set(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.SUBMITTED, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("bulk_email_id", flat=True)[:batch_size]
+        )
+        if not bulk_ids:
+            return
+        # lease ทั้ง bulk: worker อื่นไม่ตรวจ bulk เดียวกันซ้ำ
+        lease = timedelta(seconds=len(bulk_ids) * email.TIMEOUT + LEASE_MARGIN)
+        OutboundEmail.objects.filter(
+            status=OutboundEmail.SUBMITTED, bulk_email_id__in=bulk_ids
+        ).update(next_attempt_at=now + lease)
+    for bulk_id in bulk_ids:
+        _check_bulk(client, bulk_id, counts)
+
+
+def _check_bulk(client, bulk_id, counts):
+    submitted = OutboundEmail.objects.filter(
+        status=OutboundEmail.SUBMITTED, bulk_email_id=bulk_id
+    )
+    try:
+        result = client.bulk_status(bulk_id)
+    except requests.RequestException as e:
+        last_error = str(e)[:1000]
+        if _status(e) == 404:
+            # MailerSend ไม่รู้จัก bulk นี้: กลับเป็น pending ให้ส่งใหม่
+            counts["retried"] += submitted.update(
+                status=OutboundEmail.PENDING,
+                bulk_email_id="",
+                next_attempt_at=_check_at(),
+                last_error=last_error,
+            )
+        else:
+            submitted.update(next_attempt_at=_check_at(), last_error=last_error)
+        return
+    if result.get("state") != "completed":
+        submitted.update(next_attempt_at=_check_at())
+        return
+
+    # index ใน bulk = ลำดับ id (แต่ละ chunk ส่งเรียงตาม id ของ claim())
+    errors = _bulk_errors(result)
+    sent = []
+    rows = OutboundEmail.objects.filter(bulk_email_id=bulk_id).order_by("id")
+    for index, (pk, status) in enumerate(rows.values_list("pk", "status")):
+        if status != OutboundEmail.SUBMITTED:
+            continue
+        if index in errors:
+            OutboundEmail.objects.filter(pk=pk).update(
+                status=OutboundEmail.DEAD,
+                last_error="; ".join(errors[index])[:1000],
+                text_content="",
+            )
+            counts["dead"] += 1
+        else:
+            sent.append(pk)
+    _sent(sent)
+    counts["sent"] += len(sent)
+
+
+def _bulk_errors(result):
+    """
+    {index ของฉบับใน bulk: [ข้อความ]} จาก validation_errors และ suppressed_recipients
+    (key ขึ้นต้นด้วย "message.<index>")
+    """
+    errors = {}
+    for field in ("validation_errors", "suppressed_recipients"):
+        for key, detail in (result.get(field) or {}).items():
+            match = re.match(r"message\.(\d+)", key)
+            if match:
+                errors.setdefault(int(match.group(1)), []).append(
+                    f"{field} {key}: {json.dumps(detail)}"
+                )
+    return errors
+
+
+def _status(error):
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+
+def _is_permanent(error):
+    # 4xx อื่นนอกจาก 408/429: ส่งซ้ำก็ไม่ผ่าน
+    status = _status(error)
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_STATUS
+
+
+def _failed(message, error):
+    """บันทึกความล้มเหลว: คืน "retried" หรือ "dead" """
+    status = _status(error)
+    rows = OutboundEmail.objects.filter(pk=message.pk)
+    last_error = str(error)[:1000]
+    if _is_permanent(error) or message.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        rows.update(status=OutboundEmail.DEAD, last_error=last_error, text_content="")
+        return "dead"
+
+    delay = retry_delay(message.attempts)
+    # 429: เคารพ Retry-After (วินาที) ถ้านานกว่า backoff
+    retry_after = error.response.headers.get("Retry-After", "") if status == 429 else ""
+    if retry_after.isdigit():
+        delay = max(delay, int(retry_after))
+    rows.update(
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        last_error=last_error,
+    )
+    return "retried"
@@ -0,0 +1,118 @@
+"""
+MailerSend จำลองบน localhost สำหรับ tests และ manage.py bench_mailersend
+
+รับ POST /v1/email และ /v1/bulk-email เก็บทุก request ไว้ใน .requests
+และ GET /v1/bulk-email/{bulk_email_id} (ผลของ bulk) เก็บ id ไว้ใน .status_checks
+statuses: status code ที่จะตอบ POST ตามลำดับ (หมดแล้วตอบ 202)
+rejected: address ที่ bulk รับไว้ (202) แต่ผลใน bulk status เป็น validation error
+in_progress: จำนวนครั้งแรกของ GET bulk status ที่ยังตอบ state "in-progress"
+latency: เวลาที่ใช้ต่อ request (วินาที) แทนเวลาของ provider จริง
+handshake: เวลาที่เสียตอนเปิด connection ใหม่ แทน TCP + TLS handshake
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubMailerSend:
+    def __init__(self, statuses=(), latency=0, handshake=0, rejected=(), in_progress=0):
+        self.statuses = list(statuses)
+        self.rejected = set(rejected)
+        self.in_progress = in_progress
+        self.requests = []
+        self.status_checks = []
+        self.bulks = {}
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._bulk_ids = itertools.count(1)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                time.sleep(handshake)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(latency)
+                with stub._lock:
+                    stub.requests.append(
+                        {
+                            "path": self.path,
+                            "client_port": self.client_address[1],
+                            "authorization": self.headers["Authorization"],
+                            "json": body,
+                        }
+                    )
+                    status = stub.statuses.pop(0) if stub.statuses else 202
+                    bulk_id = next(stub._bulk_ids)
+
+                payload = b""
+                if status == 202 and self.path.endswith("/bulk-email"):
+                    with stub._lock:
+                        stub.bulks[f"bulk-{bulk_id}"] = body
+                    payload = json.dumps({"bulk_email_id": f"bulk-{bulk_id}"}).encode()
+                self._reply(status, payload)
+
+            def do_GET(self):
+                bulk_id = self.path.rsplit("/", 1)[-1]
+                with stub._lock:
+                    stub.status_checks.append(bulk_id)
+                    body = stub.bulks.get(bulk_id)
+                    waiting = stub.in_progress > 0
+                    stub.in_progress -= waiting
+                if body is None:
+                    self._reply(404, b"")
+                    return
+                errors = {
+                    f"message.{index}.to.0.email": ["The email must be valid."]
+                    for index, message in enumerate(body)
+                    if message["to"][0]["email"] in stub.rejected
+                }
+                data = {
+                    "id": bulk_id,
+                    "state": "in-progress" if waiting else "completed",
+                    "validation_errors_count": len(errors),
+                    "validation_errors": errors or None,
+                    "suppressed_recipients_count": 0,
+                    "suppressed_recipients": None,
+                }
+                self._reply(200, json.dumps({"data": data}).encode())
+
+            def _reply(self, status, payload):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        base = f"http://127.0.0.1:{self.server.server_port}/v1"
+        self.url = f"{base}/email"
+        self.bulk_url = f"{base}/bulk-email"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def messages(self):
+        """จำนวน email ทั้งหมดที่ได้รับ (bulk นับทุกฉบับใน request)"""
+        return sum(
+            len(r["json"]) if isinstance(r["json"], list) else 1 for r in self.requests
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
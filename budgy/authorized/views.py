@@ -8,11 +8,10 @@ from django.contrib import messages
 from home.models import Account
 
 from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode
 
 # from django.core.mail import send_mail
-from .utils.email import send_email
+from .utils import mail_queue
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
@@ -114,19 +113,14 @@ def forgot_password(request):
             messages.error(request, "Email not found.")
             return redirect("forgot_password")
 
-        # Generate token + uid
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-        token = default_token_generator.make_token(user)
-
-        reset_link = request.build_absolute_uri(
-            reverse("reset_password", kwargs={"uidb64": uid, "token": token})
-        )
-
-        # Send email
-        send_email(
+        # เข้าคิวแล้วตอบทันที worker (manage.py send_queued_email) เป็นคนส่ง
+        # ลิงก์ reset (uid + token) สร้างตอนส่ง ไม่ถูกเก็บในตาราง OutboundEmail
+        mail_queue.enqueue(
             to_email=email,
             subject="Reset Your Password",
-            text_content=f"Click the link to reset your password:\n{reset_link}",
+            user=user,
+            template="password_reset",
+            context={"base_url": request.build_absolute_uri("/")},
         )
 
         messages.success(request, "Password reset link sent to your email.")
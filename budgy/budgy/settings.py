@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "home.middleware.MetricsMiddleware",
+    "home.middleware.QueryProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -76,8 +78,31 @@ WSGI_APPLICATION = "budgy.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Production (PostgreSQL จาก DATABASE_URL) ใช้ connection ซ้ำข้าม request:
+#   DB_CONN_MAX_AGE       อายุ persistent connection (วินาที, 0 = เปิด/ปิดทุก request)
+#   DB_CONN_HEALTH_CHECKS เช็กว่า connection ยังใช้ได้ก่อนใช้ซ้ำ (หลัง DB restart/failover)
+#   DB_POOL=True          ใช้ psycopg 3 connection pool ของ Django แทน persistent
+#                         connection (แนะนำกับ ASGI ที่ thread ไม่คงที่) ขนาดตั้งด้วย
+#                         DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE ต่อ process และ
+#                         DB_POOL_TIMEOUT วินาทีที่รอ connection ว่าง
+# benchmark: manage.py bench_db_connections --database-url postgresql://...
+
 if not os.environ.get("DEBUG", "True") == "True":
-    DATABASES = {"default": dj_database_url.parse(os.environ.get("DATABASE_URL"))}
+    DATABASES = {
+        "default": dj_database_url.parse(
+            os.environ.get("DATABASE_URL"),
+            conn_max_age=int(os.environ.get("DB_CONN_MAX_AGE", 600)),
+            conn_health_checks=os.environ.get("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        )
+    }
+    if os.environ.get("DB_POOL", "False") == "True":
+        # pool ใช้ร่วมกับ persistent connection ไม่ได้ (connection คืน pool ตอนจบ request)
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        }
 else:
     DATABASES = {
         "default": {
@@ -87,6 +112,85 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# ใช้เก็บ finance snapshot ต่อ user (home/snapshot.py)
+# CACHE_BACKEND: "locmem" (ค่าเริ่มต้น, ต่อ process), "file" หรือ "redis"
+# locmem กับหลาย worker ได้: snapshot ตรวจ ledger version ใน database ทุกครั้ง
+# แต่ backend ที่ใช้ร่วมกันจะ hit บ่อยกว่า (worker อื่นไม่ต้องสร้างใหม่เอง)
+# (Redis / Valkey ฯลฯ ที่ใช้ protocol เดียวกัน ตั้ง CACHE_URL=redis://host:6379/1)
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("CACHE_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CACHE_URL", str(BASE_DIR / "cache")),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "budgy",
+        }
+    }
+
+# อายุสูงสุดของ finance snapshot (วินาที) ปกติถูกลบทันทีเมื่อมีรายการใหม่
+FINANCE_SNAPSHOT_TIMEOUT = int(os.environ.get("FINANCE_SNAPSHOT_TIMEOUT", 300))
+
+# SSE ของ mascot (pet/status/stream/ ต้องรันผ่าน ASGI): ระยะเช็ก ledger version
+# และอายุของแต่ละ connection ก่อนให้ browser ต่อใหม่ (วินาที)
+PET_STATUS_STREAM_INTERVAL = float(os.environ.get("PET_STATUS_STREAM_INTERVAL", 5))
+PET_STATUS_STREAM_TIMEOUT = int(os.environ.get("PET_STATUS_STREAM_TIMEOUT", 300))
+# stream อ่าน ledger version จาก cache (home/versions.py) ค่านี้คืออายุสูงสุด (วินาที)
+# = ช้าสุดที่ stream จะเห็นการเขียนจาก worker อื่นเมื่อใช้ cache แบบ locmem
+LEDGER_VERSION_CACHE_TIMEOUT = int(os.environ.get("LEDGER_VERSION_CACHE_TIMEOUT", 60))
+
+# ใช้ async views (home/async_views.py) กับ JSON APIs แบบอ่านอย่างเดียว
+# เปิดเมื่อรันผ่าน ASGI เช่น gunicorn budgy.asgi -k uvicorn.workers.UvicornWorker
+ASYNC_JSON_API = os.environ.get("ASYNC_JSON_API", "False") == "True"
+
+# SQL profiling ต่อ request (home/middleware.py): Server-Timing header + JSON log
+# request ที่ช้ากว่า SQL_PROFILING_SLOW_MS (ms) จะถูกสุ่มตาม SQL_PROFILING_SAMPLE_RATE
+# (0-1) มา log SQL ทั้งหมด ปิดไว้ = ไม่อยู่ใน middleware chain เลย
+SQL_PROFILING = os.environ.get("SQL_PROFILING", "False") == "True"
+SQL_PROFILING_SLOW_MS = float(os.environ.get("SQL_PROFILING_SLOW_MS", 500))
+SQL_PROFILING_SAMPLE_RATE = float(os.environ.get("SQL_PROFILING_SAMPLE_RATE", 1))
+SQL_PROFILING_TOP = int(os.environ.get("SQL_PROFILING_TOP", 3))
+
+# metrics ที่ /metrics (home/metrics.py) ปิดด้วย METRICS=False
+# METRICS_DIR: directory ที่ gunicorn workers ใช้ร่วมกันเพื่อรวมค่าข้าม process
+# (ล้างก่อน start server) METRICS_TOKEN: ถ้าตั้งไว้ต้องส่ง Authorization: Bearer <token>
+# ถ้าไม่ตั้ง /metrics เปิดให้เฉพาะ staff ที่ login อยู่ (หรือ DEBUG=True) นอกนั้นตอบ 404
+METRICS = os.environ.get("METRICS", "True") == "True"
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "home.middleware": {
+            "handlers": ["console"],
+            "level": os.environ.get("SQL_PROFILING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -144,4 +248,22 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 MAILERSEND_API_KEY = os.environ.get("MAILERSEND_API_KEY")
+MAILERSEND_API_URL = os.environ.get(
+    "MAILERSEND_API_URL", "https://api.mailersend.com/v1/email"
+)
+MAILERSEND_BULK_API_URL = os.environ.get(
+    "MAILERSEND_BULK_API_URL", "https://api.mailersend.com/v1/bulk-email"
+)
+# connection ที่ keep-alive ไว้ต่อ host และจำนวนฉบับต่อ bulk request (MailerSend รับสูงสุด 500)
+MAILERSEND_POOL_SIZE = int(os.environ.get("MAILERSEND_POOL_SIZE", 10))
+MAILERSEND_BULK_SIZE = int(os.environ.get("MAILERSEND_BULK_SIZE", 500))
 DEFAULT_FROM_EMAIL = "budgy@krentiz.dev"
+
+# คิว email (authorized/utils/mail_queue.py): ส่งไม่สำเร็จจะ retry แบบ backoff
+# (EMAIL_RETRY_BASE_DELAY * 2^(ครั้งที่-1) วินาที สูงสุด EMAIL_RETRY_MAX_DELAY)
+# ครบ EMAIL_MAX_ATTEMPTS ครั้งแล้วยังไม่ได้ถือเป็น dead letter
+EMAIL_MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", 6))
+EMAIL_RETRY_BASE_DELAY = int(os.environ.get("EMAIL_RETRY_BASE_DELAY", 30))
+EMAIL_RETRY_MAX_DELAY = int(os.environ.get("EMAIL_RETRY_MAX_DELAY", 3600))
+# bulk ตอบ 202 แล้วรอกี่วินาทีก่อนถามผลต่อฉบับ (และระหว่างถามซ้ำถ้ายังไม่ completed)
+EMAIL_BULK_CHECK_DELAY = int(os.environ.get("EMAIL_BULK_CHECK_DELAY", 10))
@@ -0,0 +1,46 @@
+"""
+Settings สำหรับ tests และ benchmark (manage.py test ใช้ไฟล์นี้เป็นค่าเริ่มต้น)
+
+ต่างจาก settings.py เฉพาะส่วนที่ทำให้ช้าหรือแตะของจริง:
+- SQLite in-memory (ไม่ต้องมี db.sqlite3 / DATABASE_URL)
+- MD5 hasher แทน PBKDF2 (create_user / login ในทุก setUp ไม่ต้อง hash 1M รอบ)
+- static files ไม่ใช้ manifest ของ WhiteNoise และ cache เป็น locmem ต่อ process
+- MailerSend ชี้ไปที่ port ที่ไม่มีใครฟัง (tests ใช้ authorized/utils/mailersend_stub.py)
+
+รันแบบขนาน: python manage.py test --parallel
+ตรวจเวลาของ QueryBudgetTests ด้วย: QUERY_BUDGET_LATENCY=True python manage.py test
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# ไม่ต้องมี STATIC_ROOT (collectstatic) ตอนรัน tests
+WHITENOISE_AUTOREFRESH = True
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "budgy-test",
+    }
+}
+
+# จำนวน query ตรวจทุกครั้ง เวลา (ms ใน BUDGETS) ตรวจเฉพาะเมื่อเปิด: ขึ้นกับเครื่อง
+QUERY_BUDGET_LATENCY = os.environ.get("QUERY_BUDGET_LATENCY", "False") == "True"
+
+MAILERSEND_API_KEY = "test"
+MAILERSEND_API_URL = "http://127.0.0.1:9/v1/email"
+MAILERSEND_BULK_API_URL = "http://127.0.0.1:9/v1/bulk-email"
@@ -2,6 +2,7 @@ from django.contrib import admin
 from .models import (
     Category,
     MonthReport,
+    CategoryMonthReport,
     Account,
     Transaction,
     Income,
@@ -37,6 +38,24 @@ class MonthReportAdmin(admin.ModelAdmin):
     search_fields = ("user__username",)
 
 
+# -----------------------
+# Category Month Report Admin
+# -----------------------
+@admin.register(CategoryMonthReport)
+class CategoryMonthReportAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "user",
+        "month",
+        "year",
+        "trans_type",
+        "category_trans",
+        "total",
+    )
+    list_filter = ("trans_type", "year", "month", "user")
+    search_fields = ("category_trans", "user__username")
+
+
 # -----------------------
 # Account Admin
 # -----------------------
@@ -59,6 +78,8 @@ class TransactionAdmin(admin.ModelAdmin):
         "trans_type",
         "category_trans",
         "amount",
+        "account",
+        "counter_account",
         "date",
     )
     list_filter = ("trans_type", "user", "date")
@@ -66,22 +87,22 @@ class TransactionAdmin(admin.ModelAdmin):
 
 
 # -----------------------
-# Income Admin (child of Transaction)
+# Income Admin (proxy of Transaction)
 # -----------------------
 @admin.register(Income)
 class IncomeAdmin(admin.ModelAdmin):
-    list_display = ("trans_id", "user", "trans_type", "amount", "to_account", "date")
-    list_filter = ("user", "to_account")
+    list_display = ("trans_id", "user", "trans_type", "amount", "account", "date")
+    list_filter = ("user", "account")
     search_fields = ("user__username",)
 
 
 # -----------------------
-# Expense Admin (child of Transaction)
+# Expense Admin (proxy of Transaction)
 # -----------------------
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
-    list_display = ("trans_id", "user", "trans_type", "amount", "from_account", "date")
-    list_filter = ("user", "from_account")
+    list_display = ("trans_id", "user", "trans_type", "amount", "account", "date")
+    list_filter = ("user", "account")
     search_fields = ("user__username",)
 
 
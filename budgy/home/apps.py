@@ -5,4 +5,7 @@ class HomeConfig(AppConfig):
     name = 'home'
 
     def ready(self):
-        import home.signals
\ No newline at end of file
+        import home.signals
+        from home import metrics
+
+        metrics.configure()
@@ -0,0 +1,146 @@
+"""
+Async versions ของ JSON APIs แบบอ่านอย่างเดียว (ใช้เมื่อรันผ่าน ASGI: budgy/asgi.py)
+
+ผลลัพธ์เหมือน views ใน home/views.py ทุกอย่าง (ใช้ helper ชุดเดียวกัน) ต่างกันแค่
+query ผ่าน async ORM (afirst, async for, cache.aget) ระหว่างรอ database
+worker จึงรับ request อื่นต่อได้ ไม่ต้องจอง thread ไว้ทั้ง request
+เช่น dashboard ที่ยิง spending + accounts พร้อมกัน หรือ compare tab ของ stats
+
+home/urls.py เลือกใช้ชุดนี้เมื่อ settings.ASYNC_JSON_API เปิดอยู่
+(ภายใต้ WSGI async view ต้องสร้าง event loop ทุก request จึงช้ากว่า sync)
+"""
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import pagination, rollups, snapshot, versions
+from .views import (
+    _accounts_data,
+    _invalid_page,
+    _pet_status,
+    _spending_groups,
+    _spending_json,
+    _spending_queryset,
+    _spending_response,
+    _spending_rows,
+    _stats_batch_data,
+    _stats_batch_params,
+    _stats_summary_data,
+    _stats_summary_params,
+    _stats_yearly_data,
+    _stats_yearly_params,
+    _summarize_groups,
+)
+
+
+async def _spending_summary(spendings):
+    return _summarize_groups([group async for group in _spending_groups(spendings)])
+
+
+async def _spending_page(request, spendings):
+    limit = pagination.parse_limit(request.GET.get("limit"))
+    rows, next_cursor = await pagination.akeyset_page(
+        _spending_rows(spendings), request.GET.get("cursor"), limit
+    )
+    return _spending_json(rows), next_cursor
+
+
+@login_required
+@versions.ledger_condition
+async def spending_api(request):
+    try:
+        spendings = _spending_queryset(request, await request.auser())
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if request.GET.get("summary") == "1":
+        return JsonResponse(await _spending_summary(spendings))
+
+    try:
+        data, next_cursor = await _spending_page(request, spendings)
+    except ValueError:
+        return _invalid_page()
+
+    totals = None
+    if not request.GET.get("cursor"):
+        totals = (await _spending_summary(spendings))["totals"]
+    return _spending_response(data, next_cursor, totals)
+
+
+@login_required
+@versions.ledger_condition
+async def spending_overview_api(request):
+    try:
+        spendings = _spending_queryset(request, await request.auser())
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        data, next_cursor = await _spending_page(request, spendings)
+    except ValueError:
+        return _invalid_page()
+
+    return JsonResponse(
+        {
+            **await _spending_summary(spendings),
+            "spendings": data,
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@login_required
+@versions.ledger_condition
+async def accounts_api(request):
+    finance = await snapshot.aget(
+        await request.auser(), *versions.for_request(request)
+    )
+    return JsonResponse(_accounts_data(finance))
+
+
+@login_required
+@versions.ledger_condition
+async def stats_summary_api(request):
+    try:
+        year, month, trans_type = _stats_summary_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    summary = await rollups.acategory_totals(
+        await request.auser(), year, month, trans_type
+    )
+    return JsonResponse(_stats_summary_data(summary))
+
+
+@login_required
+@versions.ledger_condition
+async def stats_batch_api(request):
+    try:
+        periods = _stats_batch_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    summaries = await rollups.aperiod_category_totals(await request.auser(), periods)
+    return JsonResponse(_stats_batch_data(periods, summaries))
+
+
+@login_required
+@versions.ledger_condition
+async def stats_yearly_api(request):
+    try:
+        first_year, last_year, ranged = _stats_yearly_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    years = await rollups.ayear_totals(await request.auser(), first_year, last_year)
+    return JsonResponse(_stats_yearly_data(years, first_year, ranged))
+
+
+@login_required(login_url="/login/")
+@require_GET
+@versions.ledger_condition
+async def pet_status_api(request):
+    finance = await snapshot.aget(
+        await request.auser(), *versions.for_request(request)
+    )
+    return JsonResponse(_pet_status(finance))
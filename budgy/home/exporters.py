@@ -0,0 +1,149 @@
+"""
+Export รายการทั้งหมดของ user (CSV / NDJSON, gzip ได้)
+
+อ่านด้วย values_list().iterator(chunk_size) (PostgreSQL ใช้ server-side cursor)
+แล้วเข้ารหัสทีละ chunk: หน่วยความจำขึ้นกับ chunk_size และจำนวนบัญชี ไม่ใช่จำนวนรายการ
+stream() สำหรับ WSGI / management command, astream() สำหรับ ASGI ใช้ aiterator()
+(StreamingHttpResponse ภายใต้ ASGI จะอ่าน iterator แบบ sync จนหมดก่อนส่ง)
+
+แต่ละแถวคือรายการหนึ่งรายการ เรียงตามวันที่:
+    id, date, type (income/expense), amount, category, account, transfer_account
+การโอนคือ expense + income คู่กัน transfer_account เป็นชื่อบัญชีอีกฝั่ง (ไม่ใช่การโอน = ว่าง)
+CSV ใช้ header date/amount/category/account/type เดียวกับ importers.parse_csv
+จึง import กลับได้ (การโอนจะกลายเป็นรายรับ/รายจ่ายธรรมดา)
+"""
+
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Account, Transaction
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+DEFAULT_CHUNK_SIZE = 2000
+COLUMNS = (
+    "id",
+    "date",
+    "type",
+    "amount",
+    "category",
+    "account",
+    "transfer_account",
+)
+
+
+def _queryset(user_id):
+    return (
+        Transaction.objects.filter(user_id=user_id)
+        .order_by("date", "trans_id")
+        .values_list(
+            "trans_id",
+            "date",
+            "trans_type",
+            "amount",
+            "category_trans",
+            "account_id",
+            "counter_account_id",
+            # named=True: iterable แบบ generator ทำให้ aiterator() ไป execute
+            # ใน thread (values_list ธรรมดาของ Django 5.2 execute ตอนเรียก __iter__)
+            named=True,
+        )
+    )
+
+
+def _accounts(user_id):
+    # ชื่อบัญชีโหลดครั้งเดียว (ไม่ JOIN Account สองครั้งในทุกแถว)
+    return Account.objects.filter(user_id=user_id).values_list("id", "account_name")
+
+
+class _Encoder:
+    """แปลง chunk ของแถวเป็น bytes (และบีบอัดแบบ gzip ต่อเนื่องถ้าเปิด)"""
+
+    def __init__(self, file_format, compress, accounts):
+        if file_format not in FORMATS:
+            raise ValueError(f"Unsupported export format: {file_format}")
+        self.format = file_format
+        self.accounts = accounts
+        # wbits=31: header/trailer แบบ gzip
+        self.compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def _output(self, text):
+        data = text.encode()
+        return self.compressor.compress(data) if self.compressor else data
+
+    def _row(self, row):
+        pk, date, trans_type, amount, category, account_id, counter_id = row
+        return (
+            pk,
+            date.isoformat(),
+            trans_type,
+            amount,
+            category,
+            self.accounts.get(account_id, ""),
+            self.accounts.get(counter_id, ""),
+        )
+
+    def header(self):
+        if self.format != "csv":
+            return b""
+        return self._csv([COLUMNS])
+
+    def rows(self, rows):
+        if not rows:
+            return b""
+        rows = [self._row(row) for row in rows]
+        if self.format == "csv":
+            return self._csv(rows)
+        return self._output(
+            "".join(
+                json.dumps(dict(zip(COLUMNS, row)), cls=DjangoJSONEncoder) + "\n"
+                for row in rows
+            )
+        )
+
+    def _csv(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return self._output(buffer.getvalue())
+
+    def close(self):
+        return self.compressor.flush() if self.compressor else b""
+
+
+def stream(user_id, file_format="csv", compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """yield bytes ของไฟล์ export ทีละ chunk"""
+    encoder = _Encoder(file_format, compress, dict(_accounts(user_id)))
+    yield encoder.header()
+    rows = _queryset(user_id).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield encoder.rows(chunk)
+    if tail := encoder.close():
+        yield tail
+
+
+async def astream(
+    user_id, file_format="csv", compress=False, chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """stream() สำหรับ ASGI: อ่านด้วย QuerySet.aiterator(chunk_size)"""
+    accounts = {pk: name async for pk, name in _accounts(user_id)}
+    encoder = _Encoder(file_format, compress, accounts)
+    yield encoder.header()
+    chunk = []
+    async for row in _queryset(user_id).aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield encoder.rows(chunk)
+            chunk = []
+    if chunk:
+        yield encoder.rows(chunk)
+    if tail := encoder.close():
+        yield tail
+
+
+def filename(username, file_format, compress=False):
+    return f"budgy-{username}-ledger.{file_format}" + (".gz" if compress else "")
@@ -0,0 +1,337 @@
+"""
+Bulk import รายการจาก bank statement (CSV / OFX / QIF)
+
+parser แต่ละแบบอ่านไฟล์แบบ stream แล้ว yield ทีละแถวเป็น dict:
+    {"line", "date", "amount", "category", "account", "trans_type"}
+(ค่ายังเป็น string ดิบ ตรวจสอบทีหลังใน import_rows)
+
+import_rows() ตัดแถวเป็น batch แล้วต่อ batch:
+- ตรวจสอบแถว (วันที่ / ยอด / บัญชี) แถวที่ผิดถูกข้ามและเก็บ error ไว้
+- สร้าง Category ที่ยังไม่มีครั้งเดียว (bulk_create)
+- bulk_create รายการทั้งหมดของ batch
+จบไฟล์แล้วจึง:
+- ปรับยอด Account หนึ่ง UPDATE ต่อบัญชี (F() expression)
+- ปรับ MonthReport / CategoryMonthReport ผ่าน rollups.record_batch
+  (bulk_create ไม่ส่ง post_save signal)
+
+หน่วยความจำจึงขึ้นกับ batch_size และจำนวนเดือน/category ไม่ใช่ขนาดไฟล์
+"""
+
+import csv
+import io
+import re
+from datetime import datetime, time
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import metrics, money, rollups, snapshot, versions
+from .models import Account, Category, Transaction
+
+FORMATS = ("csv", "ofx", "qif")
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CATEGORY = "Imported"
+# เก็บ error ไว้ตอบกลับแค่นี้ ที่เหลือนับอย่างเดียว
+MAX_ERRORS = 100
+
+CATEGORY_MAX_LENGTH = Category._meta.get_field("category_name").max_length
+
+
+class ImportFileError(ValueError):
+    """ไฟล์ทั้งไฟล์ใช้ไม่ได้ (format ไม่รู้จัก, ไม่มี header ที่ต้องใช้ ฯลฯ)"""
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+
+# ---------------- parsers ----------------
+
+def guess_format(filename):
+    """เดา format จากนามสกุลไฟล์ (คืน None ถ้าไม่รู้จัก)"""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return extension if extension in FORMATS else None
+
+
+def text_stream(binary, encoding="utf-8-sig"):
+    """ห่อไฟล์ binary (เช่น UploadedFile) ให้อ่านเป็น text ทีละบรรทัด"""
+    return io.TextIOWrapper(binary, encoding=encoding, errors="replace", newline="")
+
+
+def parse_csv(stream):
+    """
+    CSV ที่มี header: date, amount และ (ไม่บังคับ) category, account, type
+    ถ้าไม่มี type ยอดติดลบ = expense
+    """
+    reader = csv.DictReader(stream)
+    headers = {
+        (name or "").strip().lower(): name for name in (reader.fieldnames or [])
+    }
+    missing = {"date", "amount"} - headers.keys()
+    if missing:
+        raise ImportFileError(
+            "CSV is missing column(s): " + ", ".join(sorted(missing))
+        )
+
+    def column(row, name):
+        value = row.get(headers.get(name))
+        return value.strip() if isinstance(value, str) else ""
+
+    for row in reader:
+        yield {
+            "line": reader.line_num,
+            "date": column(row, "date"),
+            "amount": column(row, "amount"),
+            "category": column(row, "category"),
+            "account": column(row, "account"),
+            "trans_type": column(row, "type").lower(),
+        }
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _ofx_tags(stream, chunk_size=64 * 1024):
+    """อ่าน OFX (SGML/XML) เป็นก้อน ๆ แล้ว yield (closing, tag, value)"""
+    buffer = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        # เก็บ tag สุดท้ายที่อาจถูกตัดครึ่งไว้รอก้อนถัดไป
+        cut = buffer.rfind("<") if chunk else len(buffer)
+        for match in _OFX_TAG.finditer(buffer, 0, cut):
+            closing, tag, value = match.groups()
+            yield bool(closing), tag.upper(), value.strip()
+        buffer = buffer[cut:]
+        if not chunk:
+            return
+
+
+def parse_ofx(stream):
+    """OFX: อ่านเฉพาะ <STMTTRN> (DTPOSTED, TRNAMT, NAME/MEMO)"""
+    current = None
+    index = 0
+    for closing, tag, value in _ofx_tags(stream):
+        if tag == "STMTTRN":
+            if closing and current is not None:
+                index += 1
+                yield {
+                    "line": index,
+                    "date": current.get("DTPOSTED", "")[:8],
+                    "amount": current.get("TRNAMT", ""),
+                    "category": current.get("NAME") or current.get("MEMO", ""),
+                    "account": "",
+                    "trans_type": "",
+                }
+                current = None
+            elif not closing:
+                current = {}
+        elif current is not None and not closing:
+            current[tag] = value
+
+
+def parse_qif(stream):
+    """QIF: D=date, T/U=amount, L=category (ถ้าไม่มีใช้ P=payee), ^=จบรายการ"""
+    current = {}
+    index = 0
+    for raw in stream:
+        line = raw.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if current:
+                index += 1
+                yield {
+                    "line": index,
+                    "date": current.get("D", ""),
+                    "amount": current.get("T") or current.get("U", ""),
+                    "category": current.get("L") or current.get("P", ""),
+                    "account": "",
+                    "trans_type": "",
+                }
+            current = {}
+        elif code in "DTULP":
+            current[code] = value
+
+
+PARSERS = {"csv": parse_csv, "ofx": parse_ofx, "qif": parse_qif}
+
+
+def parse(stream, file_format):
+    try:
+        parser = PARSERS[file_format]
+    except KeyError:
+        raise ImportFileError(f"Unsupported format: {file_format}")
+    return parser(stream)
+
+
+# ---------------- validation ----------------
+
+_QIF_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%Y%m%d")
+
+
+def parse_import_date(value):
+    """คืน datetime (aware) ของวันที่ในไฟล์ หรือ None ถ้าอ่านไม่ได้"""
+    value = value.strip().replace("'", "/")
+    try:
+        parsed = parse_datetime(value) or parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        for date_format in _QIF_DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, date_format).date()
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        return None
+    if not isinstance(parsed, datetime):
+        parsed = datetime.combine(parsed, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_import_amount(value):
+    """คืน Decimal ของยอด (รองรับ , คั่นหลักพัน) หรือ None"""
+    try:
+        return money.to_money(value.replace(",", "").replace(" ", ""))
+    except (AttributeError, ValueError):
+        return None
+
+
+# ---------------- import ----------------
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+@metrics.LEDGER_LATENCY.time("import")
+@transaction.atomic
+def import_rows(user, rows, default_account=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    บันทึกแถวจาก parser ให้ user ทั้งไฟล์อยู่ใน transaction เดียว (สำเร็จทั้งหมดหรือไม่เลย)
+    default_account: Account ที่ใช้เมื่อแถวไม่ได้ระบุบัญชี
+    คืน ImportResult
+    """
+    result = ImportResult()
+    accounts = {account.account_name: account for account in Account.objects.filter(user=user)}
+    categories = set(
+        Category.objects.filter(user=user).values_list("trans_type", "category_name")
+    )
+    # ยอดสุทธิต่อบัญชี และยอดต่อเดือน/category (ขนาดขึ้นกับจำนวนเดือน ไม่ใช่จำนวนแถว)
+    balances = {}
+    totals = {}
+
+    for batch in _batches(rows, batch_size):
+        transactions = []
+        for row in batch:
+            entry = _validate(row, accounts, default_account, result)
+            if entry is not None:
+                transactions.append(Transaction(user=user, **entry))
+        if transactions:
+            _write_batch(user, transactions, categories)
+            _add_totals(transactions, balances, totals)
+            result.created += len(transactions)
+
+    for account_id, delta in balances.items():
+        Account.objects.filter(pk=account_id).update(balance=F("balance") + delta)
+    rollups.record_batch(user.id, totals)
+    # update() ไม่ส่ง signal จึงต้องลบ snapshot และขยับ ledger version เอง
+    snapshot.invalidate(user.id)
+    versions.bump(user.id)
+    metrics.IMPORT_ROWS.inc("created", amount=result.created)
+    metrics.IMPORT_ROWS.inc("skipped", amount=result.skipped)
+    return result
+
+
+def _validate(row, accounts, default_account, result):
+    """แปลงแถวเป็น kwargs ของ Transaction หรือบันทึก error แล้วคืน None"""
+    line = row["line"]
+    date = parse_import_date(row["date"])
+    if date is None:
+        result.error(line, f"Invalid date: {row['date']!r}")
+        return None
+
+    amount = parse_import_amount(row["amount"])
+    if not amount:
+        result.error(line, f"Invalid amount: {row['amount']!r}")
+        return None
+
+    trans_type = row["trans_type"] or ("expense" if amount < 0 else "income")
+    if trans_type not in ("income", "expense"):
+        result.error(line, f"Invalid type: {row['trans_type']!r}")
+        return None
+
+    if row["account"]:
+        account = accounts.get(row["account"])
+        if account is None:
+            result.error(line, f"Account does not exist: {row['account']!r}")
+            return None
+    elif default_account is not None:
+        account = default_account
+    else:
+        result.error(line, "Account not specified.")
+        return None
+
+    category = (row["category"] or DEFAULT_CATEGORY)[:CATEGORY_MAX_LENGTH]
+    return {
+        "trans_type": trans_type,
+        "date": date,
+        "amount": abs(amount),
+        "category_trans": category,
+        "account": account,
+    }
+
+
+def _write_batch(user, transactions, categories):
+    # Category ที่ยังไม่มี: สร้างครั้งเดียวต่อ batch
+    missing = {
+        (item.trans_type, item.category_trans) for item in transactions
+    } - categories
+    if missing:
+        Category.objects.bulk_create(
+            [
+                Category(user=user, trans_type=trans_type, category_name=name)
+                for trans_type, name in missing
+            ],
+            ignore_conflicts=True,
+        )
+        categories |= missing
+
+    Transaction.objects.bulk_create(transactions)
+
+
+def _add_totals(transactions, balances, totals):
+    for item in transactions:
+        sign = 1 if item.trans_type == "income" else -1
+        balances[item.account_id] = balances.get(item.account_id, 0) + sign * item.amount
+        year, month = rollups.period_of(item.date)
+        key = (year, month, item.trans_type, item.category_trans)
+        amount, count = totals.get(key, (0, 0))
+        totals[key] = (amount + item.amount, count + 1)
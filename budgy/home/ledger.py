@@ -0,0 +1,108 @@
+"""
+Ledger posting service: ทางเดียวที่ใช้บันทึกรายการพร้อมปรับยอด Account
+
+ทุกฟังก์ชันบันทึกรายการและปรับยอดบัญชีใน transaction.atomic เดียวกัน
+ยอดบัญชีปรับด้วย F("balance") + amount (UPDATE ... SET balance = balance + x)
+ให้ database เป็นคนบวก จึงไม่มี lost update เมื่อหลาย request (หลาย gunicorn
+worker) โพสต์เข้าบัญชีเดียวกันพร้อมกัน และไม่ทับ field อื่นของ Account
+(save(update_fields=["balance"]) ไม่ใช่ save ทั้งแถว)
+
+MonthReport / CategoryMonthReport ถูกปรับโดย signals ใน transaction เดียวกันนี้
+และทุกครั้งที่โพสต์จะลบ finance snapshot ของ user (home/snapshot.py)
+เวลาของแต่ละการโพสต์ (รวม commit) อยู่ใน metrics.LEDGER_LATENCY
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from . import metrics, signals, snapshot, versions
+from .models import Expense, Income
+
+
+def adjust_balance(account, delta):
+    """บวก delta เข้ายอดของ account แบบ atomic แล้วโหลดยอดใหม่กลับมาที่ instance"""
+    account.balance = F("balance") + delta
+    account.save(update_fields=["balance"])
+    account.refresh_from_db(fields=["balance"])
+
+
+@metrics.LEDGER_LATENCY.time("income")
+@transaction.atomic
+def post_income(user, account, amount, date, category):
+    """บันทึกรายรับเข้า account"""
+    income = Income.objects.create(
+        user=user,
+        date=date,
+        amount=amount,
+        category_trans=category,
+        to_account=account,
+    )
+    adjust_balance(account, amount)
+    snapshot.invalidate(user.pk)
+    return income
+
+
+@metrics.LEDGER_LATENCY.time("expense")
+@transaction.atomic
+def post_expense(user, account, amount, date, category):
+    """บันทึกรายจ่ายออกจาก account"""
+    expense = Expense.objects.create(
+        user=user,
+        date=date,
+        amount=amount,
+        category_trans=category,
+        from_account=account,
+    )
+    adjust_balance(account, -amount)
+    snapshot.invalidate(user.pk)
+    return expense
+
+
+@metrics.LEDGER_LATENCY.time("transfer")
+@transaction.atomic
+def post_transfer(user, from_account, to_account, amount, date, category):
+    """
+    โอนเงินระหว่างบัญชี: บันทึก Expense (ขาออก) + Income (ขาเข้า)
+    ที่ชี้หากันด้วย counter_account คืน (expense, income)
+    """
+    expense = Expense.objects.create(
+        user=user,
+        date=date,
+        amount=amount,
+        category_trans=category,
+        from_account=from_account,
+        counter_account=to_account,
+    )
+    income = Income.objects.create(
+        user=user,
+        date=date,
+        amount=amount,
+        category_trans=category,
+        to_account=to_account,
+        counter_account=from_account,
+    )
+    # โอนเข้าบัญชีเดียวกัน ยอดไม่เปลี่ยน
+    if from_account.pk != to_account.pk:
+        # ล็อกตามลำดับ pk เสมอ กัน deadlock เมื่อโอนสวนทางกันพร้อมกัน
+        for account, delta in sorted(
+            ((from_account, -amount), (to_account, amount)),
+            key=lambda item: item[0].pk,
+        ):
+            adjust_balance(account, delta)
+    snapshot.invalidate(user.pk)
+    return expense, income
+
+
+@transaction.atomic
+def delete_users(user_ids):
+    """
+    ลบ users พร้อมข้อมูลการเงินทั้งหมดด้วย cascade ปกติ แต่ปิด receivers ที่ปรับ
+    rollups และขยับ version ทีละรายการ (signals.muted) เพราะ rollups / version
+    ถูกลบพร้อม user อยู่แล้ว: query ไม่เพิ่มตามจำนวนรายการ
+    """
+    with signals.muted():
+        User.objects.filter(pk__in=user_ids).delete()
+    for user_id in user_ids:
+        snapshot.invalidate(user_id)
+        versions.forget(user_id)
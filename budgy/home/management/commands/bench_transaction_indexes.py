@@ -0,0 +1,160 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Sum
+
+from home import periods
+from home.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway copy of the database with ~1M transactions and print "
+        "query plans/timings for the (user, date) access pattern before and "
+        "after the composite indexes. Works on SQLite and PostgreSQL; the real "
+        "database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Runs per query; the median is reported.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep (and reuse) the benchmark database between runs.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options["keepdb"]
+        )
+        try:
+            rng = random.Random(options["seed"])
+            if not Transaction.objects.exists():
+                self.seed(rng, options)
+            self.compare(connection, options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+
+    # ---------------- seed ----------------
+
+    def seed(self, rng, options):
+        users = User.objects.bulk_create(
+            User(username=f"bench{i}", password="!") for i in range(options["users"])
+        )
+        user_ids = [user.pk for user in users]
+        first_day = datetime(
+            datetime.now().year - options["years"] + 1, 1, 1, tzinfo=dt_timezone.utc
+        )
+        span = options["years"] * 365 * 24 * 3600
+        categories = ["Food", "Rent", "Travel", "Salary", "Bills", "Fun"]
+
+        started = time.perf_counter()
+        remaining = options["rows"]
+        while remaining > 0:
+            size = min(options["batch_size"], remaining)
+            Transaction.objects.bulk_create(
+                Transaction(
+                    user_id=rng.choice(user_ids),
+                    trans_type=rng.choice(("income", "expense")),
+                    date=first_day + timedelta(seconds=rng.randrange(span)),
+                    amount=round(rng.uniform(1, 5000), 2),
+                    category_trans=rng.choice(categories),
+                )
+                for _ in range(size)
+            )
+            remaining -= size
+        self.stdout.write(
+            f"Seeded {options['rows']} transactions for {options['users']} users "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    # ---------------- compare ----------------
+
+    def queries(self, user_id, day, use_ranges):
+        """คืน (ชื่อ, queryset/aggregate) ของ query แบบเดียวกับใน home/views.py"""
+        qs = Transaction.objects.filter(user_id=user_id)
+        if use_ranges:
+            by_day = qs.filter(**periods.date_filter(periods.day_range(day)))
+            by_month = qs.filter(
+                **periods.date_filter(periods.month_range(day.year, day.month))
+            )
+            by_year = qs.filter(
+                trans_type="expense",
+                **periods.date_filter(periods.year_range(day.year)),
+            )
+        else:
+            by_day = qs.filter(date__date=day)
+            by_month = qs.filter(date__year=day.year, date__month=day.month)
+            by_year = qs.filter(trans_type="expense", date__year=day.year)
+
+        return [
+            ("spending daily", by_day.order_by("-date")),
+            ("spending monthly", by_month.order_by("-date")),
+            ("yearly expense sum", by_year.values("user_id").annotate(Sum("amount"))),
+        ]
+
+    def compare(self, connection, options):
+        table = Transaction._meta.db_table
+        sample = Transaction.objects.order_by("?").values("user_id", "date")[:1].get()
+        user_id, day = sample["user_id"], sample["date"].date()
+
+        with connection.schema_editor() as editor:
+            for index in Transaction._meta.indexes:
+                editor.remove_index(Transaction, index)
+        self.analyze(connection, table)
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                "\n== BEFORE: __date/__year/__month lookups, FK index on user only =="
+            )
+        )
+        self.report(self.queries(user_id, day, use_ranges=False), options["repeat"])
+
+        with connection.schema_editor() as editor:
+            for index in Transaction._meta.indexes:
+                editor.add_index(Transaction, index)
+        self.analyze(connection, table)
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                "\n== AFTER: half-open date ranges, (user, date) and "
+                "(user, trans_type, date) indexes =="
+            )
+        )
+        self.report(self.queries(user_id, day, use_ranges=True), options["repeat"])
+
+    def analyze(self, connection, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+    def report(self, queries, repeat):
+        for name, queryset in queries:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"\n-- {name}: median {statistics.median(timings):.2f} ms "
+                    f"over {repeat} runs"
+                )
+            )
+            self.stdout.write(queryset.explain())
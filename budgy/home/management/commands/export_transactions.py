@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from home import exporters
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every transaction of a user as CSV or NDJSON (optionally gzip). "
+        "Rows are streamed in chunks, so memory use does not grow with history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument(
+            "--format",
+            choices=exporters.FORMATS,
+            default="csv",
+            help="Output format (default: csv).",
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="Compress the output with gzip."
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="File to write (default: standard output).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=exporters.DEFAULT_CHUNK_SIZE,
+            help=f"Rows per database fetch (default: {exporters.DEFAULT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        chunks = exporters.stream(
+            user.pk, options["format"], options["gzip"], options["chunk_size"]
+        )
+        if options["output"] == "-":
+            self._write_stdout(chunks, options["gzip"])
+            return
+        try:
+            with open(options["output"], "wb") as file:
+                size = self._write(chunks, file)
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {size} bytes to {options['output']}.")
+        )
+
+    def _write_stdout(self, chunks, compress):
+        out = self.stdout._out
+        binary = getattr(out, "buffer", None)
+        if binary is not None:
+            self._write(chunks, binary)
+        elif compress:
+            raise CommandError("--gzip needs --output when stdout is not binary.")
+        else:
+            # stdout แบบ text (เช่น call_command(stdout=StringIO()))
+            for chunk in chunks:
+                out.write(chunk.decode())
+
+    def _write(self, chunks, file):
+        size = 0
+        for chunk in chunks:
+            file.write(chunk)
+            size += len(chunk)
+        file.flush()
+        return size
@@ -0,0 +1,368 @@
+import calendar
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from home import ledger, rollups, snapshot
+from home.models import Account, Category, LedgerVersion, Profile, Transaction
+
+CENT = Decimal("0.01")
+
+INCOME_CATEGORIES = ["Salary", "Bonus", "Freelance", "Interest"]
+EXPENSE_CATEGORIES = [
+    "Food",
+    "Transport",
+    "Rent",
+    "Bills",
+    "Shopping",
+    "Entertainment",
+    "Health",
+    "Education",
+]
+TRANSFER_CATEGORY = "Bank Transfer"
+
+# (category, ครั้งต่อสัปดาห์โดยเฉลี่ย, median ของจำนวนเงิน (บาท), sigma ของ lognormal)
+DISCRETIONARY = [
+    ("Shopping", 1.5, 450, 0.9),
+    ("Entertainment", 1.0, 350, 0.8),
+    ("Health", 0.2, 600, 1.0),
+    ("Education", 0.1, 1500, 0.7),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate deterministic synthetic users with accounts, categories and "
+        "years of income/expense/transfer history (salary at month end, rent, "
+        "bills, daily food and transport, occasional heavy-tailed purchases) "
+        "using bulk_create, then rebuild the monthly rollups. The same --seed, "
+        "--end and --users always produce the same data. Users are named "
+        "<prefix>0, <prefix>1, ... and share one password, so they can log in "
+        "and be used by the loadtest command."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--years", type=int, default=5, help="Years of history (default: 5)."
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--end",
+            type=date.fromisoformat,
+            help="Last day of the history, YYYY-MM-DD (default: today).",
+        )
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--password", default="loadtest")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Users generated and written per database transaction (default: 100).",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete existing users named <prefix><number> first.",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        end = options["end"] or timezone.localdate()
+        start = date(end.year - options["years"], end.month, 1) + timedelta(days=32)
+        start = start.replace(day=1)
+
+        existing = User.objects.filter(username__regex=rf"^{prefix}[0-9]+$")
+        if options["clear"]:
+            deleted = self.clear(list(existing.values_list("id", flat=True)))
+            self.stdout.write(f"Deleted {deleted} existing {prefix}* users.")
+        elif existing.exists():
+            raise CommandError(
+                f"Users named {prefix}<number> already exist, use --clear or --prefix."
+            )
+
+        # hash ครั้งเดียว: PBKDF2 ต่อ user จะกินเวลามากกว่าการสร้างข้อมูลทั้งหมด
+        password = make_password(options["password"])
+        self.stdout.write(
+            f"Generating {options['users']} users, {start} .. {end}, "
+            f"seed {options['seed']} ..."
+        )
+        started = time.perf_counter()
+        written = 0
+        for first in range(0, options["users"], options["batch_size"]):
+            indexes = range(first, min(first + options["batch_size"], options["users"]))
+            written += self.write_batch(indexes, prefix, password, start, end, options)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  {indexes[-1] + 1} users, {written} transactions "
+                f"({written / elapsed:.0f} rows/s)"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {options['users']} users and {written} transactions "
+                f"in {time.perf_counter() - started:.1f}s."
+            )
+        )
+
+    def clear(self, user_ids, batch_size=500):
+        """ลบ users ที่สร้างไว้ก่อนหน้า (ลบข้อมูลการเงินแบบ bulk ดู ledger.delete_users)"""
+        for first in range(0, len(user_ids), batch_size):
+            ledger.delete_users(user_ids[first : first + batch_size])
+        return len(user_ids)
+
+    # ---------------- write ----------------
+
+    @transaction.atomic
+    def write_batch(self, indexes, prefix, password, start, end, options):
+        ledgers = [
+            generate_user(random.Random(f"{options['seed']}:{index}"), start, end)
+            for index in indexes
+        ]
+        # bulk_create ไม่ส่ง post_save: Profile / LedgerVersion ต้องสร้างเอง
+        users = User.objects.bulk_create(
+            User(
+                username=f"{prefix}{index}",
+                email=f"{prefix}{index}@example.com",
+                password=password,
+                date_joined=ledger["joined"],
+            )
+            for index, ledger in zip(indexes, ledgers)
+        )
+        now = timezone.now()
+        Profile.objects.bulk_create(
+            Profile(user=user, show_mascot=ledger["show_mascot"])
+            for user, ledger in zip(users, ledgers)
+        )
+        LedgerVersion.objects.bulk_create(
+            LedgerVersion(user=user, version=1, updated_at=now) for user in users
+        )
+        Category.objects.bulk_create(
+            Category(user=user, trans_type=trans_type, category_name=name)
+            for user in users
+            for trans_type, names in (
+                ("income", INCOME_CATEGORIES),
+                ("expense", EXPENSE_CATEGORIES),
+                ("transfer", [TRANSFER_CATEGORY]),
+            )
+            for name in names
+        )
+
+        accounts = Account.objects.bulk_create(
+            Account(
+                user=user,
+                account_name=name,
+                type_acc=type_acc,
+                opening_balance=opening,
+                balance=opening + ledger["net"][name],
+            )
+            for user, ledger in zip(users, ledgers)
+            for name, type_acc, opening in ledger["accounts"]
+        )
+        account_ids = {
+            (account.user_id, account.account_name): account.pk for account in accounts
+        }
+
+        rows = [
+            Transaction(
+                user=user,
+                trans_type=trans_type,
+                date=when,
+                amount=amount,
+                category_trans=category,
+                account_id=account_ids[user.pk, account],
+                counter_account_id=account_ids[user.pk, counter] if counter else None,
+            )
+            for user, ledger in zip(users, ledgers)
+            for trans_type, when, amount, category, account, counter in ledger[
+                "transactions"
+            ]
+        ]
+        Transaction.objects.bulk_create(rows, batch_size=5000)
+        rollups.rebuild([user.pk for user in users])
+        for user in users:
+            # id อาจซ้ำกับ user ที่ถูกลบไป (SQLite) อย่าให้เห็น snapshot เก่า
+            snapshot.invalidate(user.pk)
+        return len(rows)
+
+
+# ---------------- generate ----------------
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _lognormal(rng, median, sigma):
+    return rng.lognormvariate(math.log(median), sigma)
+
+
+def _at(day, rng, first_hour=7, last_hour=22):
+    """เวลาสุ่มในวันนั้นตาม timezone ของเว็บ (เก็บเป็น UTC เหมือนข้อมูลจริง)"""
+    moment = datetime(
+        day.year,
+        day.month,
+        day.day,
+        rng.randint(first_hour, last_hour),
+        rng.randrange(60),
+    )
+    return timezone.make_aware(moment)
+
+
+def _months(start, end):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+
+
+def generate_user(rng, start, end):
+    """
+    ประวัติของ user หนึ่งคน: {"joined", "show_mascot", "accounts", "net", "transactions"}
+    transactions เป็น (trans_type, date, amount, category, account, counter_account)
+    """
+    # ราว 40% ใช้มาตั้งแต่ต้น ที่เหลือสมัครทีหลัง (ประวัติสั้นกว่า)
+    if rng.random() >= 0.4:
+        start = start + timedelta(days=rng.randrange(max((end - start).days, 1)))
+
+    # รายได้ต่อเดือนกระจายแบบ lognormal (median ~25,000 บาท)
+    salary = _lognormal(rng, 25000, 0.5)
+    payday = rng.choice([1, 25, 28, None])  # None = วันสุดท้ายของเดือน
+    rent = salary * rng.uniform(0.2, 0.35) if rng.random() < 0.7 else 0
+    # คนรายได้สูงใช้จ่ายต่อครั้งมากกว่า (แต่ไม่เป็นสัดส่วนตรง)
+    scale = (salary / 25000) ** 0.5
+    food_per_day = rng.uniform(0.5, 2)
+    commutes = rng.random() < 0.6
+    has_card = rng.random() < 0.4
+
+    accounts = [
+        ("Cash", "cash", _money(rng.uniform(0, 3000))),
+        ("Bank", "savings", _money(_lognormal(rng, 20000, 1))),
+    ]
+    if has_card:
+        accounts.append(("Credit Card", "credit", Decimal("0.00")))
+    spend_from = ["Cash", "Cash", "Bank"] + (["Credit Card"] if has_card else [])
+
+    transactions = []
+    # ยอดสะสมของแต่ละบัญชี (ใช้ตัดสินใจถอนเงินสด และเป็น net ที่คืนไป)
+    net = {name: Decimal("0.00") for name, _, _ in accounts}
+    cash = accounts[0][2]
+
+    def add(trans_type, day, amount, category, account):
+        if start <= day <= end:
+            amount = _money(amount)
+            transactions.append(
+                (trans_type, _at(day, rng), amount, category, account, None)
+            )
+            net[account] += amount if trans_type == "income" else -amount
+
+    def transfer(day, amount, from_account, to_account):
+        # สองขา (expense + income) เวลาเดียวกัน แบบ ledger.post_transfer
+        if start <= day <= end:
+            when, amount = _at(day, rng), _money(amount)
+            transactions.append(
+                ("expense", when, amount, TRANSFER_CATEGORY, from_account, to_account)
+            )
+            transactions.append(
+                ("income", when, amount, TRANSFER_CATEGORY, to_account, from_account)
+            )
+            net[from_account] -= amount
+            net[to_account] += amount
+
+    for year, month in _months(start, end):
+        days = calendar.monthrange(year, month)[1]
+        first = date(year, month, 1)
+
+        add(
+            "income",
+            first.replace(day=payday or days),
+            salary * rng.uniform(0.98, 1.02),
+            "Salary",
+            "Bank",
+        )
+        if month == 12 and rng.random() < 0.5:
+            add(
+                "income",
+                date(year, 12, 20),
+                salary * rng.uniform(0.5, 2),
+                "Bonus",
+                "Bank",
+            )
+        if rng.random() < 0.25:
+            add(
+                "income",
+                first.replace(day=rng.randint(1, days)),
+                _lognormal(rng, 4000, 0.8),
+                "Freelance",
+                "Bank",
+            )
+        if month in (6, 12):
+            add(
+                "income",
+                first.replace(day=days),
+                rng.uniform(10, 300),
+                "Interest",
+                "Bank",
+            )
+
+        if rent:
+            add("expense", first, rent, "Rent", "Bank")
+        add(
+            "expense",
+            first.replace(day=min(15, days)),
+            salary * rng.uniform(0.03, 0.08),
+            "Bills",
+            "Bank",
+        )
+        # จ่ายยอดบัตรเครดิตทั้งหมดต้นเดือน
+        if has_card and net["Credit Card"] < 0:
+            day = first.replace(day=min(5, days))
+            transfer(day, -net["Credit Card"], "Bank", "Credit Card")
+
+        for day_no in range(1, days + 1):
+            day = first.replace(day=day_no)
+            weekend = day.weekday() >= 5
+            # เงินสดใกล้หมด: ถอนจากธนาคาร
+            if cash + net["Cash"] < 500:
+                transfer(day, rng.choice([2000, 3000, 5000, 10000]), "Bank", "Cash")
+            meals = rng.random() * 2 * food_per_day
+            for _ in range(int(meals) + (rng.random() < meals % 1)):
+                add(
+                    "expense",
+                    day,
+                    _lognormal(rng, (120 if weekend else 70) * scale, 0.6),
+                    "Food",
+                    "Cash",
+                )
+            if commutes and not weekend and rng.random() < 0.8:
+                add(
+                    "expense",
+                    day,
+                    _lognormal(rng, 45, 0.4),
+                    "Transport",
+                    rng.choice(spend_from),
+                )
+            for category, per_week, median, sigma in DISCRETIONARY:
+                if rng.random() < per_week / 7 * (1.5 if weekend else 0.8):
+                    add(
+                        "expense",
+                        day,
+                        _lognormal(rng, median * scale, sigma),
+                        category,
+                        rng.choice(spend_from),
+                    )
+
+    return {
+        "joined": _at(start, rng) - timedelta(days=1),
+        "show_mascot": rng.random() < 0.8,
+        "accounts": accounts,
+        "net": net,
+        "transactions": transactions,
+    }
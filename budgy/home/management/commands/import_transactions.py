@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from home import importers
+from home.models import Account
+
+
+class Command(BaseCommand):
+    help = "Import transactions for a user from a CSV, OFX or QIF bank statement."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=importers.FORMATS,
+            help="File format (default: guessed from the file extension).",
+        )
+        parser.add_argument(
+            "--account",
+            help="Account name for rows that do not name one (required for OFX/QIF).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=importers.DEFAULT_BATCH_SIZE,
+            help=f"Rows per bulk insert (default: {importers.DEFAULT_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        file_format = options["format"] or importers.guess_format(options["path"])
+        if file_format is None:
+            raise CommandError("Cannot guess the file format, use --format.")
+
+        default_account = None
+        if options["account"]:
+            default_account = Account.objects.filter(
+                user=user, account_name=options["account"]
+            ).first()
+            if default_account is None:
+                raise CommandError(f"Account '{options['account']}' does not exist.")
+
+        try:
+            with open(options["path"], "rb") as binary:
+                rows = importers.parse(importers.text_stream(binary), file_format)
+                result = importers.import_rows(
+                    user, rows, default_account, options["batch_size"]
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+        except importers.ImportFileError as e:
+            raise CommandError(str(e))
+
+        for error in result.errors:
+            self.stdout.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} transactions, skipped {result.skipped}."
+            )
+        )
@@ -0,0 +1,291 @@
+import asyncio
+import random
+import statistics
+import time
+from datetime import date
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+# JSON APIs ที่ dashboard / stats / mascot เรียก (อ่านอย่างเดียว)
+API_PATHS = [
+    "/api/accounts/",
+    "/api/spending/overview/?limit=100",
+    "/api/spending/?mode=monthly&month={year}-{month:02d}&limit=50",
+    "/api/stats/summary/?year={year}&month={month}&type=expense",
+    "/api/stats/yearly/?year={year}",
+    "/api/stats/batch/?from={year}-01&to={year}-12",
+    "/pet/status/",
+]
+# หน้า HTML ของ home/urls.py ที่เปิดด้วย GET ได้ (ต้องเป็น user ที่ login อยู่)
+PAGE_PATHS = [
+    "/{user_id}/home/",
+    "/{user_id}/dashboard/",
+    "/{user_id}/stats/",
+    "/{user_id}/accounts/",
+    "/{user_id}/edit/category/",
+    "/{user_id}/transaction/expense/",
+    "/{user_id}/settings/",
+]
+SUITES = {"api": API_PATHS, "pages": PAGE_PATHS, "all": API_PATHS + PAGE_PATHS}
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a running server with N concurrent keep-alive clients and report "
+        "throughput and p50/p95/p99 latency per endpoint. Clients log in as one "
+        "user, or as the users made by generate_data (--users), and pick "
+        "{year}/{month} in paths at random within --history-years. "
+        "--suite api hits the read-only JSON APIs; --suite all also loads the "
+        "HTML pages of home/urls.py. To compare servers, run it once against "
+        "WSGI (gunicorn budgy.wsgi --workers 4 --threads 8) and once against ASGI "
+        "(ASYNC_JSON_API=True gunicorn budgy.asgi --workers 4 "
+        "-k uvicorn.workers.UvicornWorker). The server must use the same "
+        "database, since the login sessions are created here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "username", nargs="?", help="User whose session the clients use."
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Log in as <prefix>0 .. <prefix>N-1 (from generate_data) "
+            "instead of one user; each client uses one of them.",
+        )
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=500)
+        parser.add_argument(
+            "--duration", type=float, default=30, help="Seconds to run (default: 30)."
+        )
+        parser.add_argument("--suite", choices=sorted(SUITES), default="api")
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Path to request instead of --suite, round-robin per client "
+            "(can be repeated). May use {user_id}, {year} and {month}.",
+        )
+        parser.add_argument(
+            "--history-years",
+            type=int,
+            default=1,
+            help="Years back that {year}/{month} are picked from (default: 1).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Do not send If-None-Match (always get a full 200 response).",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"]:
+            users = list(
+                User.objects.filter(
+                    username__in=[
+                        f"{options['prefix']}{index}"
+                        for index in range(options["users"])
+                    ]
+                ).order_by("id")[: options["concurrency"]]
+            )
+            if not users:
+                raise CommandError(
+                    f"No {options['prefix']}* users, run generate_data first."
+                )
+        elif options["username"]:
+            try:
+                users = [User.objects.get(username=options["username"])]
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['username']}' does not exist.")
+        else:
+            raise CommandError("Give a username or --users.")
+
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("--url must be http://host[:port]")
+
+        # session เดียวต่อ user: client ที่ใช้ user เดียวกันแชร์ cookie กัน
+        sessions = [
+            (user.pk, f"{settings.SESSION_COOKIE_NAME}={self.login(user)}")
+            for user in users
+        ]
+        self.stdout.write(
+            f"{options['concurrency']} clients ({len(sessions)} users) x "
+            f"{options['duration']:g}s against {options['url']} ..."
+        )
+        results = asyncio.run(
+            self.run(
+                url.hostname,
+                url.port or 80,
+                options["paths"] or SUITES[options["suite"]],
+                sessions,
+                options,
+            )
+        )
+        self.report(results, options["duration"])
+
+    def login(self, user):
+        """สร้าง session ที่ login แล้วแบบเดียวกับ django.contrib.auth.login"""
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session.session_key
+
+    # ---------------- clients ----------------
+
+    async def run(self, host, port, paths, sessions, options):
+        deadline = time.monotonic() + options["duration"]
+        results = {"endpoints": {}, "errors": 0}
+        await asyncio.gather(
+            *(
+                self.client(
+                    index,
+                    host,
+                    port,
+                    paths,
+                    sessions[index % len(sessions)],
+                    deadline,
+                    options,
+                    results,
+                )
+                for index in range(options["concurrency"])
+            )
+        )
+        return results
+
+    async def client(
+        self, index, host, port, paths, session, deadline, options, results
+    ):
+        user_id, cookie = session
+        rng = random.Random(f"{options['seed']}:{index}")
+        periods = recent_months(options["history_years"])
+        etags = {}
+        reader = writer = None
+        request_no = index
+        while time.monotonic() < deadline:
+            template = paths[request_no % len(paths)]
+            request_no += 1
+            year, month = rng.choice(periods)
+            path = template.format(user_id=user_id, year=year, month=month)
+            headers = [
+                f"GET {path} HTTP/1.1",
+                f"Host: {host}:{port}",
+                f"Cookie: {cookie}",
+                (
+                    "Accept: application/json"
+                    if path.startswith("/api/")
+                    else "Accept: text/html"
+                ),
+            ]
+            if not options["no_cache"] and path in etags:
+                headers.append(f"If-None-Match: {etags[path]}")
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                writer.write(("\r\n".join(headers) + "\r\n\r\n").encode())
+                await writer.drain()
+                status, response_headers = await self.read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                results["errors"] += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                continue
+
+            # แยกผลตาม template ของ path (ไม่ใช่ค่าที่แทนแล้ว) = ต่อ endpoint
+            endpoint = results["endpoints"].setdefault(
+                template, {"latencies": [], "statuses": {}}
+            )
+            endpoint["latencies"].append(time.perf_counter() - started)
+            endpoint["statuses"][status] = endpoint["statuses"].get(status, 0) + 1
+            if "etag" in response_headers:
+                etags[path] = response_headers["etag"]
+            if response_headers.get("connection", "").lower() == "close":
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    async def read_response(self, reader):
+        """อ่าน response HTTP/1.1 หนึ่งอัน (Content-Length หรือ chunked) คืน (status, headers)"""
+        status = int((await reader.readuntil(b"\r\n")).split()[1])
+        headers = {}
+        while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while size := int((await reader.readuntil(b"\r\n")).strip(), 16):
+                await reader.readexactly(size + 2)
+            await reader.readuntil(b"\r\n")
+        elif "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        return status, headers
+
+    # ---------------- report ----------------
+
+    def report(self, results, duration):
+        endpoints = results["endpoints"]
+        total = [
+            latency
+            for endpoint in endpoints.values()
+            for latency in endpoint["latencies"]
+        ]
+        if len(total) < 2:
+            raise CommandError(
+                f"Not enough successful requests ({results['errors']} errors)."
+            )
+
+        self.stdout.write(
+            f"{'endpoint':<64} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'max ms':>8}  statuses"
+        )
+        for template, endpoint in endpoints.items():
+            self.stdout.write(
+                self.row(template, endpoint["latencies"], endpoint["statuses"])
+            )
+        statuses = {}
+        for endpoint in endpoints.values():
+            for status, count in endpoint["statuses"].items():
+                statuses[status] = statuses.get(status, 0) + count
+        self.stdout.write(self.row("total", total, statuses))
+        self.stdout.write(
+            f"throughput: {len(total) / duration:.1f} req/s, errors: {results['errors']}"
+        )
+
+    def row(self, label, latencies, statuses):
+        latencies = sorted(latencies)
+        # quantiles(n=100) คืน percentile ที่ 1..99 (ต้องมีอย่างน้อย 2 ค่า)
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        else:
+            percentiles = latencies * 99
+        statuses = ", ".join(
+            f"{status}: {count}" for status, count in sorted(statuses.items())
+        )
+        return (
+            f"{label:<64} {len(latencies):>8} {percentiles[49] * 1000:>8.1f} "
+            f"{percentiles[94] * 1000:>8.1f} {percentiles[98] * 1000:>8.1f} "
+            f"{latencies[-1] * 1000:>8.1f}  {statuses}"
+        )
+
+
+def recent_months(years):
+    """(year, month) ของ years ปีล่าสุด ถึงเดือนปัจจุบัน"""
+    today = date.today()
+    return [
+        (year, month)
+        for year in range(today.year - max(years, 1) + 1, today.year + 1)
+        for month in range(1, 13)
+        if (year, month) <= (today.year, today.month)
+    ]
@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q, Sum
+
+from home import money, snapshot, versions
+from home.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        "Check every Account.balance against opening_balance + income - expense "
+        "of its transactions (one grouped query per batch of users)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Set mismatched balances to the value computed from the ledger.",
+        )
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Limit to this username (can be repeated).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of users per grouped query (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        user_ids = list(users.values_list("id", flat=True))
+
+        batch_size = options["batch_size"]
+        checked = 0
+        mismatches = []
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start : start + batch_size]
+            accounts = (
+                Account.objects.filter(user_id__in=batch)
+                .annotate(
+                    income=Sum(
+                        "transactions__amount",
+                        filter=Q(transactions__trans_type="income"),
+                        default=0,
+                    ),
+                    expense=Sum(
+                        "transactions__amount",
+                        filter=Q(transactions__trans_type="expense"),
+                        default=0,
+                    ),
+                )
+                .values_list(
+                    "id", "user_id", "account_name", "balance", "opening_balance",
+                    "income", "expense",
+                )
+                .order_by("id")
+            )
+            for account_id, user_id, name, balance, opening, income, expense in accounts:
+                checked += 1
+                # SQLite รวม DecimalField เป็น float: ปัดกลับเป็นสตางค์ก่อนเทียบ
+                expected = money.to_money(opening + income - expense)
+                if balance != expected:
+                    mismatches.append((account_id, user_id, name, balance, expected))
+
+        for account_id, user_id, name, balance, expected in mismatches:
+            self.stdout.write(
+                f"user={user_id} account={name!r}: "
+                f"balance={balance} ledger={expected}"
+            )
+            if options["fix"]:
+                Account.objects.filter(pk=account_id).update(balance=expected)
+                snapshot.invalidate(user_id)
+                versions.bump(user_id)
+
+        if mismatches and not options["fix"]:
+            raise CommandError(
+                f"{len(mismatches)} of {checked} account balances do not match "
+                "their ledger."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fixed {len(mismatches)} of {checked} account balances."
+                if options["fix"]
+                else f"All {checked} account balances match their ledger."
+            )
+        )
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from home import rollups, snapshot, versions
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild or verify MonthReport/CategoryMonthReport rollups "
+        "for all users (in batches)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare rollups against the raw transactions, do not write.",
+        )
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Limit to this username (can be repeated).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of users per grouped query (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        user_ids = list(users.values_list("id", flat=True))
+
+        batch_size = options["batch_size"]
+        rebuilt = 0
+        mismatches = []
+        category_mismatches = []
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start : start + batch_size]
+            if options["verify"]:
+                mismatches += rollups.verify(batch)
+                category_mismatches += rollups.verify_categories(batch)
+            else:
+                rebuilt += rollups.rebuild(batch)
+                # snapshot / ETag / SSE อ่านยอดจาก rollups: ให้เห็นค่าที่ซ่อมแล้ว
+                for user_id in batch:
+                    snapshot.invalidate(user_id)
+                    versions.bump(user_id)
+
+        if not options["verify"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Rebuilt {rebuilt} month reports for {len(user_ids)} users."
+                )
+            )
+            return
+
+        for user_id, year, month, stored, expected in mismatches:
+            self.stdout.write(
+                f"user={user_id} {year}-{month:02d}: "
+                f"stored={stored} expected={expected}"
+            )
+        for user_id, year, month, trans_type, category, stored, expected in (
+            category_mismatches
+        ):
+            self.stdout.write(
+                f"user={user_id} {year}-{month:02d} {trans_type}/{category}: "
+                f"stored={stored} expected={expected}"
+            )
+        if mismatches or category_mismatches:
+            raise CommandError(
+                f"{len(mismatches)} month reports and "
+                f"{len(category_mismatches)} category reports are out of date."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rollups are consistent for {len(user_ids)} users.")
+        )
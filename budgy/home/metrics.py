@@ -0,0 +1,347 @@
+"""
+Metrics ในรูปแบบ Prometheus text (เปิดดูที่ /metrics)
+
+counter และ histogram เก็บแยกต่อ thread: แต่ละ thread เขียน dict ของตัวเอง
+จึงไม่ต้อง lock ตอน inc()/observe() (lock เฉพาะตอน thread ใหม่ลงทะเบียน
+หรือ thread จบแล้วรวมค่าเข้ากองกลาง) ตอน render() ค่อยรวมทุก thread
+
+หลาย process (gunicorn workers): ตั้ง METRICS_DIR ให้ทุก worker ใช้ directory เดียวกัน
+แต่ละ process เขียนค่ารวมของตัวเองลง <METRICS_DIR>/metrics-<pid>.json
+ทุก METRICS_FLUSH_INTERVAL วินาที (และตอนจบ process) worker ที่ตอบ /metrics
+อ่านไฟล์ของทุก process มารวม ค่าของ worker อื่นจึงช้าได้ไม่เกินหนึ่ง interval
+ควรล้าง directory ก่อน start server (ไฟล์ของ process ที่จบไปแล้วยังถูกรวมอยู่)
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+from functools import wraps
+
+from django.conf import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# วินาที: ครอบคลุมตั้งแต่ cache hit (~ms) ถึง request ที่ hash password / ส่ง email
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _Owner:
+    """อยู่ใน threading.local: ถูกเก็บเมื่อ thread จบ (ใช้ trigger weakref.finalize)"""
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        # RLock: _retire() อาจถูกเรียกจาก GC ระหว่างที่ thread เดียวกันถือ lock อยู่
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._flushed = 0.0
+        self.directory = None
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    # ---------------- ค่าต่อ thread ----------------
+
+    def shard(self):
+        """dict ของ thread ปัจจุบัน: {(name, labels): ค่า}"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            pass
+        shard = self._local.shard = {}
+        owner = self._local.owner = _Owner()
+        with self._lock:
+            self._shards.append(shard)
+        weakref.finalize(owner, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        # thread จบแล้ว (เช่น thread ต่อ request ของ ASGI): ย้ายค่าเข้ากองกลาง
+        with self._lock:
+            self._shards.remove(shard)
+            _merge(self._retired, shard)
+
+    def local_values(self):
+        """ค่ารวมทุก thread ของ process นี้"""
+        with self._lock:
+            shards = list(self._shards)
+            values = _merge({}, self._retired)
+        for shard in shards:
+            # copy() ของ dict ทำเสร็จในครั้งเดียวภายใต้ GIL
+            _merge(values, shard.copy())
+        return values
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+            self._retired.clear()
+
+    # ---------------- หลาย process ----------------
+
+    def _path(self, pid=None):
+        return os.path.join(self.directory, f"metrics-{pid or os.getpid()}.json")
+
+    def flush(self):
+        """เขียนค่าของ process นี้ลง METRICS_DIR (แทนที่ไฟล์แบบ atomic)"""
+        if not self.directory:
+            return
+        self._flushed = time.monotonic()
+        rows = [
+            [name, list(labels), value]
+            for (name, labels), value in self.local_values().items()
+        ]
+        path = self._path()
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as file:
+            json.dump(rows, file)
+        os.replace(temp, path)
+
+    def maybe_flush(self):
+        """เรียกหลังทุก request: flush เมื่อครบ METRICS_FLUSH_INTERVAL"""
+        if (
+            self.directory
+            and time.monotonic() - self._flushed >= settings.METRICS_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def collect(self):
+        """ค่ารวมทุก process (ถ้าตั้ง METRICS_DIR) หรือเฉพาะ process นี้"""
+        values = self.local_values()
+        if not self.directory:
+            return values
+        own = self._path()
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path) as file:
+                    rows = json.load(file)
+            except (OSError, ValueError):
+                # ไฟล์ถูกลบ/ยังเขียนไม่เสร็จ: รอบหน้าค่อยนับ
+                continue
+            _merge(
+                values,
+                {
+                    (name, tuple(labels)): value
+                    for name, labels, value in rows
+                    if name in self.metrics
+                },
+            )
+        return values
+
+    # ---------------- exposition ----------------
+
+    def render(self):
+        """ข้อความรูปแบบ Prometheus text exposition 0.0.4"""
+        by_metric = {}
+        for (name, labels), value in self.collect().items():
+            by_metric.setdefault(name, []).append((labels, value))
+        lines = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render(sorted(by_metric.get(name, []))))
+        return "\n".join(lines) + "\n"
+
+
+def _merge(into, values):
+    for key, value in values.items():
+        current = into.get(key)
+        if current is None:
+            into[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            into[key] = [a + b for a, b in zip(current, value)]
+        else:
+            into[key] = current + value
+    return into
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def _key(self, labelvalues):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return (self.name, tuple(str(value) for value in labelvalues))
+
+    def header(self):
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        shard = self.registry.shard()
+        key = self._key(labelvalues)
+        shard[key] = shard.get(key, 0) + amount
+
+    def render(self, samples):
+        lines = self.header()
+        for labels, value in samples:
+            lines.append(
+                f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            )
+        return lines
+
+
+class Histogram(Metric):
+    """เก็บเป็น [จำนวนต่อ bucket..., sum, count] (bucket ไม่สะสม รวมข้าม thread ได้)"""
+
+    type = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, **kw
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, **kw)
+
+    def observe(self, value, *labelvalues):
+        shard = self.registry.shard()
+        key = self._key(labelvalues)
+        row = shard.get(key)
+        if row is None:
+            row = shard[key] = [0] * (len(self.buckets) + 3)
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        row[index] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def time(self, *labelvalues):
+        """จับเวลาเป็นวินาที ใช้เป็น with block หรือ decorator ก็ได้"""
+        return _Timer(self, labelvalues)
+
+    def render(self, samples):
+        lines = self.header()
+        for labels, row in samples:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), row):
+                cumulative += count
+                le = [("le", _number(float(bound)))]
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            suffix = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_number(float(row[-2]))}")
+            lines.append(f"{self.name}_count{suffix} {row[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+
+    def __call__(self, func):
+        # decorator: timer ใหม่ทุกครั้งที่เรียก (หลาย thread เรียกพร้อมกันได้)
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.histogram, self.labelvalues):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+REGISTRY = Registry()
+
+
+def configure():
+    """อ่าน METRICS_DIR จาก settings (เรียกจาก HomeConfig.ready)"""
+    REGISTRY.directory = settings.METRICS_DIR or None
+    if REGISTRY.directory:
+        os.makedirs(REGISTRY.directory, exist_ok=True)
+        atexit.register(REGISTRY.flush)
+
+
+# ---------------- metrics ที่ใช้ร่วมกัน ----------------
+
+HTTP_REQUESTS = Counter(
+    "budgy_http_requests_total",
+    "HTTP requests by URL name, method and status code.",
+    ["view", "method", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "budgy_http_request_duration_seconds",
+    "Time until the response is returned, by URL name and method.",
+    ["view", "method"],
+)
+SNAPSHOT_LOOKUPS = Counter(
+    "budgy_finance_snapshot_lookups_total",
+    "Finance snapshot cache lookups by result (hit or miss).",
+    ["result"],
+)
+SNAPSHOT_LATENCY = Histogram(
+    "budgy_finance_snapshot_duration_seconds",
+    "Finance snapshot lookup time by result (hit or miss).",
+    ["result"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+LEDGER_LATENCY = Histogram(
+    "budgy_ledger_write_duration_seconds",
+    "Ledger write time including commit, by operation "
+    "(income, expense, transfer or import).",
+    ["operation"],
+)
+IMPORT_ROWS = Counter(
+    "budgy_import_rows_total",
+    "Bulk import statement rows by result (created or skipped).",
+    ["result"],
+)
+EMAIL_REQUESTS = Counter(
+    "budgy_email_requests_total",
+    "MailerSend API calls by endpoint (email, bulk or bulk_status) and result.",
+    ["endpoint", "result"],
+)
+EMAIL_LATENCY = Histogram(
+    "budgy_email_request_duration_seconds",
+    "MailerSend API call time by endpoint (email, bulk or bulk_status).",
+    ["endpoint"],
+)
@@ -0,0 +1,193 @@
+"""
+SQL profiling ต่อ request (เปิดด้วย SQL_PROFILING=True)
+
+นับ query, เวลา DB รวม, statement ที่ช้าที่สุด และเวลาของ request ทั้งหมด แล้ว
+- ใส่ header Server-Timing (ดูได้ใน DevTools > Network > Timing)
+- log หนึ่งบรรทัดต่อ request เป็น JSON (logger "home.middleware")
+- request ที่ช้ากว่า SQL_PROFILING_SLOW_MS: สุ่มตาม SQL_PROFILING_SAMPLE_RATE
+  แล้ว log SQL ทั้งหมดพร้อม params และเวลา (logger "home.middleware.slow")
+
+จับ query ด้วย connection.execute_wrappers จึงไม่ต้องเปิด DEBUG
+ถ้าปิดอยู่ middleware จะ raise MiddlewareNotUsed ตอน start: Django ตัดออกจาก chain
+ไม่มี overhead ต่อ request เลย
+
+query ที่เกิดระหว่าง stream ของ StreamingHttpResponse (เช่น SSE) ไม่ถูกนับ
+
+MetricsMiddleware (ท้ายไฟล์) นับ request/latency ต่อ view ลง home/metrics.py
+"""
+
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(__name__ + ".slow")
+
+# ความยาวของ SQL ใน log บรรทัดปกติ (slow log เก็บเต็ม)
+SQL_PREVIEW = 200
+
+
+# recorder ของ request ปัจจุบัน: contextvar ถูก copy เข้า thread ของ sync_to_async
+# query ใน async views จึงถูกนับด้วย
+current = ContextVar("query_recorder", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper ที่ติดถาวรบน connection: จดเฉพาะตอนมี recorder"""
+    queries = current.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.append(
+            {
+                "alias": context["connection"].alias,
+                "sql": sql,
+                "params": params,
+                "many": many,
+                "ms": (time.perf_counter() - started) * 1000,
+            }
+        )
+
+
+def install():
+    # connection เป็นของแต่ละ thread (ASGI ใช้ thread ใหม่ต่อ request)
+    for connection in connections.all():
+        if record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(record_query)
+
+
+class QueryProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = []
+        started = time.perf_counter()
+        token = current.set(queries)
+        try:
+            install()
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        self.finish(request, response, queries, started)
+        return response
+
+    async def __acall__(self, request):
+        queries = []
+        started = time.perf_counter()
+        token = current.set(queries)
+        try:
+            # ติด wrapper ใน thread เดียวกับที่ sync_to_async ของ view จะใช้
+            await sync_to_async(install)()
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        self.finish(request, response, queries, started)
+        return response
+
+    def finish(self, request, response, queries, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = sum(query["ms"] for query in queries)
+        slowest = sorted(queries, key=lambda query: query["ms"], reverse=True)
+        statements = [query["sql"] for query in queries]
+
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{len(queries)} queries", '
+            f"total;dur={total_ms:.1f}"
+        )
+
+        match = request.resolver_match
+        line = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "queries": len(queries),
+            # statement ซ้ำกัน (SQL เดียวกัน ต่าง params) มักเป็น N+1
+            "duplicates": len(statements) - len(set(statements)),
+            "db_ms": round(db_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "slowest": [
+                {"ms": round(query["ms"], 2), "sql": query["sql"][:SQL_PREVIEW]}
+                for query in slowest[: settings.SQL_PROFILING_TOP]
+            ],
+        }
+        logger.info(json.dumps(line))
+
+        if (
+            total_ms >= settings.SQL_PROFILING_SLOW_MS
+            and random.random() < settings.SQL_PROFILING_SAMPLE_RATE
+        ):
+            line["sql"] = [
+                {
+                    "alias": query["alias"],
+                    "ms": round(query["ms"], 2),
+                    "sql": query["sql"],
+                    "params": repr(query["params"]),
+                    "many": query["many"],
+                }
+                for query in queries
+            ]
+            del line["slowest"]
+            slow_logger.warning(json.dumps(line))
+
+
+class MetricsMiddleware:
+    """
+    นับ request และเวลาตอบต่อ URL name (home/metrics.py) ปิดด้วย METRICS=False
+    ใช้ URL name เป็น label (ไม่ใช่ path) จำนวน series จึงไม่โตตาม user_id
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    def observe(self, request, response, started):
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        metrics.HTTP_LATENCY.observe(
+            time.perf_counter() - started, view, request.method
+        )
+        metrics.HTTP_REQUESTS.inc(view, request.method, response.status_code)
+        metrics.REGISTRY.maybe_flush()
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:59
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def clear_month_reports(apps, schema_editor):
+    # ตารางนี้ยังไม่เคยถูกเขียนมาก่อน ล้างทิ้งก่อนใส่ unique constraint
+    apps.get_model('home', 'MonthReport').objects.all().delete()
+
+
+def build_month_reports(apps, schema_editor):
+    MonthReport = apps.get_model('home', 'MonthReport')
+    Income = apps.get_model('home', 'Income')
+    Expense = apps.get_model('home', 'Expense')
+
+    totals = {}
+    for model, field in ((Income, 'income_total'), (Expense, 'expense_total')):
+        rows = (
+            model.objects.annotate(period=TruncMonth('date'))
+            .values('user_id', 'period')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for row in rows:
+            key = (row['user_id'], row['period'].year, row['period'].month)
+            totals.setdefault(key, {'income_total': 0, 'expense_total': 0})
+            totals[key][field] = row['total'] or 0
+
+    MonthReport.objects.bulk_create(
+        [
+            MonthReport(user_id=user_id, year=year, month=month, **values)
+            for (user_id, year, month), values in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_profile_show_mascot_alter_profile_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_month_reports, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='monthreport',
+            name='expense_total',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='monthreport',
+            name='income_total',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='monthreport',
+            constraint=models.UniqueConstraint(fields=('user', 'year', 'month'), name='unique_user_month_report'),
+        ),
+        migrations.RunPython(build_month_reports, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_category_reports(apps, schema_editor):
+    CategoryMonthReport = apps.get_model('home', 'CategoryMonthReport')
+    Income = apps.get_model('home', 'Income')
+    Expense = apps.get_model('home', 'Expense')
+
+    reports = []
+    for model, trans_type in ((Income, 'income'), (Expense, 'expense')):
+        rows = (
+            model.objects.annotate(period=TruncMonth('date'))
+            .values('user_id', 'period', 'category_trans')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        reports += [
+            CategoryMonthReport(
+                user_id=row['user_id'],
+                year=row['period'].year,
+                month=row['period'].month,
+                trans_type=trans_type,
+                category_trans=row['category_trans'],
+                total=row['total'] or 0,
+            )
+            for row in rows
+        ]
+    CategoryMonthReport.objects.bulk_create(reports, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_month_report_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMonthReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.IntegerField()),
+                ('year', models.IntegerField()),
+                ('trans_type', models.CharField(max_length=50)),
+                ('category_trans', models.CharField(max_length=100)),
+                ('total', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'year', 'month', 'trans_type', 'category_trans'), name='unique_user_month_category_report')],
+            },
+        ),
+        migrations.RunPython(build_category_reports, migrations.RunPython.noop),
+    ]
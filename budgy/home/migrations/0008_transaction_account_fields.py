@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_child_accounts(apps, schema_editor):
+    Transaction = apps.get_model('home', 'Transaction')
+    Income = apps.get_model('home', 'Income')
+    Expense = apps.get_model('home', 'Expense')
+    Category = apps.get_model('home', 'Category')
+
+    # ย้าย to_account / from_account จากตารางลูกมาไว้ในตาราง Transaction
+    # และให้ trans_type ตรงกับชนิดของตารางลูกเสมอ
+    for model, trans_type, field in (
+        (Income, 'income', 'to_account'),
+        (Expense, 'expense', 'from_account'),
+    ):
+        child = model.objects.filter(transaction_ptr_id=OuterRef('pk'))
+        Transaction.objects.filter(pk__in=model.objects.values('pk')).update(
+            trans_type=trans_type,
+            account=Subquery(child.values(field)[:1]),
+        )
+
+    # การโอนเดิมถูกบันทึกเป็น Expense แล้วตามด้วย Income (trans_id ถัดไป)
+    # ที่ยอด/วันที่/category เดียวกัน และ category เป็นชนิด transfer
+    transfer_categories = set(
+        Category.objects.filter(trans_type='transfer').values_list(
+            'user_id', 'category_name'
+        )
+    )
+    expenses = Expense.objects.filter(
+        category_trans__in={name for _, name in transfer_categories}
+    ).values_list('pk', 'user_id', 'date', 'amount', 'category_trans', 'from_account_id')
+    for pk, user_id, date, amount, category, from_account_id in expenses.iterator():
+        if (user_id, category) not in transfer_categories:
+            continue
+        to_account_id = (
+            Income.objects.filter(
+                pk=pk + 1,
+                user_id=user_id,
+                date=date,
+                amount=amount,
+                category_trans=category,
+            )
+            .values_list('to_account_id', flat=True)
+            .first()
+        )
+        if to_account_id is None:
+            continue
+        Transaction.objects.filter(pk=pk).update(counter_account_id=to_account_id)
+        Transaction.objects.filter(pk=pk + 1).update(counter_account_id=from_account_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_transaction_user_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='account',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='home.account'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='counter_account',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='counter_transactions', to='home.account'),
+        ),
+        migrations.RunPython(copy_child_accounts, migrations.RunPython.noop),
+    ]
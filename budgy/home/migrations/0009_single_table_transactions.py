@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:13
+
+from django.db import migrations
+
+
+def restore_child_tables(apps, schema_editor):
+    # ย้อน migration: เติมตารางลูก Income/Expense กลับจาก Transaction.account
+    Transaction = apps.get_model('home', 'Transaction')
+    quote = schema_editor.quote_name
+    for model_name, trans_type, field in (
+        ('Income', 'income', 'to_account_id'),
+        ('Expense', 'expense', 'from_account_id'),
+    ):
+        model = apps.get_model('home', model_name)
+        schema_editor.execute(
+            'INSERT INTO %s (%s, %s) SELECT %s, %s FROM %s WHERE %s = %%s' % (
+                quote(model._meta.db_table),
+                quote('transaction_ptr_id'),
+                quote(field),
+                quote('trans_id'),
+                quote('account_id'),
+                quote(Transaction._meta.db_table),
+                quote('trans_type'),
+            ),
+            params=[trans_type],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0008_transaction_account_fields'),
+    ]
+
+    operations = [
+        # ข้อมูลถูกคัดลอกไปที่ Transaction แล้วใน 0008 (ขาไปไม่ต้องทำอะไร)
+        migrations.RunPython(migrations.RunPython.noop, restore_child_tables),
+        migrations.DeleteModel(
+            name='Expense',
+        ),
+        migrations.DeleteModel(
+            name='Income',
+        ),
+        migrations.CreateModel(
+            name='Expense',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('home.transaction',),
+        ),
+        migrations.CreateModel(
+            name='Income',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('home.transaction',),
+        ),
+    ]
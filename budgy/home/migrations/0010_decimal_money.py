@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:23
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_opening_balances(apps, schema_editor):
+    # opening_balance = balance ปัจจุบัน - (รายรับ - รายจ่าย) ของบัญชีนั้น
+    Account = apps.get_model('home', 'Account')
+    Transaction = apps.get_model('home', 'Transaction')
+
+    Account.objects.update(opening_balance=F('balance'))
+    nets = {}
+    rows = (
+        Transaction.objects.filter(account__isnull=False)
+        .values('account_id', 'trans_type')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for row in rows:
+        sign = 1 if row['trans_type'] == 'income' else -1
+        nets[row['account_id']] = nets.get(row['account_id'], 0) + sign * row['total']
+    for account_id, net in nets.items():
+        if net:
+            Account.objects.filter(pk=account_id).update(
+                opening_balance=F('opening_balance') - net
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0009_single_table_transactions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='categorymonthreport',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='monthreport',
+            name='expense_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='monthreport',
+            name='income_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.RunPython(backfill_opening_balances, migrations.RunPython.noop),
+    ]
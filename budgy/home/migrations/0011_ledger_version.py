@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_versions(apps, schema_editor):
+    # ทุก user เริ่มที่ version 1 (ETag ของ client เก่าจะไม่ตรงอีก)
+    User = apps.get_model('auth', 'User')
+    LedgerVersion = apps.get_model('home', 'LedgerVersion')
+    now = timezone.now()
+    LedgerVersion.objects.bulk_create(
+        [
+            LedgerVersion(user_id=pk, version=1, updated_at=now)
+            for pk in User.objects.values_list('pk', flat=True).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('home', '0010_decimal_money'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
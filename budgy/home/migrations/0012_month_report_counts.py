@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:20
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def count_transactions(apps, schema_editor):
+    # นับรายการเดิมต่อเดือน (เดือนที่มีแต่รายการยอด 0 อาจยังไม่มีแถว: สร้างใหม่)
+    MonthReport = apps.get_model('home', 'MonthReport')
+    Transaction = apps.get_model('home', 'Transaction')
+
+    counts = {}
+    rows = (
+        Transaction.objects.filter(trans_type__in=('income', 'expense'))
+        .annotate(period=TruncMonth('date'))
+        .values('user_id', 'period', 'trans_type')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for row in rows:
+        key = (row['user_id'], row['period'].year, row['period'].month)
+        counts.setdefault(key, {'income_count': 0, 'expense_count': 0})
+        counts[key][f"{row['trans_type']}_count"] = row['count']
+
+    reports = []
+    for report in MonthReport.objects.iterator():
+        values = counts.pop((report.user_id, report.year, report.month), None)
+        if values:
+            report.income_count = values['income_count']
+            report.expense_count = values['expense_count']
+            reports.append(report)
+    MonthReport.objects.bulk_update(
+        reports, ['income_count', 'expense_count'], batch_size=1000
+    )
+    MonthReport.objects.bulk_create(
+        [
+            MonthReport(user_id=user_id, year=year, month=month, **values)
+            for (user_id, year, month), values in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0011_ledger_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthreport',
+            name='expense_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthreport',
+            name='income_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_transactions, migrations.RunPython.noop),
+    ]
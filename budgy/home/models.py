@@ -23,8 +23,38 @@ class MonthReport(models.Model):
     report_id = models.AutoField(primary_key=True)
     month = models.IntegerField()
     year = models.IntegerField()
-    income_total = models.FloatField()
-    expense_total = models.FloatField()
+    income_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # จำนวนรายการของเดือนนั้น: > 0 คือเดือนที่มีรายการ (dropdown ของหน้า Stats)
+    income_count = models.IntegerField(default=0)
+    expense_count = models.IntegerField(default=0)
+
+    class Meta:
+        # หนึ่งแถวต่อ user ต่อเดือน ถูกอัปเดตโดย home/rollups.py
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "year", "month"], name="unique_user_month_report"
+            )
+        ]
+
+
+# Category Month Report Model
+# ยอดรวมต่อ user ต่อเดือนต่อ category (ใช้กับ Pie Chart ในหน้า Stats)
+class CategoryMonthReport(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.IntegerField()
+    year = models.IntegerField()
+    trans_type = models.CharField(max_length=50)
+    category_trans = models.CharField(max_length=100)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "year", "month", "trans_type", "category_trans"],
+                name="unique_user_month_category_report",
+            )
+        ]
 
 
 # Account Model
@@ -32,7 +62,10 @@ class Account(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     account_name = models.CharField(max_length=100)
     type_acc = models.CharField(max_length=50)
-    balance = models.FloatField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    # ยอดตอนสร้างบัญชี: balance = opening_balance + รายรับ - รายจ่ายของบัญชีนี้เสมอ
+    # (ตรวจด้วย python manage.py reconcile_balances)
+    opening_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
     class Meta:
         constraints = [
@@ -43,24 +76,102 @@ class Account(models.Model):
 
 
 # Transaction Model
+# ทุกรายการอยู่ในตารางเดียว แยกชนิดด้วย trans_type ("income" / "expense")
 class Transaction(models.Model):
+    # proxy model (Income / Expense) กำหนดชนิดของตัวเอง
+    TRANS_TYPE = None
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     trans_id = models.AutoField(primary_key=True)
     trans_type = models.CharField(max_length=50)
     date = models.DateTimeField()
-    amount = models.FloatField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
     # category = models.ForeignKey(Category, on_delete=models.DO_NOTHING)
     category_trans = models.CharField(max_length=100)
+    # บัญชีที่เงินเข้า (income) หรือเงินออก (expense)
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="transactions",
+    )
+    # บัญชีอีกฝั่งของการโอน (transfer) ถ้าไม่ใช่การโอนจะเป็น null
+    counter_account = models.ForeignKey(
+        Account,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="counter_transactions",
+    )
+
+    class Meta:
+        # ทุกหน้า filter ด้วย user + ช่วงวันที่ (ดู home/periods.py)
+        indexes = [
+            models.Index(fields=["user", "date"], name="transaction_user_date_idx"),
+            models.Index(
+                fields=["user", "trans_type", "date"],
+                name="transaction_user_type_date_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.TRANS_TYPE:
+            self.trans_type = self.TRANS_TYPE
+        super().save(*args, **kwargs)
 
 
-# Transaction Income model
+# Manager ของ Income / Expense: คืนเฉพาะรายการตาม TRANS_TYPE ของ model
+class TransactionTypeManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(trans_type=self.model.TRANS_TYPE)
+
+
+# Transaction Income model (proxy: อยู่ในตาราง Transaction)
 class Income(Transaction):
-    to_account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    TRANS_TYPE = "income"
+
+    objects = TransactionTypeManager()
+
+    class Meta:
+        proxy = True
 
+    # ชื่อเดิมจากสมัยที่ Income เป็นตารางลูก
+    @property
+    def to_account(self):
+        return self.account
 
-# Transaction Expense model
+    @to_account.setter
+    def to_account(self, value):
+        self.account = value
+
+
+# Transaction Expense model (proxy: อยู่ในตาราง Transaction)
 class Expense(Transaction):
-    from_account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    TRANS_TYPE = "expense"
+
+    objects = TransactionTypeManager()
+
+    class Meta:
+        proxy = True
+
+    # ชื่อเดิมจากสมัยที่ Expense เป็นตารางลูก
+    @property
+    def from_account(self):
+        return self.account
+
+    @from_account.setter
+    def from_account(self, value):
+        self.account = value
+
+
+# Ledger Version Model
+# ขยับทุกครั้งที่ Transaction / Account / Category ของ user เปลี่ยน (ดู home/versions.py)
+# ใช้ทำ ETag / Last-Modified ของ JSON APIs
+class LedgerVersion(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
 
 
 # Mascot status on/off
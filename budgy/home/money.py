@@ -0,0 +1,39 @@
+"""
+จำนวนเงิน: เก็บเป็น Decimal (DecimalField 2 ตำแหน่ง) ตลอดทาง
+
+- to_money(): แปลง input (form / CSV / ตัวเลข) เป็น Decimal 2 ตำแหน่ง
+- as_number(): แปลงเป็น float เฉพาะตอนส่งออก JSON
+  (DjangoJSONEncoder แปลง Decimal เป็น string ซึ่ง JS ใช้ .toFixed ไม่ได้)
+- percent(): สัดส่วนเป็น % (คำนวณแบบ Decimal แล้วคืน float)
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+MAX_DIGITS = 14
+DECIMAL_PLACES = 2
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+
+
+def to_money(value):
+    """คืน Decimal ปัดเป็น 2 ตำแหน่ง หรือ raise ValueError ถ้าไม่ใช่ตัวเลขที่ใช้ได้"""
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        amount = Decimal(str(value).strip()).quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite() or len(amount.as_tuple().digits) > MAX_DIGITS:
+        raise ValueError(f"Invalid amount: {value!r}")
+    return amount
+
+
+def as_number(value):
+    """Decimal/ตัวเลข -> float (ปัด 2 ตำแหน่ง) สำหรับ JSON"""
+    return float(Decimal(value or 0).quantize(CENT, rounding=ROUND_HALF_UP))
+
+
+def percent(part, whole):
+    """part / whole * 100 ปัด 2 ตำแหน่ง (whole ต้องไม่เป็น 0)"""
+    value = Decimal(part) / Decimal(whole) * 100
+    return float(value.quantize(CENT, rounding=ROUND_HALF_UP))
@@ -0,0 +1,83 @@
+"""
+Keyset pagination บน (date, trans_id) สำหรับรายการที่เรียงจากใหม่ไปเก่า
+
+ใช้ cursor แทน OFFSET: หน้าถัดไปคือ "รายการที่เก่ากว่าแถวสุดท้ายของหน้านี้"
+    WHERE date < d OR (date = d AND trans_id < id)
+ทุกหน้าจึงอ่านแค่ limit แถวจาก index (user, date) ไม่ว่าจะเลื่อนไปลึกแค่ไหน
+
+cursor เป็น string ทึบ (base64 ของ "date|trans_id") ให้ client ส่งกลับมาตามเดิม
+"""
+
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(date, trans_id):
+    raw = f"{date.isoformat()}|{trans_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """คืน (date, trans_id) หรือ raise InvalidCursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_str, trans_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        date = parse_datetime(date_str)
+        trans_id = int(trans_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if date is None:
+        raise InvalidCursor(cursor)
+    return date, trans_id
+
+
+def parse_limit(value):
+    """limit จาก query string (ค่าเริ่มต้น DEFAULT_LIMIT, สูงสุด MAX_LIMIT)"""
+    if not value:
+        return DEFAULT_LIMIT
+    limit = int(value)
+    if limit < 1:
+        raise ValueError(value)
+    return min(limit, MAX_LIMIT)
+
+
+def _page_query(queryset, cursor, limit):
+    if cursor:
+        date, trans_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(date__lt=date) | Q(date=date, trans_id__lt=trans_id))
+    # ดึงเกินมา 1 แถวเพื่อรู้ว่ายังมีหน้าถัดไปหรือไม่
+    return queryset.order_by("-date", "-trans_id")[: limit + 1]
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    คืน (rows, next_cursor) ของหน้าถัดจาก cursor
+    queryset ต้องเป็น .values() ที่มี "date" และ "trans_id"
+    next_cursor เป็น None เมื่อถึงหน้าสุดท้าย
+    """
+    rows = list(_page_query(queryset, cursor, limit))
+    return _split_page(rows, limit)
+
+
+async def akeyset_page(queryset, cursor=None, limit=DEFAULT_LIMIT):
+    """keyset_page() ด้วย async ORM"""
+    rows = [row async for row in _page_query(queryset, cursor, limit)]
+    return _split_page(rows, limit)
+
+
+def _split_page(rows, limit):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last["date"], last["trans_id"])
@@ -0,0 +1,74 @@
+"""
+ช่วงเวลาแบบ half-open [start, end) สำหรับ filter คอลัมน์ Transaction.date
+
+ใช้แทน date__year / date__month / date__date เพราะการดึงปี/เดือนออกจากคอลัมน์
+ทำให้ DB ใช้ index (user, date) และ (user, trans_type, date) ไม่ได้
+ส่วน date__gte / date__lt เป็น range scan บน index ได้ตรง ๆ
+ขอบเขตคำนวณตาม timezone ปัจจุบัน (เหมือนกับ lookup __year/__month ของ Django)
+"""
+
+from datetime import MAXYEAR, MINYEAR, datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+# ปีที่รับจาก query string: เว้นขอบไว้หนึ่งปีให้ end bound (ปีถัดไป) และการแปลง timezone
+MIN_YEAR = MINYEAR + 1
+MAX_YEAR = MAXYEAR - 1
+
+
+def _aware(value):
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def day_range(day):
+    start = datetime.combine(day, time.min)
+    return _aware(start), _aware(start + timedelta(days=1))
+
+
+def month_range(year, month):
+    start = datetime(year, month, 1)
+    if month == 12:
+        end = datetime(year + 1, 1, 1)
+    else:
+        end = datetime(year, month + 1, 1)
+    return _aware(start), _aware(end)
+
+
+def year_range(first_year, last_year=None):
+    last_year = first_year if last_year is None else last_year
+    return _aware(datetime(first_year, 1, 1)), _aware(datetime(last_year + 1, 1, 1))
+
+
+def current_month():
+    """(year, month) ปัจจุบันตาม timezone ปัจจุบัน (นาฬิกาเดียวกับ rollups.period_of)"""
+    now = timezone.localtime() if settings.USE_TZ else datetime.now()
+    return now.year, now.month
+
+
+def parse_year(value):
+    """ปีจาก "YYYY" หรือ raise ValueError"""
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid year")
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError("Invalid year")
+    return year
+
+
+def parse_month(value):
+    """(year, month) จาก "YYYY-MM" หรือ raise ValueError"""
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid month")
+    if not (MIN_YEAR <= year <= MAX_YEAR and 1 <= month <= 12):
+        raise ValueError("Invalid month")
+    return year, month
+
+
+def date_filter(bounds, field="date"):
+    """แปลง (start, end) เป็น kwargs สำหรับ .filter()"""
+    start, end = bounds
+    return {f"{field}__gte": start, f"{field}__lt": end}
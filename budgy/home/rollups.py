@@ -0,0 +1,389 @@
+"""
+Monthly rollups: เก็บยอดรวมที่คำนวณไว้แล้วของแต่ละ user ต่อเดือน
+
+- MonthReport: ยอดและจำนวนรายการรายรับ/รายจ่ายต่อเดือน (home, mascot, Statistics)
+  เดือนที่จำนวนรายการ > 0 คือเดือนที่มีรายการ (active_months() ใช้กับ dropdown)
+- CategoryMonthReport: ยอดต่อ category ต่อเดือน (Pie Chart / Compare)
+
+ทุกครั้งที่รายการ (Transaction ชนิด income/expense) ถูกสร้าง แก้ไข หรือลบ signals ใน home/signals.py
+จะเรียก record() เพื่อปรับยอดของเดือนนั้นแบบ incremental (F() expression)
+หน้าเว็บจึงอ่านยอดรวมจากไม่กี่แถวแทนการ Sum รายการทั้งหมดทุกครั้ง
+
+rebuild() / verify() ใช้คำนวณใหม่จากรายการจริงแบบ grouped query
+(ดู management command: python manage.py rollups)
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import money
+from .models import CategoryMonthReport, MonthReport, Transaction
+
+
+# ชนิดรายการที่นับเข้า rollups
+TRANS_TYPES = ("income", "expense")
+
+
+def period_of(value):
+    """คืน (year, month) ของวันที่ของรายการ ตาม timezone ปัจจุบัน"""
+    value = Transaction._meta.get_field("date").to_python(value)
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.year, value.month
+
+
+def _upsert(model, lookup, deltas, create=True):
+    """
+    บวก deltas เข้าแถวของ model ที่ตรงกับ lookup (สร้างแถวใหม่ถ้ายังไม่มี)
+    create=False ใช้ตอนลบ (แถวต้องมีอยู่แล้ว ไม่ต้องสร้างใหม่)
+    """
+    if not any(deltas.values()):
+        return
+
+    rows = model.objects.filter(**lookup)
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(**increments) or not create:
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # request อื่นสร้างแถวนี้ไปก่อนแล้ว
+        rows.update(**increments)
+
+
+def apply(
+    user_id,
+    year,
+    month,
+    income=0,
+    expense=0,
+    income_count=0,
+    expense_count=0,
+    create=True,
+):
+    """บวกยอดและจำนวนรายการเข้า MonthReport ของเดือนนั้น"""
+    _upsert(
+        MonthReport,
+        {"user_id": user_id, "year": year, "month": month},
+        {
+            "income_total": income,
+            "expense_total": expense,
+            "income_count": income_count,
+            "expense_count": expense_count,
+        },
+        create,
+    )
+
+
+def apply_category(user_id, year, month, trans_type, category, amount, create=True):
+    """บวกยอดเข้า CategoryMonthReport ของ category นั้นในเดือนนั้น"""
+    _upsert(
+        CategoryMonthReport,
+        {
+            "user_id": user_id,
+            "year": year,
+            "month": month,
+            "trans_type": trans_type,
+            "category_trans": category,
+        },
+        {"total": amount},
+        create,
+    )
+
+
+def record(user_id, date, trans_type, category, amount, create=True, count=1):
+    """
+    ปรับทุก rollup ตามรายการหนึ่งรายการ
+    หักรายการออก: amount ติดลบและ count=-1
+    ต้องถูกเรียกใน transaction เดียวกับการเขียนรายการ
+    """
+    year, month = period_of(date)
+    if trans_type == "income":
+        apply(user_id, year, month, income=amount, income_count=count, create=create)
+    else:
+        apply(user_id, year, month, expense=amount, expense_count=count, create=create)
+    apply_category(user_id, year, month, trans_type, category, amount, create)
+
+
+def record_batch(user_id, totals):
+    """
+    ปรับ rollups จากยอดที่รวมไว้แล้วของหลายรายการ (ใช้กับ bulk_create ที่ไม่ส่ง signal)
+    totals: {(year, month, trans_type, category): (amount, จำนวนรายการ)}
+    """
+    months = {}
+    for (year, month, trans_type, category), (amount, count) in totals.items():
+        row = months.setdefault((year, month), [0, 0, 0, 0])
+        index = 0 if trans_type == "income" else 1
+        row[index] += amount
+        row[index + 2] += count
+        apply_category(user_id, year, month, trans_type, category, amount)
+    for (year, month), (income, expense, income_count, expense_count) in months.items():
+        apply(
+            user_id,
+            year,
+            month,
+            income=income,
+            expense=expense,
+            income_count=income_count,
+            expense_count=expense_count,
+        )
+
+
+# ---------------- อ่านยอด (sync และ async ของ query เดียวกัน) ----------------
+
+
+def _month_query(user, year, month):
+    return MonthReport.objects.filter(user=user, year=year, month=month).values_list(
+        "income_total", "expense_total"
+    )
+
+
+def month_totals(user, year, month):
+    """คืน (income_total, expense_total) ของเดือนที่ระบุ"""
+    return _month_query(user, year, month).first() or (0, 0)
+
+
+async def amonth_totals(user, year, month):
+    return await _month_query(user, year, month).afirst() or (0, 0)
+
+
+def _year_query(user, first_year, last_year):
+    return MonthReport.objects.filter(
+        user=user, year__gte=first_year, year__lte=last_year
+    ).values_list("year", "month", "income_total", "expense_total")
+
+
+def _year_totals(reports, first_year, last_year):
+    years = {
+        y: {"income": [0] * 12, "expense": [0] * 12}
+        for y in range(first_year, last_year + 1)
+    }
+    for year, month, income_total, expense_total in reports:
+        years[year]["income"][month - 1] = income_total
+        years[year]["expense"][month - 1] = expense_total
+    return years
+
+
+def year_totals(user, first_year, last_year):
+    """คืน {year: {"income": [12 เดือน], "expense": [12 เดือน]}}"""
+    reports = _year_query(user, first_year, last_year)
+    return _year_totals(reports, first_year, last_year)
+
+
+async def ayear_totals(user, first_year, last_year):
+    reports = [row async for row in _year_query(user, first_year, last_year)]
+    return _year_totals(reports, first_year, last_year)
+
+
+def active_months(user):
+    """
+    [(year, month, income_count, expense_count)] ของเดือนที่มีรายการ เรียงจากล่าสุด
+    อ่านจาก MonthReport (ไม่เกิน 12 แถวต่อปี) แทน DISTINCT บนรายการทั้งหมด
+    """
+    return list(
+        MonthReport.objects.filter(user=user)
+        .filter(Q(income_count__gt=0) | Q(expense_count__gt=0))
+        .order_by("-year", "-month")
+        .values_list("year", "month", "income_count", "expense_count")
+    )
+
+
+def _category_query(user, year, month, trans_type):
+    return (
+        CategoryMonthReport.objects.filter(
+            user=user, year=year, month=month, trans_type=trans_type
+        )
+        .exclude(total=0)
+        .order_by("-total")
+        .values_list("category_trans", "total")
+    )
+
+
+def category_totals(user, year, month, trans_type):
+    """คืน [(category_trans, total), ...] ของเดือนนั้น เรียงจากยอดมากไปน้อย"""
+    return list(_category_query(user, year, month, trans_type))
+
+
+async def acategory_totals(user, year, month, trans_type):
+    return [row async for row in _category_query(user, year, month, trans_type)]
+
+
+def _periods_query(user, periods):
+    condition = Q()
+    for year, month, trans_type in set(periods):
+        condition |= Q(year=year, month=month, trans_type=trans_type)
+    return (
+        CategoryMonthReport.objects.filter(condition, user=user)
+        .exclude(total=0)
+        .order_by("-total")
+        .values_list("year", "month", "trans_type", "category_trans", "total")
+    )
+
+
+def _group_periods(rows, periods):
+    grouped = {period: [] for period in periods}
+    for year, month, trans_type, category, total in rows:
+        grouped[(year, month, trans_type)].append((category, total))
+    return grouped
+
+
+def period_category_totals(user, periods):
+    """
+    category_totals() ของหลายเดือนด้วย query เดียว
+    periods: [(year, month, trans_type), ...]
+    คืน {(year, month, trans_type): [(category_trans, total), ...]} เรียงจากยอดมากไปน้อย
+    """
+    if not periods:
+        return {}
+    return _group_periods(_periods_query(user, periods), periods)
+
+
+async def aperiod_category_totals(user, periods):
+    if not periods:
+        return {}
+    rows = [row async for row in _periods_query(user, periods)]
+    return _group_periods(rows, periods)
+
+
+def _raw_totals(user_ids):
+    """
+    รวมยอดจากรายการจริง (grouped query เดียวบนตาราง Transaction)
+    คืน {(user_id, year, month, trans_type, category_trans): (total, จำนวนรายการ)}
+    """
+    rows = (
+        Transaction.objects.filter(user_id__in=user_ids, trans_type__in=TRANS_TYPES)
+        .annotate(period=TruncMonth("date"))
+        .values("user_id", "period", "trans_type", "category_trans")
+        .annotate(total=Sum("amount"), count=Count("pk"))
+        .order_by()
+    )
+    totals = {}
+    for row in rows:
+        period = row["period"]
+        key = (
+            row["user_id"],
+            period.year,
+            period.month,
+            row["trans_type"],
+            row["category_trans"],
+        )
+        # SQLite รวม DecimalField เป็น float: ปัดกลับเป็นสตางค์ก่อนเทียบ/บันทึก
+        totals[key] = (money.to_money(row["total"] or 0), row["count"])
+    return totals
+
+
+def compute(user_ids, raw=None):
+    """
+    คำนวณยอดรายเดือนจากรายการจริง
+    คืน {(user_id, year, month): [income, expense, income_count, expense_count]}
+    """
+    totals = {}
+    for (user_id, year, month, trans_type, _), (total, count) in (
+        raw if raw is not None else _raw_totals(user_ids)
+    ).items():
+        row = totals.setdefault((user_id, year, month), [0, 0, 0, 0])
+        index = 0 if trans_type == "income" else 1
+        row[index] += total
+        row[index + 2] += count
+    return totals
+
+
+@transaction.atomic
+def rebuild(user_ids):
+    """ลบ rollups ของ users ที่ระบุแล้วสร้างใหม่จากรายการจริง"""
+    raw = _raw_totals(user_ids)
+    totals = compute(user_ids, raw)
+
+    MonthReport.objects.filter(user_id__in=user_ids).delete()
+    MonthReport.objects.bulk_create(
+        [
+            MonthReport(
+                user_id=user_id,
+                year=year,
+                month=month,
+                income_total=income,
+                expense_total=expense,
+                income_count=income_count,
+                expense_count=expense_count,
+            )
+            for (user_id, year, month), (
+                income,
+                expense,
+                income_count,
+                expense_count,
+            ) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+    CategoryMonthReport.objects.filter(user_id__in=user_ids).delete()
+    CategoryMonthReport.objects.bulk_create(
+        [
+            CategoryMonthReport(
+                user_id=user_id,
+                year=year,
+                month=month,
+                trans_type=trans_type,
+                category_trans=category,
+                total=total,
+            )
+            for (user_id, year, month, trans_type, category), (total, _) in raw.items()
+        ],
+        batch_size=1000,
+    )
+    return len(totals)
+
+
+def _diff(expected, stored, zero):
+    """คืน [(key, stored, expected)] ของ key ที่ค่าไม่ตรงกัน"""
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys()):
+        want = expected.get(key, zero)
+        have = stored.get(key, zero)
+        # amount เป็น DecimalField จึงเทียบค่าตรง ๆ ได้
+        if want != have:
+            mismatches.append((key, have, want))
+    return mismatches
+
+
+def verify(user_ids):
+    """
+    เทียบ MonthReport (ยอดและจำนวนรายการ) กับรายการจริง
+    คืน list ของ (user_id, year, month, stored, expected) ที่ไม่ตรงกัน
+    stored/expected: [income, expense, income_count, expense_count]
+    """
+    stored = {
+        tuple(row[:3]): list(row[3:])
+        for row in MonthReport.objects.filter(user_id__in=user_ids).values_list(
+            "user_id",
+            "year",
+            "month",
+            "income_total",
+            "expense_total",
+            "income_count",
+            "expense_count",
+        )
+    }
+    return [
+        (*key, have, want)
+        for key, have, want in _diff(compute(user_ids), stored, [0, 0, 0, 0])
+    ]
+
+
+def verify_categories(user_ids):
+    """
+    Consistency checker ของ CategoryMonthReport
+    คืน list ของ (user_id, year, month, trans_type, category, stored, expected)
+    """
+    stored = {
+        row[:-1]: row[-1]
+        for row in CategoryMonthReport.objects.filter(
+            user_id__in=user_ids
+        ).values_list("user_id", "year", "month", "trans_type", "category_trans", "total")
+    }
+    expected = {key: total for key, (total, _) in _raw_totals(user_ids).items()}
+    return [(*key, have, want) for key, have, want in _diff(expected, stored, 0)]
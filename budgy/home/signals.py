@@ -1,13 +1,118 @@
-from django.db.models.signals import post_save
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from .models import Account, Category, Profile, Transaction, Income, Expense
+from . import rollups, snapshot, versions
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+        # id ของ user ที่ถูกลบอาจถูกใช้ซ้ำ (SQLite) อย่าให้เห็น snapshot เก่า
+        snapshot.invalidate(instance.pk)
 
 @receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+def save_profile(sender, instance, created, **kwargs):
+    # บันทึกเฉพาะ profile ที่โหลดมากับ user นี้แล้ว
+    # login (last_login) / เปลี่ยนรหัสผ่าน ไม่ต้อง SELECT + UPDATE profile ทุกครั้ง
+    if not created and sender.profile.is_cached(instance):
+        instance.profile.save()
+
+
+# ---------------- Monthly rollups (MonthReport / CategoryMonthReport) ----------------
+# Income/Expense เป็น proxy ของ Transaction ส่วน cascade delete (เช่นลบ Account)
+# ส่ง signal มาด้วย sender=Transaction จึงต้องฟังทั้งสาม model และแยกชนิดจาก trans_type
+
+ROLLUP_SENDERS = (Transaction, Income, Expense)
+ROLLUP_TYPES = ("income", "expense")
+
+# ลบ user ทั้งคน (ledger.delete_users): rollups / version / snapshot ถูกลบหรือ
+# ล้างทั้งก้อนอยู่แล้ว ไม่ต้องปรับทีละแถวระหว่าง cascade
+_ledger_muted = ContextVar("ledger_muted", default=False)
+
+
+@contextmanager
+def muted():
+    """ปิด receivers ของ rollups / ledger version ที่ทำงานทีละแถวชั่วคราว"""
+    token = _ledger_muted.set(True)
+    try:
+        yield
+    finally:
+        _ledger_muted.reset(token)
+
+
+def _field_value(instance, name):
+    # ค่าที่ยังไม่ผ่าน DB อาจเป็น string/object ให้แปลงแบบเดียวกับที่ field จะบันทึก
+    return instance._meta.get_field(name).to_python(getattr(instance, name))
+
+
+def remember_previous_rollup(sender, instance, **kwargs):
+    # ถ้าเป็นการแก้ไขรายการเดิม จำค่าเก่าไว้เพื่อหักออกจากเดือน/category เดิม
+    instance._rollup_previous = None
+    if instance.pk is not None:
+        instance._rollup_previous = (
+            Transaction.objects.filter(pk=instance.pk)
+            .values_list("user_id", "date", "trans_type", "category_trans", "amount")
+            .first()
+        )
+
+
+def update_rollup_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, "_rollup_previous", None)
+    if previous and previous[2] in ROLLUP_TYPES:
+        user_id, date, trans_type, category, amount = previous
+        rollups.record(user_id, date, trans_type, category, -amount, count=-1)
+
+    if instance.trans_type in ROLLUP_TYPES:
+        rollups.record(
+            instance.user_id,
+            instance.date,
+            instance.trans_type,
+            _field_value(instance, "category_trans"),
+            _field_value(instance, "amount") or 0,
+        )
+
+
+def update_rollup_on_delete(sender, instance, **kwargs):
+    if _ledger_muted.get() or instance.trans_type not in ROLLUP_TYPES:
+        return
+    rollups.record(
+        instance.user_id,
+        instance.date,
+        instance.trans_type,
+        _field_value(instance, "category_trans"),
+        -(_field_value(instance, "amount") or 0),
+        create=False,
+        count=-1,
+    )
+
+
+for _sender in ROLLUP_SENDERS:
+    pre_save.connect(remember_previous_rollup, sender=_sender)
+    post_save.connect(update_rollup_on_save, sender=_sender)
+    post_delete.connect(update_rollup_on_delete, sender=_sender)
+
+
+# ---------------- Finance snapshot / ledger version ----------------
+# ทุกการเขียนผ่าน ORM (ledger, admin, cascade delete) ลบ snapshot (home/snapshot.py)
+# และขยับ ledger version (home/versions.py) ให้ ETag ของ JSON APIs เปลี่ยน
+# bulk import / update() ไม่ส่ง signal จึงเรียกสองอย่างนี้เอง
+
+def ledger_saved(sender, instance, **kwargs):
+    snapshot.invalidate(instance.user_id)
+    versions.bump(instance.user_id)
+
+
+def ledger_deleted(sender, instance, **kwargs):
+    if _ledger_muted.get():
+        return
+    snapshot.invalidate(instance.user_id)
+    versions.bump(instance.user_id, create=False)
+
+
+for _sender in (Account, Category, *ROLLUP_SENDERS):
+    post_save.connect(ledger_saved, sender=_sender)
+    post_delete.connect(ledger_deleted, sender=_sender)
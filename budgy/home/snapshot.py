@@ -0,0 +1,183 @@
+"""
+Finance snapshot: ยอดที่หลายหน้าใช้ร่วมกัน เก็บใน cache ต่อ user
+
+home_page, dashboard_today_page, accounts_api และ pet_status_api (mascot ที่ poll
+ทุก 60 วินาทีในทุก tab) ใช้ข้อมูลชุดเดียวกัน:
+    total_balance, accounts, month_income, month_expense (เดือนปัจจุบัน)
+จึงคำนวณครั้งเดียวแล้วเก็บไว้ใน Django cache (backend เลือกได้ใน settings.CACHES)
+
+snapshot เก็บ LedgerVersion (home/versions.py) ที่ใช้ตอนสร้างไว้ด้วย และใช้ได้
+เฉพาะเมื่อ version ตรงกับใน database: cache แบบ locmem เป็นของแต่ละ process
+invalidate() ลบได้แค่ใน worker ที่เขียน worker อื่นจึงรู้จาก version ที่ขยับแทน
+(PK lookup ครั้งเดียว ถ้า view อ่าน version ไว้แล้วส่งมาได้เลย)
+
+invalidate(user_id) ถูกเรียกเมื่อ ledger/import เขียนรายการหรือยอดบัญชีเปลี่ยน
+และจาก signals (Account/Transaction save/delete) สำหรับทางอื่นเช่น admin
+snapshot ยังหมดอายุเองตาม FINANCE_SNAPSHOT_TIMEOUT กันพลาด
+
+stats() คืนจำนวน hit/miss และเวลาเฉลี่ย (ต่อ process) ค่าเดียวกันถูกส่งเข้า
+home/metrics.py ด้วย (รวมทุก worker ที่ /metrics)
+"""
+
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics, periods, rollups, versions
+from .models import Account
+
+DEFAULT_TIMEOUT = 300
+
+
+def _key(user_id):
+    return f"finance_snapshot:{user_id}"
+
+
+def _timeout():
+    return getattr(settings, "FINANCE_SNAPSHOT_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def _accounts(user_id):
+    return (
+        Account.objects.filter(user_id=user_id)
+        .order_by("-id")
+        .values_list("id", "account_name", "balance")
+    )
+
+
+def _snapshot(version, period, accounts, month_income, month_expense):
+    accounts = [
+        {"id": pk, "name": name, "balance": balance} for pk, name, balance in accounts
+    ]
+    return {
+        "version": version,
+        "year": period[0],
+        "month": period[1],
+        "accounts": accounts,
+        "total_balance": sum(account["balance"] for account in accounts),
+        "month_income": month_income,
+        "month_expense": month_expense,
+    }
+
+
+def _is_current(data, version, period):
+    return (
+        data is not None
+        and data.get("version") == version
+        and (data["year"], data["month"]) == period
+    )
+
+
+def build(user_id, version, period):
+    """
+    คำนวณ snapshot จาก database (2 queries)
+    version ต้องอ่านก่อนข้อมูล: ถ้ามีการเขียนแทรกระหว่างนั้น snapshot จะมี version เก่า
+    แล้วถูกสร้างใหม่รอบหน้า (ไม่ใช่ข้อมูลเก่าติด version ใหม่)
+    """
+    return _snapshot(
+        version,
+        period,
+        list(_accounts(user_id)),
+        *rollups.month_totals(user_id, *period),
+    )
+
+
+async def abuild(user_id, version, period):
+    """build() ด้วย async ORM"""
+    return _snapshot(
+        version,
+        period,
+        [row async for row in _accounts(user_id)],
+        *await rollups.amonth_totals(user_id, *period),
+    )
+
+
+def get(user, version=None, period=None):
+    """
+    คืน snapshot ของ user (จาก cache ถ้ามี ตรงกับ ledger version และเดือนที่ขอ)
+    version, period: ค่าที่ view ใช้ทำ ETag แล้ว (versions.for_request) เพื่อให้ body
+    ตรงกับ ETag เสมอ; None = อ่าน version จาก database / เดือนปัจจุบัน
+    """
+    started = time.perf_counter()
+    if version is None:
+        version, _ = versions.current(user)
+    period = period or periods.current_month()
+    key = _key(user.pk)
+    data = cache.get(key)
+    if _is_current(data, version, period):
+        _record(hit=True, seconds=time.perf_counter() - started)
+        return data
+
+    data = build(user.pk, version, period)
+    cache.set(key, data, _timeout())
+    _record(hit=False, seconds=time.perf_counter() - started)
+    return data
+
+
+async def aget(user, version=None, period=None):
+    """get() สำหรับ async views"""
+    started = time.perf_counter()
+    if version is None:
+        version, _ = await versions.acurrent(user)
+    period = period or periods.current_month()
+    key = _key(user.pk)
+    data = await cache.aget(key)
+    if _is_current(data, version, period):
+        _record(hit=True, seconds=time.perf_counter() - started)
+        return data
+
+    data = await abuild(user.pk, version, period)
+    await cache.aset(key, data, _timeout())
+    _record(hit=False, seconds=time.perf_counter() - started)
+    return data
+
+
+def invalidate(user_id):
+    """
+    ลบ snapshot ของ user: ลบทันที และลบซ้ำหลัง commit
+    (กัน request อื่นที่อ่านค่าก่อน commit แล้วเขียนค่าเก่ากลับเข้า cache)
+    """
+    key = _key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+# ---------------- hit rate / latency ----------------
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "hit_seconds": 0.0, "miss_seconds": 0.0}
+
+
+def _record(hit, seconds):
+    result = "hit" if hit else "miss"
+    metrics.SNAPSHOT_LOOKUPS.inc(result)
+    metrics.SNAPSHOT_LATENCY.observe(seconds, result)
+    with _lock:
+        if hit:
+            _stats["hits"] += 1
+            _stats["hit_seconds"] += seconds
+        else:
+            _stats["misses"] += 1
+            _stats["miss_seconds"] += seconds
+
+
+def stats():
+    """คืน hits, misses, hit_rate และเวลาเฉลี่ย (ms) ของ hit/miss ใน process นี้"""
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        hit_seconds, miss_seconds = _stats["hit_seconds"], _stats["miss_seconds"]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "avg_hit_ms": hit_seconds / hits * 1000 if hits else 0.0,
+        "avg_miss_ms": miss_seconds / misses * 1000 if misses else 0.0,
+    }
+
+
+def reset_stats():
+    with _lock:
+        _stats.update(hits=0, misses=0, hit_seconds=0.0, miss_seconds=0.0)
@@ -1,14 +1,44 @@
 from django.test import TestCase, Client
-from django.urls import reverse
+from django.urls import resolve, reverse
 from django.contrib.auth.models import User
-from .models import Category, Account, Income, Expense, Profile
+from .models import (
+    Category,
+    Account,
+    Transaction,
+    Income,
+    Expense,
+    Profile,
+    MonthReport,
+    CategoryMonthReport,
+    LedgerVersion,
+)
 from django.utils.dateparse import parse_date
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import override_settings, RequestFactory
+from django.test import override_settings, RequestFactory, AsyncRequestFactory
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, transaction
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 from unittest.mock import patch, MagicMock
-from home import views
+from home import views, async_views, rollups, periods, importers, ledger, snapshot
+from home import exporters, metrics, versions
+from django.core.management import call_command
+from django.core.cache import cache
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.core.exceptions import MiddlewareNotUsed
+from home.middleware import QueryProfilingMiddleware
+from io import StringIO
+from asgiref.sync import sync_to_async
+import csv
+import gzip
 import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
 
 
 class HomeAppTests(TestCase):
@@ -859,6 +889,1981 @@ class StatsPageAndApiTests(TestCase):
         self.assertEqual(data["income"], [0] * 12)
         self.assertEqual(data["expense"], [0] * 12)
 
+    def test_stats_yearly_api_year_range(self):
+        Income.objects.create(
+            user=self.user,
+            trans_type="income",
+            date="2023-01-15",
+            amount=100,
+            category_trans="Salary",
+            to_account=self.account,
+        )
+        Expense.objects.create(
+            user=self.user,
+            trans_type="expense",
+            date="2024-12-20",
+            amount=40,
+            category_trans="Food",
+            from_account=self.account,
+        )
+
+        # ทุกปีในช่วงมาจาก grouped query เดียว (+ ledger version ของ ETag)
+        with self.assertNumQueries(2):
+            response = views.stats_yearly_api(self._api_request("?from=2023&to=2024"))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+
+        self.assertEqual(list(data["years"]), ["2023", "2024"])
+        self.assertEqual(data["years"]["2023"]["income"][0], 100)
+        self.assertEqual(data["years"]["2023"]["expense"], [0] * 12)
+        self.assertEqual(data["years"]["2024"]["expense"][11], 40)
+
+    def test_stats_yearly_api_invalid_range(self):
+        response = self.client.get(reverse("stats_yearly_api") + "?from=2025&to=2020")
+        self.assertEqual(response.status_code, 400)
+
+    def _api_request(self, query):
+        request = RequestFactory().get(reverse("stats_yearly_api") + query)
+        request.user = self.user
+        return request
+
+    # ---- Stats Batch API (Compare) ----
+    def _add(self, model, date, amount, category):
+        if model is Income:
+            accounts = {"trans_type": "income", "to_account": self.account}
+        else:
+            accounts = {"trans_type": "expense", "from_account": self.account}
+        model.objects.create(
+            user=self.user, date=date, amount=amount, category_trans=category, **accounts
+        )
+
+    def test_stats_batch_api_matches_summary_per_period(self):
+        self._add(Expense, "2024-12-03", 30, "Food")
+        self._add(Expense, "2024-12-04", 70, "Rent")
+        self._add(Expense, "2025-01-05", 25, "Food")
+        self._add(Income, "2025-01-06", 500, "Salary")
+
+        query = "?period=2025-01&period=2024-12&period=2025-01:income&period=2025-02"
+        request = RequestFactory().get(reverse("stats_batch_api") + query)
+        request.user = self.user
+        with self.assertNumQueries(2):  # ledger version + CategoryMonthReport
+            response = views.stats_batch_api(request)
+        self.assertEqual(response.status_code, 200)
+        periods = json.loads(response.content)["periods"]
+
+        self.assertEqual(
+            [(p["period"], p["type"]) for p in periods],
+            [
+                ("2025-01", "expense"),
+                ("2024-12", "expense"),
+                ("2025-01", "income"),
+                ("2025-02", "expense"),
+            ],
+        )
+        for period in periods:
+            year, month = period["period"].split("-")
+            summary = self.client.get(
+                reverse("stats_summary_api"),
+                {"year": year, "month": month, "type": period["type"]},
+            ).json()
+            self.assertEqual(
+                {key: period[key] for key in summary}, summary, period["period"]
+            )
+        self.assertEqual(periods[1]["labels"], ["Rent", "Food"])
+        self.assertEqual(periods[3]["overall_total"], 0)
+
+    def test_stats_batch_api_month_range(self):
+        self._add(Income, "2024-11-03", 10, "Gift")
+        self._add(Income, "2025-02-03", 20, "Gift")
+        response = self.client.get(
+            reverse("stats_batch_api"),
+            {"from": "2024-11", "to": "2025-02", "type": "income"},
+        )
+        periods = response.json()["periods"]
+        self.assertEqual(
+            [p["period"] for p in periods], ["2024-11", "2024-12", "2025-01", "2025-02"]
+        )
+        self.assertEqual([p["overall_total"] for p in periods], [10, 0, 0, 20])
+
+    def test_stats_yearly_api_rejects_years_out_of_range(self):
+        too_late = periods.MAX_YEAR + 1
+        for query in ("?year=0", "?year=-1", "?from=0&to=1", f"?year={too_late}"):
+            response = self.client.get(reverse("stats_yearly_api") + query)
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_stats_batch_api_invalid_params(self):
+        for query in (
+            "",
+            "?period=2025-13",
+            "?period=2025-01:transfer",
+            "?period=2025",
+            "?from=2025-01",
+            "?from=2025-03&to=2025-01",
+            "?from=2020-01&to=2025-01",
+            "?period=2025-01&from=2025-01&to=2025-02",
+            "?" + "&".join(["period=2025-01"] * (views.MAX_BATCH_PERIODS + 1)),
+            "?period=0-01",
+            "?period=-5-01",
+            "?from=0-11&to=1-02",
+            f"?period={periods.MAX_YEAR + 1}-01",
+        ):
+            response = self.client.get(reverse("stats_batch_api") + query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("error", response.json())
+
+
+class MonthReportRollupTests(TestCase):
+    """
+    ทดสอบ MonthReport ที่ถูกอัปเดตแบบ incremental ทุกครั้งที่มีการเขียนรายการ
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="rollupuser", password="password")
+        self.client = Client()
+        self.client.login(username="rollupuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=1000
+        )
+        self.bank = Account.objects.create(
+            user=self.user, account_name="Bank", type_acc="Bank", balance=0
+        )
+
+    def report(self, year, month):
+        return MonthReport.objects.get(user=self.user, year=year, month=month)
+
+    def test_views_update_month_report(self):
+        url = reverse("transaction_income", kwargs={"user_id": self.user.id})
+        self.client.post(
+            url,
+            data={
+                "date": "2025-11-08",
+                "amount": "500",
+                "category_name": "Salary",
+                "account": "Cash",
+            },
+        )
+        # รายการย้อนหลัง ต้องไปลงเดือนของมันเอง
+        self.client.post(
+            reverse("transaction_expense", kwargs={"user_id": self.user.id}),
+            data={
+                "date": "2024-02-01",
+                "amount": "80",
+                "category_name": "Food",
+                "account": "Cash",
+            },
+        )
+        self.client.post(
+            reverse("transaction_transfer", kwargs={"user_id": self.user.id}),
+            data={
+                "date": "2025-11-09",
+                "amount": "100",
+                "category_name": "Move",
+                "from_account": "Cash",
+                "to_account": "Bank",
+            },
+        )
+
+        november = self.report(2025, 11)
+        self.assertEqual(november.income_total, 600)
+        self.assertEqual(november.expense_total, 100)
+        february = self.report(2024, 2)
+        self.assertEqual(february.income_total, 0)
+        self.assertEqual(february.expense_total, 80)
+
+    def test_edit_and_delete_move_totals(self):
+        income = Income.objects.create(
+            user=self.user,
+            trans_type="income",
+            date="2025-01-10",
+            amount=300,
+            category_trans="Salary",
+            to_account=self.cash,
+        )
+        self.assertEqual(self.report(2025, 1).income_total, 300)
+
+        # แก้ทั้งยอดและเดือน → หักจากเดือนเก่า เพิ่มในเดือนใหม่
+        income.date = "2025-03-10"
+        income.amount = 250
+        income.save()
+        self.assertEqual(self.report(2025, 1).income_total, 0)
+        self.assertEqual(self.report(2025, 3).income_total, 250)
+
+        income.delete()
+        self.assertEqual(self.report(2025, 3).income_total, 0)
+
+    def test_account_cascade_delete_updates_rollup(self):
+        Expense.objects.create(
+            user=self.user,
+            trans_type="expense",
+            date="2025-05-05",
+            amount=40,
+            category_trans="Food",
+            from_account=self.bank,
+        )
+        self.bank.delete()
+        self.assertEqual(self.report(2025, 5).expense_total, 0)
+
+    def test_rollups_command_verify_and_rebuild(self):
+        Income.objects.create(
+            user=self.user,
+            trans_type="income",
+            date="2025-06-01",
+            amount=100,
+            category_trans="Salary",
+            to_account=self.cash,
+        )
+        MonthReport.objects.filter(user=self.user).update(income_total=999)
+
+        with self.assertRaises(CommandError):
+            call_command("rollups", "--verify", stdout=StringIO())
+
+        version, _ = versions.current(self.user)
+        call_command("rollups", stdout=StringIO())
+        self.assertEqual(self.report(2025, 6).income_total, 100)
+        # ETag เดิมใช้ไม่ได้แล้ว: client ต้องได้ยอดที่ซ่อมแล้ว ไม่ใช่ 304
+        self.assertEqual(versions.current(self.user)[0], version + 1)
+        call_command("rollups", "--verify", stdout=StringIO())
+
+    def test_active_months_follow_writes(self):
+        def expense(date, amount):
+            return Expense.objects.create(
+                user=self.user,
+                trans_type="expense",
+                date=date,
+                amount=amount,
+                category_trans="Food",
+                from_account=self.cash,
+            )
+
+        income = Income.objects.create(
+            user=self.user,
+            trans_type="income",
+            date="2025-03-01",
+            amount=100,
+            category_trans="Salary",
+            to_account=self.cash,
+        )
+        march = expense("2025-03-02", 10)
+        # ยอด 0 ก็ยังนับเป็นเดือนที่มีรายการ
+        old = expense("2024-12-31", 0)
+        self.assertEqual(
+            rollups.active_months(self.user), [(2025, 3, 1, 1), (2024, 12, 0, 1)]
+        )
+
+        old.date = "2025-01-15"
+        old.save()
+        income.delete()
+        self.assertEqual(
+            rollups.active_months(self.user), [(2025, 3, 0, 1), (2025, 1, 0, 1)]
+        )
+
+        march.delete()
+        self.assertEqual(rollups.active_months(self.user), [(2025, 1, 0, 1)])
+        self.assertEqual(rollups.verify([self.user.id]), [])
+
+        # rebuild / --verify ตรวจจำนวนรายการด้วย
+        MonthReport.objects.filter(user=self.user, year=2025, month=1).update(
+            expense_count=5
+        )
+        self.assertEqual(
+            rollups.verify([self.user.id]),
+            [(self.user.id, 2025, 1, [0, 0, 0, 5], [0, 0, 0, 1])],
+        )
+        rollups.rebuild([self.user.id])
+        self.assertEqual(rollups.active_months(self.user), [(2025, 1, 0, 1)])
+
+    # ----- CategoryMonthReport -----
+    def test_category_report_follows_edits(self):
+        expense = Expense.objects.create(
+            user=self.user,
+            trans_type="expense",
+            date="2025-07-01",
+            amount=60,
+            category_trans="Food",
+            from_account=self.cash,
+        )
+        expense.category_trans = "Travel"
+        expense.save()
+
+        totals = dict(
+            CategoryMonthReport.objects.filter(
+                user=self.user, year=2025, month=7, trans_type="expense"
+            ).values_list("category_trans", "total")
+        )
+        self.assertEqual(totals, {"Food": 0, "Travel": 60})
+
+    def test_stats_summary_api_reads_category_report(self):
+        for amount, category in ((30, "Food"), (70, "Rent"), (20, "Food")):
+            Expense.objects.create(
+                user=self.user,
+                trans_type="expense",
+                date="2025-08-03",
+                amount=amount,
+                category_trans=category,
+                from_account=self.cash,
+            )
+
+        request = RequestFactory().get(
+            reverse("stats_summary_api") + "?year=2025&month=8&type=expense"
+        )
+        request.user = self.user
+        with self.assertNumQueries(2):  # ledger version + MonthReport
+            response = views.stats_summary_api(request)
+        data = json.loads(response.content)
+        self.assertEqual(data["labels"], ["Rent", "Food"])
+        self.assertEqual(data["values"], [70, 50])
+        self.assertEqual(data["overall_total"], 120)
+
+    def test_verify_categories_detects_drift(self):
+        Income.objects.create(
+            user=self.user,
+            trans_type="income",
+            date="2025-09-01",
+            amount=10,
+            category_trans="Gift",
+            to_account=self.cash,
+        )
+        self.assertEqual(rollups.verify_categories([self.user.id]), [])
+
+        CategoryMonthReport.objects.filter(user=self.user).update(total=1)
+        self.assertEqual(
+            rollups.verify_categories([self.user.id]),
+            [(self.user.id, 2025, 9, "income", "Gift", 1, 10)],
+        )
+
+
+class PeriodRangeTests(TestCase):
+    """
+    ทดสอบ filter แบบ half-open [start, end) ที่ใช้แทน __year/__month/__date
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="rangeuser", password="password")
+        self.client = Client()
+        self.client.login(username="rangeuser", password="password")
+        self.account = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+
+    def test_month_range_wraps_year(self):
+        start, end = periods.month_range(2024, 12)
+        self.assertEqual((start.year, start.month, start.day), (2024, 12, 1))
+        self.assertEqual((end.year, end.month, end.day), (2025, 1, 1))
+
+    def test_spending_api_monthly_boundaries(self):
+        for date in ("2025-01-31T23:59:59Z", "2025-02-01T00:00:00Z"):
+            Expense.objects.create(
+                user=self.user,
+                trans_type="expense",
+                date=date,
+                amount=10,
+                category_trans="Food",
+                from_account=self.account,
+            )
+
+        response = self.client.get(
+            reverse("spending_api") + "?mode=monthly&month=2025-01"
+        )
+        self.assertEqual(len(response.json()["spendings"]), 1)
+
+        response = self.client.get(
+            reverse("spending_api") + "?mode=daily&date=2025-02-01"
+        )
+        self.assertEqual(len(response.json()["spendings"]), 1)
+
+    def test_invalid_month_or_year_returns_400(self):
+        for name in ("spending_api", "spending_overview_api"):
+            for query in (
+                "?mode=monthly&month=2024-13",
+                "?mode=monthly&month=2024-00",
+                "?mode=monthly&month=abc",
+                "?mode=monthly&month=0-01",
+                "?mode=yearly&year=9999",
+                "?mode=yearly&year=x",
+            ):
+                response = self.client.get(reverse(name) + query)
+                self.assertEqual(response.status_code, 400, name + query)
+                self.assertIn("error", response.json())
+
+    def test_parse_month_bounds(self):
+        self.assertEqual(periods.parse_month("2024-02"), (2024, 2))
+        start, end = periods.month_range(*periods.parse_month(f"{periods.MAX_YEAR}-12"))
+        self.assertEqual(end.year, periods.MAX_YEAR + 1)
+        for value in ("2024", "2024-1-1", "-1-01", f"{periods.MAX_YEAR + 1}-01", None):
+            with self.assertRaises(ValueError):
+                periods.parse_month(value)
+
+
+class SingleTableTransactionTests(TestCase):
+    """
+    Income / Expense เป็น proxy ของ Transaction (ตารางเดียว ไม่มี join ตารางลูก)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="tableuser", password="password")
+        self.client = Client()
+        self.client.login(username="tableuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=500
+        )
+        self.bank = Account.objects.create(
+            user=self.user, account_name="Bank", type_acc="Bank", balance=0
+        )
+
+    def test_create_is_single_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            Income.objects.create(
+                user=self.user,
+                date=timezone.now(),
+                amount=100,
+                category_trans="Salary",
+                to_account=self.cash,
+            )
+        inserts = [
+            q["sql"] for q in queries.captured_queries if q["sql"].startswith("INSERT")
+        ]
+        transaction_inserts = [sql for sql in inserts if '"home_transaction"' in sql]
+        self.assertEqual(len(transaction_inserts), 1)
+        self.assertFalse(any("home_income" in sql for sql in inserts))
+
+    def test_proxy_managers_filter_by_type(self):
+        now = timezone.now()
+        income = Income.objects.create(
+            user=self.user, date=now, amount=100, category_trans="Salary", to_account=self.cash
+        )
+        Expense.objects.create(
+            user=self.user, date=now, amount=40, category_trans="Food", from_account=self.cash
+        )
+
+        self.assertEqual(income.trans_type, "income")
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(list(Income.objects.values_list("amount", flat=True)), [100])
+        self.assertEqual(list(Expense.objects.values_list("amount", flat=True)), [40])
+        self.assertEqual(Income.objects.get().to_account, self.cash)
+        self.assertEqual(self.cash.transactions.count(), 2)
+
+    def test_transfer_links_counter_accounts(self):
+        self.client.post(
+            reverse("transaction_transfer", kwargs={"user_id": self.user.id}),
+            data={
+                "date": "2025-11-09",
+                "amount": "100",
+                "category_name": "Move",
+                "from_account": "Cash",
+                "to_account": "Bank",
+            },
+        )
+
+        expense = Expense.objects.get()
+        income = Income.objects.get()
+        self.assertEqual((expense.account, expense.counter_account), (self.cash, self.bank))
+        self.assertEqual((income.account, income.counter_account), (self.bank, self.cash))
+
+
+class ImportTransactionsTests(TestCase):
+    """
+    ทดสอบ bulk import (home/importers.py, import_transactions_api, command)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="importuser", password="password")
+        self.client = Client()
+        self.client.login(username="importuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=100
+        )
+        self.bank = Account.objects.create(
+            user=self.user, account_name="Bank", type_acc="Bank", balance=0
+        )
+        self.url = reverse("import_transactions_api")
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            self.url,
+            data={"file": SimpleUploadedFile(name, content.encode()), **data},
+        )
+
+    def test_csv_import_updates_balances_categories_and_rollups(self):
+        content = (
+            "Date,Amount,Category,Account,Type\n"
+            "2025-01-05,1000,Salary,Bank,income\n"
+            "2025-01-06,-40,Food,Cash,\n"
+            "2025-02-01,60,Food,Cash,expense\n"
+            "not-a-date,10,Food,Cash,expense\n"
+            "2025-02-02,10,Food,Nowhere,expense\n"
+        )
+        response = self.upload("statement.csv", content)
+
+        data = response.json()
+        self.assertEqual(data["created"], 3)
+        self.assertEqual(data["skipped"], 2)
+        self.assertEqual([e["line"] for e in data["errors"]], [5, 6])
+
+        self.cash.refresh_from_db()
+        self.bank.refresh_from_db()
+        self.assertEqual(self.cash.balance, 0)
+        self.assertEqual(self.bank.balance, 1000)
+        self.assertTrue(
+            Category.objects.filter(
+                user=self.user, category_name="Food", trans_type="expense"
+            ).exists()
+        )
+        self.assertEqual(rollups.month_totals(self.user, 2025, 1), (1000, 40))
+        self.assertEqual(rollups.verify([self.user.id]), [])
+        self.assertEqual(rollups.verify_categories([self.user.id]), [])
+
+    def test_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        content = "Date,Amount,Category,Account\n2025-01-06,-40,Food,Cash\n"
+        response = client.post(
+            self.url, data={"file": SimpleUploadedFile("bank.csv", content.encode())}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+        # token จากหน้า accounts (cookie + csrfmiddlewaretoken ใน form)
+        page = client.get(reverse("account_management", args=[self.user.pk]))
+        response = client.post(
+            self.url,
+            data={"file": SimpleUploadedFile("bank.csv", content.encode())},
+            headers={"X-CSRFToken": str(page.context["csrf_token"])},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 1)
+
+    def test_queries_do_not_grow_with_rows(self):
+        rows = "".join(f"2025-03-{day:02d},-5,Food,Cash,\n" for day in range(1, 29))
+        rows = importers.parse_csv(StringIO("date,amount,category,account,type\n" + rows))
+        # accounts + categories, ต่อ batch: category + insert, ตอนจบ: balance +
+        # rollups (update + create ครั้งแรก), ledger version และ savepoints
+        # -- ไม่ขึ้นกับจำนวนแถว
+        with self.assertNumQueries(16):
+            result = importers.import_rows(self.user, rows, batch_size=1000)
+        self.assertEqual(result.created, 28)
+
+    def test_ofx_and_qif_use_default_account(self):
+        ofx = (
+            "OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250110120000<TRNAMT>-25.50"
+            "<NAME>Coffee</STMTTRN>"
+            "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250111<TRNAMT>200<NAME>Refund"
+            "</STMTTRN></BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+        )
+        response = self.upload("bank.ofx", ofx, account="Bank")
+        self.assertEqual(response.json()["created"], 2)
+
+        qif = "!Type:Bank\nD01/12/2025\nT-1,000.00\nPLandlord\nLRent\n^\n"
+        response = self.upload("bank.qif", qif, account="Bank")
+        self.assertEqual(response.json()["created"], 1)
+
+        self.bank.refresh_from_db()
+        self.assertEqual(self.bank.balance, 200 - 25.5 - 1000)
+        self.assertEqual(
+            sorted(Expense.objects.values_list("category_trans", flat=True)),
+            ["Coffee", "Rent"],
+        )
+
+    def test_invalid_uploads(self):
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+        self.assertEqual(self.upload("bank.xls", "x").status_code, 400)
+        self.assertEqual(self.upload("bank.csv", "a,b\n1,2\n").status_code, 400)
+        self.assertEqual(
+            self.upload("bank.ofx", "", account="Missing").status_code, 400
+        )
+
+    def test_import_command(self):
+        path = os.path.join(tempfile.mkdtemp(), "statement.csv")
+        with open(path, "w") as f:
+            f.write("date,amount,category,account\n2025-04-01,300,Salary,Cash\n")
+
+        out = StringIO()
+        call_command("import_transactions", "importuser", path, stdout=out)
+        self.assertIn("Imported 1 transactions", out.getvalue())
+        self.assertEqual(Income.objects.get().amount, 300)
+
+        with self.assertRaises(CommandError):
+            call_command("import_transactions", "nobody", path, stdout=StringIO())
+
+
+class LedgerPostingTests(TestCase):
+    """
+    ทดสอบ home/ledger.py: รายการ + ยอดบัญชีอยู่ใน transaction เดียว และไม่มี lost update
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="ledgeruser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=100
+        )
+        self.bank = Account.objects.create(
+            user=self.user, account_name="Bank", type_acc="Bank", balance=0
+        )
+
+    def test_stale_instances_do_not_lose_updates(self):
+        # จำลองสอง request ที่โหลด Account มาก่อนจะมีใครโพสต์
+        first = Account.objects.get(pk=self.cash.pk)
+        second = Account.objects.get(pk=self.cash.pk)
+        now = timezone.now()
+
+        ledger.post_income(self.user, first, 50, now, "Salary")
+        ledger.post_expense(self.user, second, 30, now, "Food")
+
+        self.cash.refresh_from_db()
+        self.assertEqual(self.cash.balance, 120)
+        self.assertEqual(second.balance, 120)
+
+    def test_balance_update_only_touches_balance(self):
+        with CaptureQueriesContext(connection) as queries:
+            ledger.post_income(self.user, self.cash, 10, timezone.now(), "Salary")
+        updates = [
+            q["sql"] for q in queries.captured_queries if '"home_account"' in q["sql"]
+            and q["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn("account_name", updates[0])
+
+    def test_failed_balance_update_rolls_back_transaction(self):
+        with patch("home.ledger.adjust_balance", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                ledger.post_transfer(
+                    self.user, self.cash, self.bank, 40, timezone.now(), "Move"
+                )
+
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(rollups.month_totals(self.user, *rollups.period_of(timezone.now())), (0, 0))
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class LedgerConcurrencyTests(TransactionTestCase):
+    """
+    stress test: หลาย thread (แต่ละ thread มี DB connection ของตัวเอง)
+    โพสต์เข้าบัญชีเดียวกันพร้อมกัน ยอดสุดท้ายต้องครบทุกรายการ
+    (SQLite in-memory ที่ใช้ตอน test ไม่รองรับหลาย connection จึงข้าม)
+    """
+
+    THREADS = 8
+    POSTS_PER_THREAD = 25
+
+    def test_concurrent_posts_keep_every_update(self):
+        user = User.objects.create_user(username="raceuser", password="password")
+        cash = Account.objects.create(
+            user=user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+        bank = Account.objects.create(
+            user=user, account_name="Bank", type_acc="Bank", balance=0
+        )
+        start = threading.Barrier(self.THREADS)
+        errors = []
+
+        def worker(index):
+            try:
+                # โหลด instance ของตัวเอง (stale ทันทีที่ thread อื่นโพสต์)
+                account = Account.objects.get(pk=cash.pk)
+                other = Account.objects.get(pk=bank.pk)
+                start.wait()
+                for _ in range(self.POSTS_PER_THREAD):
+                    ledger.post_income(user, account, 10, timezone.now(), "Salary")
+                    ledger.post_expense(user, account, 3, timezone.now(), "Food")
+                    if index % 2:
+                        ledger.post_transfer(user, account, other, 1, timezone.now(), "Move")
+                    else:
+                        ledger.post_transfer(user, other, account, 1, timezone.now(), "Move")
+            except Exception as e:  # pragma: no cover - รายงานใน assert ด้านล่าง
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        cash.refresh_from_db()
+        bank.refresh_from_db()
+        posts = self.THREADS * self.POSTS_PER_THREAD
+        self.assertEqual(cash.balance + bank.balance, posts * (10 - 3))
+        self.assertEqual(cash.balance, posts * 7)
+        self.assertEqual(bank.balance, 0)
+        self.assertEqual(Transaction.objects.count(), posts * 4)
+
+
+class DecimalMoneyTests(TestCase):
+    """
+    จำนวนเงินเป็น Decimal: ไม่มี drift จาก float และ JSON ยังเป็นตัวเลข
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="moneyuser", password="password")
+        self.client = Client()
+        self.client.login(username="moneyuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+
+    def test_repeated_cents_stay_exact(self):
+        url = reverse("transaction_income", kwargs={"user_id": self.user.id})
+        for _ in range(3):
+            self.client.post(
+                url,
+                data={
+                    "date": "2025-05-01",
+                    "amount": "0.1",
+                    "category_name": "Tips",
+                    "account": "Cash",
+                },
+            )
+
+        self.cash.refresh_from_db()
+        self.assertEqual(self.cash.balance, Decimal("0.30"))
+        self.assertEqual(
+            rollups.month_totals(self.user, 2025, 5), (Decimal("0.30"), Decimal("0"))
+        )
+
+        response = self.client.get(reverse("accounts_api"))
+        self.assertEqual(response.json()["total_balance"], 0.3)
+        response = self.client.get(reverse("spending_api"))
+        self.assertEqual(response.json()["spendings"][0]["amount"], 0.1)
+
+    def test_invalid_amount_is_rejected(self):
+        url = reverse("transaction_income", kwargs={"user_id": self.user.id})
+        for amount in ("nan", "inf", "1e20"):
+            self.client.post(
+                url,
+                data={
+                    "date": "2025-05-01",
+                    "amount": amount,
+                    "category_name": "Tips",
+                    "account": "Cash",
+                },
+            )
+        self.assertFalse(Income.objects.exists())
+
+    def test_reconcile_balances_command(self):
+        bank = Account.objects.create(
+            user=self.user,
+            account_name="Bank",
+            type_acc="Bank",
+            balance=500,
+            opening_balance=500,
+        )
+        now = timezone.now()
+        ledger.post_income(self.user, self.cash, Decimal("100.10"), now, "Salary")
+        ledger.post_transfer(self.user, bank, self.cash, Decimal("50"), now, "Move")
+
+        out = StringIO()
+        call_command("reconcile_balances", stdout=out)
+        self.assertIn("All 2 account balances match", out.getvalue())
+
+        Account.objects.filter(pk=bank.pk).update(balance=Decimal("449.99"))
+        with self.assertRaises(CommandError):
+            call_command("reconcile_balances", stdout=StringIO())
+
+        call_command("reconcile_balances", "--fix", stdout=StringIO())
+        bank.refresh_from_db()
+        self.assertEqual(bank.balance, Decimal("450.00"))
+
+
+class SpendingPaginationTests(TestCase):
+    """
+    spending_api แบบ keyset pagination บน (date, trans_id)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="pageuser", password="password")
+        self.client = Client()
+        self.client.login(username="pageuser", password="password")
+        self.account = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+        self.url = reverse("spending_api")
+        # 5 รายการ วันที่ซ้ำกันเป็นคู่ (ต้องใช้ trans_id ตัดสินลำดับ)
+        for i in range(5):
+            Expense.objects.create(
+                user=self.user,
+                date=f"2025-03-{10 + i // 2:02d}T12:00:00Z",
+                amount=10 + i,
+                category_trans=f"C{i}",
+                from_account=self.account,
+            )
+        Income.objects.create(
+            user=self.user,
+            date="2025-03-01T12:00:00Z",
+            amount=100,
+            category_trans="Salary",
+            to_account=self.account,
+        )
+
+    def test_cursor_walks_every_row_once(self):
+        categories = []
+        cursor = None
+        pages = 0
+        while True:
+            params = "?mode=yearly&year=2025&limit=2"
+            if cursor:
+                params += "&cursor=" + cursor
+            response = self.client.get(self.url + params)
+            data = response.json()
+            categories += [item["category"] for item in data["spendings"]]
+            pages += 1
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+            # header ยอดรวมส่งเฉพาะหน้าแรก
+            self.assertEqual(pages == 1, "X-Total-Income" in response)
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(categories, ["C4", "C3", "C2", "C1", "C0", "Salary"])
+
+    def test_first_page_totals_headers(self):
+        with self.assertNumQueries(5):  # session + user + version + page + totals
+            response = self.client.get(self.url + "?mode=yearly&year=2025&limit=1")
+        self.assertEqual(len(response.json()["spendings"]), 1)
+        self.assertEqual(Decimal(response["X-Total-Income"]), 100)
+        self.assertEqual(Decimal(response["X-Total-Expense"]), 10 + 11 + 12 + 13 + 14)
+        self.assertEqual(response["X-Total-Count"], "6")
+
+    def test_invalid_cursor_or_limit(self):
+        for params in ("?cursor=not-a-cursor", "?limit=0", "?limit=abc"):
+            response = self.client.get(self.url + params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_summary_mode_uses_one_grouped_query(self):
+        with self.assertNumQueries(4):  # session + user + version + grouped query
+            response = self.client.get(self.url + "?mode=yearly&year=2025&summary=1")
+        data = response.json()
+        self.assertNotIn("spendings", data)
+        self.assertEqual(data["totals"], {"income": 100, "expense": 60, "count": 6})
+        self.assertIn(
+            {"category": "Salary", "type": "income", "total": 100, "count": 1},
+            data["categories"],
+        )
+        expense_totals = [c["total"] for c in data["categories"] if c["type"] == "expense"]
+        self.assertEqual(expense_totals, [14, 13, 12, 11, 10])
+
+    def test_overview_returns_totals_and_first_page(self):
+        with self.assertNumQueries(5):  # session + user + version + page + grouped
+            response = self.client.get(
+                reverse("spending_overview_api") + "?mode=monthly&month=2025-03&limit=3"
+            )
+        data = response.json()
+        self.assertEqual(data["totals"]["expense"], 60)
+        self.assertEqual(len(data["spendings"]), 3)
+        self.assertIsNotNone(data["next_cursor"])
+
+        response = self.client.get(
+            self.url + "?mode=monthly&month=2025-03&limit=3&cursor=" + data["next_cursor"]
+        )
+        self.assertEqual(len(response.json()["spendings"]), 3)
+        self.assertIsNone(response.json()["next_cursor"])
+
+
+class FinanceSnapshotTests(TestCase):
+    """
+    ทดสอบ finance snapshot (home/snapshot.py) ที่ home/dashboard/accounts/mascot ใช้ร่วมกัน
+    """
+
+    def setUp(self):
+        cache.clear()
+        snapshot.reset_stats()
+        self.user = User.objects.create_user(username="snapuser", password="password")
+        self.client = Client()
+        self.client.login(username="snapuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=100
+        )
+
+    def test_views_share_one_snapshot(self):
+        self.client.get(reverse("pet_status_api"))
+        self.assertEqual(snapshot.stats()["misses"], 1)
+
+        # hit: session + user + ledger version (ใช้ทั้ง ETag และตรวจ snapshot)
+        # ไม่ query accounts / MonthReport
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("accounts_api"))
+        self.assertEqual(response.json()["total_balance"], 100)
+        self.client.get(reverse("pet_status_api"))
+
+        stats = snapshot.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    def test_write_from_another_worker_is_not_served_stale(self):
+        # worker อื่นเขียน: cache (locmem) ของ process นี้ไม่ถูกลบ แต่ version ขยับ
+        self.client.get(reverse("accounts_api"))
+        Account.objects.filter(pk=self.cash.pk).update(balance=250)
+        versions.bump(self.user.pk)
+
+        response = self.client.get(reverse("accounts_api"))
+        self.assertEqual(response.json()["total_balance"], 250)
+        self.assertEqual(snapshot.stats()["misses"], 2)
+
+    def test_ledger_post_invalidates_snapshot(self):
+        self.client.get(reverse("pet_status_api"))
+        ledger.post_income(self.user, self.cash, Decimal("50"), timezone.now(), "Salary")
+
+        data = self.client.get(reverse("pet_status_api")).json()
+        self.assertEqual(data["total_balance"], 150)
+        self.assertEqual(data["month_income"], 50)
+        self.assertEqual(snapshot.stats()["misses"], 2)
+
+    def test_import_invalidates_snapshot(self):
+        self.client.get(reverse("accounts_api"))
+        rows = importers.parse_csv(
+            StringIO(f"date,amount,account\n{timezone.localdate()},-30,Cash\n")
+        )
+        importers.import_rows(self.user, rows)
+
+        response = self.client.get(reverse("accounts_api"))
+        self.assertEqual(response.json()["total_balance"], 70)
+
+    def test_admin_style_edit_invalidates_snapshot(self):
+        self.client.get(reverse("accounts_api"))
+        self.cash.balance = 999
+        self.cash.save()
+
+        response = self.client.get(reverse("accounts_api"))
+        self.assertEqual(response.json()["total_balance"], 999)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    ทดสอบ ETag / Last-Modified ของ JSON APIs จาก ledger version (home/versions.py)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="etaguser", password="password")
+        self.client = Client()
+        self.client.login(username="etaguser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=100
+        )
+        self.food = Category.objects.create(
+            user=self.user, category_name="Food", trans_type="expense"
+        )
+
+    def test_matching_etag_returns_304_without_aggregates(self):
+        for name, query in (
+            ("accounts_api", ""),
+            ("pet_status_api", ""),
+            ("spending_api", ""),
+            ("spending_overview_api", ""),
+            ("stats_summary_api", "?year=2025&month=1&type=expense"),
+            ("stats_yearly_api", "?year=2025"),
+        ):
+            url = reverse(name) + query
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, name)
+            self.assertIn("ETag", response)
+            self.assertIn("Last-Modified", response)
+            self.assertIn("no-cache", response["Cache-Control"])
+            self.assertIn("private", response["Cache-Control"])
+
+            # session + user + ledger version เท่านั้น
+            with self.assertNumQueries(3):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, 304, name)
+            self.assertEqual(response.content, b"")
+
+    def test_etag_changes_after_ledger_write(self):
+        url = reverse("accounts_api")
+        etag = self.client.get(url)["ETag"]
+
+        ledger.post_expense(self.user, self.cash, Decimal("30"), timezone.now(), "Food")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["total_balance"], 70)
+
+    def test_bulk_import_and_category_changes_bump_version(self):
+        url = reverse("spending_api")
+        etag = self.client.get(url)["ETag"]
+        importers.import_rows(
+            self.user,
+            [
+                {
+                    "line": 1,
+                    "date": "2025-01-01",
+                    "amount": "5",
+                    "trans_type": "expense",
+                    "account": "",
+                    "category": "Food",
+                }
+            ],
+            default_account=self.cash,
+        )
+        etag_after_import = self.client.get(url)["ETag"]
+        self.assertNotEqual(etag_after_import, etag)
+
+        self.food.delete()
+        self.assertNotEqual(self.client.get(url)["ETag"], etag_after_import)
+
+    def test_body_matches_version_and_month_in_etag(self):
+        url = reverse("accounts_api")
+        self.client.get(url)
+        # worker อื่นเขียน: snapshot ใน cache ของ process นี้ยังเป็น version เก่า
+        Account.objects.filter(pk=self.cash.pk).update(balance=40)
+        versions.bump(self.user.pk)
+
+        response = self.client.get(url)
+        version, _ = versions.current(self.user)
+        etag = versions.tag(self.user.pk, version, periods.current_month())
+        self.assertEqual(response["ETag"], f'"{etag}"')
+        self.assertEqual(response.json()["total_balance"], 40)
+
+    def test_etag_is_per_user(self):
+        other = User.objects.create_user(username="etagother", password="password")
+        url = reverse("accounts_api")
+        etag = self.client.get(url)["ETag"]
+
+        client = Client()
+        client.force_login(other)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleting_user_does_not_recreate_version(self):
+        ledger.post_income(self.user, self.cash, Decimal("10"), timezone.now(), "Salary")
+        self.user.delete()
+        self.assertFalse(LedgerVersion.objects.exists())
+
+
+@override_settings(PET_STATUS_STREAM_INTERVAL=0, PET_STATUS_STREAM_TIMEOUT=60)
+class PetStatusStreamTests(TestCase):
+    """
+    ทดสอบ SSE ของ mascot (pet_status_stream) ที่ส่ง event เฉพาะตอน ledger version เปลี่ยน
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="streamuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=100
+        )
+        self.url = reverse("pet_status_stream")
+
+    async def _stream(self, **headers):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return response, response.streaming_content
+
+    async def test_sends_status_only_when_ledger_changes(self):
+        response, events = await self._stream()
+        self.assertEqual(await anext(events), b"retry: 0\n\n")
+
+        first = (await anext(events)).decode()
+        self.assertIn("event: status\n", first)
+        data = json.loads(first.split("data: ")[1])
+        self.assertEqual(data["total_balance"], 100)
+
+        # ไม่มีอะไรเปลี่ยน: ส่งแค่ keep-alive
+        self.assertEqual(await anext(events), b": keep-alive\n\n")
+
+        await sync_to_async(ledger.post_expense)(
+            self.user, self.cash, Decimal("40"), timezone.now(), "Food"
+        )
+        second = (await anext(events)).decode()
+        self.assertIn("event: status\n", second)
+        self.assertEqual(json.loads(second.split("data: ")[1])["total_balance"], 60)
+        await events.aclose()
+
+    async def test_unchanged_ledger_does_not_query_database(self):
+        _, events = await self._stream()
+        await anext(events)
+        await anext(events)  # status แรก: อ่าน version แล้วเก็บใน cache
+        # ORM ของ async view รันใน thread ของ sync_to_async: นับ query ใน thread นั้น
+        queries = CaptureQueriesContext(connection)
+        await sync_to_async(queries.__enter__)()
+        self.assertEqual(await anext(events), b": keep-alive\n\n")
+        self.assertEqual(await anext(events), b": keep-alive\n\n")
+        await sync_to_async(queries.__exit__)(None, None, None)
+        self.assertEqual(await sync_to_async(len)(queries), 0)
+
+        # bump() ลบ version ใน cache: tick ถัดไปอ่าน database ใหม่
+        await sync_to_async(ledger.post_expense)(
+            self.user, self.cash, Decimal("40"), timezone.now(), "Food"
+        )
+        self.assertIn(b"event: status\n", await anext(events))
+        await events.aclose()
+
+    async def test_reconnect_with_current_event_id_skips_resend(self):
+        _, events = await self._stream()
+        await anext(events)
+        first = (await anext(events)).decode()
+        await events.aclose()
+        event_id = first.split("\n")[0].removeprefix("id: ")
+
+        _, events = await self._stream(last_event_id=event_id)
+        await anext(events)
+        self.assertEqual(await anext(events), b": keep-alive\n\n")
+        await events.aclose()
+
+    @override_settings(PET_STATUS_STREAM_TIMEOUT=0)
+    async def test_stream_closes_after_timeout(self):
+        _, events = await self._stream()
+        chunks = [chunk async for chunk in events]
+        self.assertEqual(len(chunks), 2)  # retry + status แล้วจบ
+
+    def test_wsgi_and_anonymous_requests(self):
+        # WSGI: 204 ให้ EventSource หยุดต่อแล้ว poll แทน
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+
+class AsyncJsonApiTests(TestCase):
+    """
+    ทดสอบ async views (home/async_views.py) ว่าตอบเหมือน sync views ทุกอย่าง
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="asyncuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+        now = timezone.now()
+        ledger.post_income(self.user, self.cash, Decimal("500"), now, "Salary")
+        for amount in (10, 20, 30):
+            ledger.post_expense(self.user, self.cash, Decimal(amount), now, "Food")
+        self.year, self.month = now.year, now.month
+
+    def _sync(self, view, query, **headers):
+        request = RequestFactory().get("/" + query, headers=headers)
+        request.user = self.user
+        return view(request)
+
+    async def _async(self, view, query, **headers):
+        request = AsyncRequestFactory().get("/" + query, headers=headers)
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        return await view(request)
+
+    async def test_same_responses_as_sync_views(self):
+        month = f"{self.year}-{self.month:02d}"
+        cases = [
+            ("accounts_api", ""),
+            ("pet_status_api", ""),
+            ("spending_api", f"?mode=monthly&month={month}&limit=2"),
+            ("spending_api", f"?mode=monthly&month={month}&summary=1"),
+            ("spending_api", "?limit=0"),
+            ("spending_overview_api", f"?mode=monthly&month={month}&limit=2"),
+            ("spending_api", "?mode=monthly&month=2024-13"),
+            ("spending_overview_api", "?mode=monthly&month=abc"),
+            ("stats_summary_api", f"?year={self.year}&month={self.month}&type=expense"),
+            ("stats_summary_api", "?year=x&month=1&type=expense"),
+            ("stats_yearly_api", f"?year={self.year}"),
+            ("stats_yearly_api", f"?from={self.year - 1}&to={self.year}"),
+            ("stats_yearly_api", ""),
+            ("stats_batch_api", f"?period={month}&period={month}:income"),
+            ("stats_batch_api", "?from=x&to=y"),
+        ]
+        for name, query in cases:
+            expected = await sync_to_async(self._sync)(getattr(views, name), query)
+            response = await self._async(getattr(async_views, name), query)
+            self.assertEqual(response.status_code, expected.status_code, name + query)
+            self.assertEqual(
+                json.loads(response.content), json.loads(expected.content), name + query
+            )
+            for header in ("ETag", "X-Total-Income", "X-Total-Count"):
+                self.assertEqual(response.get(header), expected.get(header), header)
+
+    async def test_matching_etag_returns_304(self):
+        first = await self._async(async_views.accounts_api, "")
+        response = await self._async(
+            async_views.accounts_api, "", if_none_match=first["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_sync_views_are_routed_by_default(self):
+        self.assertFalse(settings.ASYNC_JSON_API)
+        self.assertIs(resolve(reverse("accounts_api")).func, views.accounts_api)
+
+
+class GenerateDataTests(TestCase):
+    """
+    ทดสอบ management command generate_data และ path ที่ loadtest ใช้
+    """
+
+    def _generate(self, *args):
+        call_command(
+            "generate_data",
+            "--users",
+            "3",
+            "--years",
+            "1",
+            "--end",
+            "2025-06-30",
+            *args,
+            stdout=StringIO(),
+        )
+
+    def _ledger(self):
+        rows = Transaction.objects.order_by("user__username", "date", "trans_id")
+        return list(
+            rows.values_list(
+                "user__username",
+                "trans_type",
+                "date",
+                "amount",
+                "category_trans",
+                "account__account_name",
+                "counter_account__account_name",
+            )
+        )
+
+    def test_generates_consistent_ledger(self):
+        self._generate("--batch-size", "2")
+
+        users = User.objects.filter(username__startswith="load")
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 3)
+        self.assertEqual(LedgerVersion.objects.filter(user__in=users).count(), 3)
+        self.assertTrue(Category.objects.filter(user__in=users).exists())
+        self.assertTrue(Transaction.objects.filter(category_trans="Salary").exists())
+        # โอนมีสองขาที่ชี้หากัน
+        transfers = Transaction.objects.exclude(counter_account=None)
+        self.assertEqual(
+            transfers.filter(trans_type="income").count(),
+            transfers.filter(trans_type="expense").count(),
+        )
+        call_command("reconcile_balances", stdout=StringIO())
+        call_command("rollups", "--verify", stdout=StringIO())
+        self.assertTrue(self.client.login(username="load0", password="loadtest"))
+
+    def test_same_seed_gives_same_data(self):
+        self._generate()
+        first = self._ledger()
+        with self.assertRaises(CommandError):
+            self._generate()
+
+        self._generate("--clear", "--batch-size", "1")
+        self.assertEqual(self._ledger(), first)
+        self.assertEqual(User.objects.filter(username__startswith="load").count(), 3)
+
+        self._generate("--clear", "--seed", "7")
+        self.assertNotEqual(self._ledger(), first)
+
+    def test_loadtest_paths_resolve_and_load(self):
+        from home.management.commands import loadtest
+
+        self._generate()
+        user = User.objects.get(username="load0")
+        self.client.force_login(user)
+        year, month = loadtest.recent_months(1)[-1]
+        for template in loadtest.SUITES["all"]:
+            path = template.format(user_id=user.pk, year=year, month=month)
+            self.assertNotEqual(
+                resolve(path.partition("?")[0]).url_name, "landing", path
+            )
+            self.assertEqual(self.client.get(path).status_code, 200, path)
+
+
+class QueryBudgetMixin:
+    """
+    ตรึงจำนวน query (ต้องตรงเป๊ะ) และเวลาสูงสุดของ request หนึ่งอัน
+    query ที่เพิ่มขึ้น = round trip ที่เพิ่มขึ้น ทำให้ test fail
+    (ถ้าตั้งใจ ให้แก้ตัวเลขใน BUDGETS พร้อมเหตุผล)
+
+    ทุกรอบเริ่มจาก cache ว่าง (snapshot ยังไม่ถูกสร้าง)
+    และ rollback ข้อมูลที่ request เขียน
+
+    เวลาตรวจเฉพาะเมื่อเปิด QUERY_BUDGET_LATENCY=True (ขึ้นกับเครื่อง ไม่ใช่ตัวโค้ด
+    เครื่อง CI ที่โหลดหนักจะ fail ทั้งที่ไม่มีอะไรเปลี่ยน) วัดจากรอบที่เร็วที่สุดใน
+    LATENCY_RUNS รอบ กันเครื่องช้าชั่วคราว
+    """
+
+    LATENCY_RUNS = 3
+
+    def before_request(self):
+        """เรียกก่อนทุกรอบ (นอกการนับ query) เช่น login ใหม่"""
+
+    def assertBudget(self, label, send, queries, max_ms, status=None):
+        check_latency = getattr(settings, "QUERY_BUDGET_LATENCY", False)
+        timings = []
+        for _ in range(self.LATENCY_RUNS if check_latency else 1):
+            self.before_request()
+            cache.clear()
+            savepoint = transaction.savepoint()
+            try:
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = send()
+                    timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                transaction.savepoint_rollback(savepoint)
+            if status is not None:
+                self.assertEqual(response.status_code, status, label)
+            self.assertEqual(
+                len(captured),
+                queries,
+                f"{label}: {len(captured)} queries, budget {queries}\n"
+                + "\n".join(query["sql"] for query in captured),
+            )
+        if check_latency:
+            self.assertLess(
+                min(timings),
+                max_ms,
+                f"{label}: {min(timings):.1f} ms, budget {max_ms} ms",
+            )
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    จำนวน query และเวลาสูงสุดของทุก URL ใน home/urls.py
+    test_budgets_hold_with_more_data รันชุดเดียวกันหลังเพิ่มข้อมูลหลายเท่า
+    จำนวน query ต้องไม่เปลี่ยน (จับ N+1 / loop ต่อเดือน ต่อบัญชี ต่อ category)
+    """
+
+    # (ชื่อ, method, path, data, จำนวน query, ms, status)
+    # จำนวน query เป็น callable(test) ได้ สำหรับ request ที่โตตามจำนวน batch ไม่ใช่จำนวนแถว
+    # request ที่ต้อง login เริ่มด้วย session + user เสมอ
+    # view ที่ hash รหัสผ่านได้ 1000 ms: ผ่านทั้ง settings_test (MD5) และ PBKDF2 จริง
+    BUDGETS = [
+        ("landing", "get", "/", None, 2, 100, 302),
+        ("landing catch-all", "get", "/dashboard/", None, 2, 100, 302),
+        ("home", "get", "/{uid}/", None, 6, 200, 200),
+        ("home page", "get", "/{uid}/home/", None, 6, 200, 200),
+        ("dashboard", "get", "/{uid}/dashboard/", None, 6, 200, 200),
+        ("income page", "get", "/{uid}/transaction/income/", None, 4, 200, 200),
+        ("expense page", "get", "/{uid}/transaction/expense/", None, 4, 200, 200),
+        ("transfer page", "get", "/{uid}/transaction/transfer/", None, 4, 200, 200),
+        (
+            "add income",
+            "post",
+            "/{uid}/transaction/income/",
+            {"category_name": "Salary", "date": "2024-01-20", "amount": "10",
+             "account": "Bank"},
+            13,
+            200,
+            302,
+        ),
+        (
+            "add expense",
+            "post",
+            "/{uid}/transaction/expense/",
+            {"category_name": "Category 0", "date": "2024-01-20", "amount": "10",
+             "account": "Cash"},
+            15,
+            200,
+            302,
+        ),
+        (
+            "add transfer",
+            "post",
+            "/{uid}/transaction/transfer/",
+            {"category_name": "Bank Transfer", "date": "2024-01-20", "amount": "10",
+             "from_account": "Bank", "to_account": "Cash"},
+            20,
+            200,
+            302,
+        ),
+        ("stats page", "get", "/{uid}/stats/", None, 4, 200, 200),
+        (
+            "stats summary",
+            "get",
+            "/api/stats/summary/?year=2024&month=1&type=expense",
+            None,
+            4,
+            100,
+            200,
+        ),
+        ("stats yearly", "get", "/api/stats/yearly/?year=2024", None, 4, 100, 200),
+        (
+            "stats batch",
+            "get",
+            "/api/stats/batch/?from=2023-01&to=2027-12",
+            None,
+            4,
+            100,
+            200,
+        ),
+        (
+            "stats yearly range",
+            "get",
+            "/api/stats/yearly/?from=2024&to=2025",
+            None,
+            4,
+            100,
+            200,
+        ),
+        ("settings", "get", "/{uid}/settings/", None, 3, 200, 200),
+        (
+            "settings mascot",
+            "post",
+            "/{uid}/settings/",
+            {"update_mascot": "1"},
+            4,
+            200,
+            302,
+        ),
+        ("password change page", "get", "/password_change/", None, 3, 200, 200),
+        (
+            "password change",
+            "post",
+            "/password_change/",
+            {"old_password": "password", "new_password1": "N3w-passw0rd!",
+             "new_password2": "N3w-passw0rd!"},
+            12,
+            1000,
+            302,
+        ),
+        (
+            "delete user",
+            "post",
+            "/delete_account/",
+            {"password": "password"},
+            # cascade ลบ Transaction ทีละ GET_ITERATOR_CHUNK_SIZE แถว
+            lambda test: 23 + test.transaction_batches(),
+            1000,
+            302,
+        ),
+        ("categories", "get", "/{uid}/edit/category/", None, 3, 200, 200),
+        (
+            "add category",
+            "post",
+            "/{uid}/edit/category/",
+            {"category_name": "Gift", "trans_type": "income"},
+            7,
+            200,
+            302,
+        ),
+        ("accounts page", "get", "/{uid}/accounts/", None, 4, 200, 200),
+        (
+            "add account",
+            "post",
+            "/{uid}/accounts/",
+            {"account_name": "Wallet", "balance": "0"},
+            5,
+            200,
+            302,
+        ),
+        (
+            "delete empty account",
+            "post",
+            "/{uid}/accounts/delete/{empty}/",
+            None,
+            7,
+            200,
+            302,
+        ),
+        (
+            "rename account",
+            "post",
+            "/api/accounts/update/{empty}/",
+            '{"account_name": "Renamed"}',
+            6,
+            100,
+            200,
+        ),
+        ("contact", "get", "/contact/", None, 3, 100, 200),
+        (
+            "spending monthly",
+            "get",
+            "/api/spending/?mode=monthly&month=2024-01&limit=50",
+            None,
+            5,
+            100,
+            200,
+        ),
+        (
+            "spending summary",
+            "get",
+            "/api/spending/?mode=yearly&year=2024&summary=1",
+            None,
+            4,
+            100,
+            200,
+        ),
+        (
+            "spending overview",
+            "get",
+            "/api/spending/overview/?limit=50",
+            None,
+            5,
+            100,
+            200,
+        ),
+        ("accounts api", "get", "/api/accounts/", None, 5, 100, 200),
+        ("import", "post", "/api/transactions/import/", "csv", 12, 300, 200),
+        ("export", "get", "/api/transactions/export/", None, 4, 100, 200),
+        (
+            "export ndjson gzip",
+            "get",
+            "/api/transactions/export/?format=ndjson&gzip=1",
+            None,
+            4,
+            100,
+            200,
+        ),
+        ("pet chat", "get", "/pet/chat/", None, 2, 100, 200),
+        ("pet status", "get", "/pet/status/", None, 5, 100, 200),
+        ("pet status stream (WSGI)", "get", "/pet/status/stream/", None, 2, 100, 204),
+        ("metrics (not staff)", "get", "/metrics", None, 2, 50, 404),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="budgetuser", password="password")
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.bank = Account.objects.create(
+            user=self.user, account_name="Bank", type_acc="Bank", balance=0
+        )
+        self.empty = Account.objects.create(
+            user=self.user, account_name="Empty", type_acc="Bank", balance=0
+        )
+        for trans_type, name in (
+            ("income", "Salary"),
+            ("expense", "Food"),
+            ("transfer", "Bank Transfer"),
+        ):
+            Category.objects.create(
+                user=self.user, trans_type=trans_type, category_name=name
+            )
+        self.add_ledger(["Cash"], months=2, categories=1)
+
+    def add_ledger(self, account_names, months, categories):
+        """
+        ทุกเดือน (นับจาก 2024-01): เงินเดือนเข้า Bank โอนเข้าแต่ละบัญชี
+        และรายจ่ายจากแต่ละบัญชีใน categories category
+        """
+        accounts = [
+            Account.objects.create(
+                user=self.user, account_name=name, type_acc="Wallet", balance=0
+            )
+            for name in account_names
+        ]
+        for index in range(months):
+            date = f"{2024 + index // 12}-{index % 12 + 1:02d}-05"
+            ledger.post_income(self.user, self.bank, Decimal("1000"), date, "Salary")
+            for account in accounts:
+                ledger.post_transfer(
+                    self.user, self.bank, account, Decimal("100"), date, "Bank Transfer"
+                )
+                for category in range(categories):
+                    ledger.post_expense(
+                        self.user, account, Decimal("10"), date, f"Category {category}"
+                    )
+
+    def before_request(self):
+        # logout / ลบ user / เปลี่ยนรหัสผ่าน ในรอบก่อนทำให้ session หลุด
+        self.client.force_login(self.user)
+
+    def send(self, method, path, data):
+        if data == "csv":
+            content = "Date,Amount,Category,Account\n2024-01-20,-40,Category 0,Cash\n"
+            data = {"file": SimpleUploadedFile("bank.csv", content.encode())}
+        if isinstance(data, str):
+            return self.client.post(path, data, content_type="application/json")
+        response = getattr(self.client, method)(path, data)
+        if response.streaming:
+            # query ของ StreamingHttpResponse เกิดตอนอ่าน body (export)
+            b"".join(response.streaming_content)
+        return response
+
+    def transaction_batches(self):
+        rows = Transaction.objects.filter(user=self.user).count()
+        return -(-rows // GET_ITERATOR_CHUNK_SIZE)
+
+    def check_budgets(self):
+        for label, method, path, data, queries, max_ms, status in self.BUDGETS:
+            path = path.format(uid=self.user.pk, empty=self.empty.pk)
+            if callable(queries):
+                queries = queries(self)
+            with self.subTest(label):
+                self.assertBudget(
+                    label,
+                    lambda: self.send(method, path, data),
+                    queries,
+                    max_ms,
+                    status,
+                )
+
+    def test_budgets(self):
+        self.check_budgets()
+
+    def test_budgets_hold_with_more_data(self):
+        self.add_ledger([f"Wallet {i}" for i in range(5)], months=24, categories=6)
+        self.check_budgets()
+
+    def test_every_url_has_a_budget(self):
+        from home.urls import urlpatterns
+
+        covered = {
+            resolve(path.format(uid=1, empty=1).partition("?")[0]).route
+            for _, _, path, _, _, _, _ in self.BUDGETS
+        }
+        self.assertEqual({str(url.pattern) for url in urlpatterns} - covered, set())
+
+
+@override_settings(SQL_PROFILING=True, SQL_PROFILING_SLOW_MS=60000)
+class QueryProfilingMiddlewareTests(TestCase):
+    """
+    ทดสอบ home/middleware.py: Server-Timing, log ต่อ request และ slow-request log
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="profuser", password="password")
+        cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+        ledger.post_expense(self.user, cash, Decimal("10"), timezone.now(), "Food")
+        # Client สร้าง middleware chain ตอน request แรก จึงต้องสร้างหลัง override
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get(self):
+        with self.assertLogs("home.middleware", "INFO") as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("accounts_api"))
+        return response, logs, queries
+
+    def test_server_timing_and_log_line(self):
+        response, logs, queries = self.get()
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertRegex(timing, r"^db;dur=[0-9.]+;.*, total;dur=[0-9.]+$")
+
+        [record] = logs.records
+        self.assertEqual(record.name, "home.middleware")
+        line = json.loads(record.getMessage())
+        self.assertEqual(line["path"], "/api/accounts/")
+        self.assertEqual(line["view"], "accounts_api")
+        self.assertEqual(line["status"], 200)
+        self.assertEqual(line["queries"], len(queries))
+        self.assertEqual(len(line["slowest"]), settings.SQL_PROFILING_TOP)
+        self.assertGreaterEqual(line["total_ms"], line["db_ms"])
+        self.assertNotIn("sql", line)
+
+    @override_settings(SQL_PROFILING_SLOW_MS=0, SQL_PROFILING_SAMPLE_RATE=1)
+    def test_slow_request_logs_full_sql(self):
+        response, logs, queries = self.get()
+        slow = [r for r in logs.records if r.name == "home.middleware.slow"]
+        self.assertEqual(len(slow), 1)
+        line = json.loads(slow[0].getMessage())
+        self.assertEqual(len(line["sql"]), len(queries))
+        statements = " ".join(query["sql"] for query in line["sql"])
+        self.assertIn('FROM "home_account"', statements)
+        self.assertIn(str(self.user.pk), "".join(q["params"] for q in line["sql"]))
+
+    @override_settings(SQL_PROFILING_SLOW_MS=0, SQL_PROFILING_SAMPLE_RATE=0)
+    def test_slow_request_log_is_sampled(self):
+        response, logs, queries = self.get()
+        self.assertEqual([r.name for r in logs.records], ["home.middleware"])
+
+    async def test_async_views_are_profiled(self):
+        async def view(request):
+            return await sync_to_async(views.accounts_api)(request)
+
+        middleware = QueryProfilingMiddleware(view)
+        request = AsyncRequestFactory().get("/api/accounts/")
+        request.user = self.user
+        request.resolver_match = None
+        with self.assertLogs("home.middleware", "INFO") as logs:
+            response = await middleware(request)
+        self.assertEqual(response.status_code, 200)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertGreater(line["queries"], 0)
+        self.assertIn(f'desc="{line["queries"]} queries"', response["Server-Timing"])
+
+    @override_settings(SQL_PROFILING=False)
+    def test_disabled_middleware_is_not_loaded(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryProfilingMiddleware(lambda request: None)
+        self.client = Client()
+        self.client.force_login(self.user)
+        with self.assertNoLogs("home.middleware"):
+            response = self.client.get(reverse("accounts_api"))
+        self.assertNotIn("Server-Timing", response)
+
+
+class MetricsTests(TestCase):
+    """
+    ทดสอบ home/metrics.py: ค่าต่อ thread, รวมข้าม process ผ่าน METRICS_DIR และ /metrics
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.registry = metrics.Registry()
+        self.counter = metrics.Counter(
+            "test_total", "Test counter.", ["kind"], registry=self.registry
+        )
+        self.histogram = metrics.Histogram(
+            "test_seconds", "Test histogram.", buckets=(0.1, 1), registry=self.registry
+        )
+
+    def test_render_prometheus_text(self):
+        self.counter.inc("a")
+        self.counter.inc("a", amount=2)
+        self.counter.inc('say "hi"')
+        for value in (0.05, 0.5, 5):
+            self.histogram.observe(value)
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP test_seconds Test histogram.\n"
+            "# TYPE test_seconds histogram\n"
+            'test_seconds_bucket{le="0.1"} 1\n'
+            'test_seconds_bucket{le="1.0"} 2\n'
+            'test_seconds_bucket{le="+Inf"} 3\n'
+            "test_seconds_sum 5.55\n"
+            "test_seconds_count 3\n"
+            "# HELP test_total Test counter.\n"
+            "# TYPE test_total counter\n"
+            'test_total{kind="a"} 3\n'
+            'test_total{kind="say \\"hi\\""} 1\n',
+        )
+        with self.assertRaises(ValueError):
+            self.counter.inc()
+        with self.assertRaises(ValueError):
+            metrics.Counter("test_total", "Duplicate.", registry=self.registry)
+
+    def test_threads_are_summed_and_kept_after_exit(self):
+        barrier = threading.Barrier(8)
+
+        def work():
+            barrier.wait()
+            for _ in range(1000):
+                self.counter.inc("a")
+                self.histogram.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del threads, thread
+
+        values = self.registry.local_values()
+        self.assertEqual(values[("test_total", ("a",))], 8000)
+        self.assertEqual(values[("test_seconds", ())], [0, 8000, 0, 4000.0, 8000])
+        # thread ที่จบแล้วถูกรวมเข้ากองกลาง ไม่ค้างเป็น shard
+        self.assertEqual(self.registry._shards, [])
+
+    def test_ledger_and_import_are_timed(self):
+        user = User.objects.create_user(username="timeduser", password="password")
+        cash = Account.objects.create(
+            user=user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+
+        def values():
+            local = metrics.REGISTRY.local_values()
+            name = "budgy_ledger_write_duration_seconds"
+            return (
+                local.get((name, ("income",)), [0])[-1],
+                local.get((name, ("import",)), [0])[-1],
+                local.get(("budgy_import_rows_total", ("created",)), 0),
+                local.get(("budgy_import_rows_total", ("skipped",)), 0),
+            )
+
+        before = values()
+        ledger.post_income(user, cash, Decimal("10"), timezone.now(), "Salary")
+        content = "date,amount,category,account\n2025-01-06,-40,Food,Cash\nbad,1,,\n"
+        rows = importers.parse_csv(StringIO(content))
+        importers.import_rows(user, rows)
+        self.assertEqual([b - a for a, b in zip(before, values())], [1, 1, 1, 1])
+
+    def test_shared_directory_sums_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = metrics.Registry()
+            shared = metrics.Counter("test_total", "Test.", ["kind"], registry=other)
+            shared.inc("a", amount=5)
+            other.directory = self.registry.directory = directory
+            with patch("home.metrics.os.getpid", return_value=1):
+                other.flush()
+            # ไฟล์ที่อ่านไม่ได้ (เขียนไม่เสร็จ/เสีย) ถูกข้าม ไม่ทำให้ /metrics พัง
+            with open(os.path.join(directory, "metrics-2.json"), "w") as file:
+                file.write("[")
+            self.counter.inc("a")
+            self.registry.flush()
+            self.assertEqual(self.registry.collect(), {("test_total", ("a",)): 6})
+            self.assertEqual(len(os.listdir(directory)), 3)
+
+    def test_metrics_endpoint(self):
+        user = User.objects.create_user(
+            username="metricsuser", password="password", is_staff=True
+        )
+        self.client.force_login(user)
+        self.client.get(reverse("accounts_api"))
+        self.client.get(reverse("accounts_api"))
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn(
+            'budgy_http_requests_total{view="accounts_api",method="GET",status="200"}',
+            body,
+        )
+        self.assertIn(
+            'budgy_http_request_duration_seconds_count{view="accounts_api",method="GET"}',
+            body,
+        )
+        self.assertIn('budgy_finance_snapshot_lookups_total{result="hit"}', body)
+        self.assertIn('budgy_finance_snapshot_lookups_total{result="miss"}', body)
+        self.assertIn("# TYPE budgy_email_requests_total counter", body)
+
+    def test_metrics_fail_closed_without_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        user = User.objects.create_user(username="notstaff", password="password")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get(
+            "/metrics", headers={"authorization": "Bearer secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ExportTransactionsTests(TestCase):
+    """
+    ทดสอบ export แบบ stream (home/exporters.py, export_transactions_api, command)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="exportuser", password="password")
+        self.client = Client()
+        self.client.login(username="exportuser", password="password")
+        self.cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+        self.bank = Account.objects.create(
+            user=self.user, account_name="Bank", type_acc="Bank", balance=0
+        )
+        ledger.post_income(self.user, self.bank, Decimal("1000"), "2025-01-31", "Salary")
+        ledger.post_expense(self.user, self.cash, Decimal("12.50"), "2025-01-05", "Food")
+        ledger.post_transfer(
+            self.user, self.bank, self.cash, Decimal("200"), "2025-02-01", "Transfer"
+        )
+
+    def export(self, query=""):
+        response = self.client.get(reverse("export_transactions_api") + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_export_streams_ledger_in_date_order(self):
+        response, body = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="budgy-exportuser-ledger.csv"',
+        )
+        rows = [
+            tuple(row[key] for key in ("type", "amount", "category", "account"))
+            + (row["transfer_account"],)
+            for row in csv.DictReader(StringIO(body.decode()))
+        ]
+        self.assertEqual(
+            rows,
+            [
+                ("expense", "12.50", "Food", "Cash", ""),
+                ("income", "1000.00", "Salary", "Bank", ""),
+                ("expense", "200.00", "Transfer", "Bank", "Cash"),
+                ("income", "200.00", "Transfer", "Cash", "Bank"),
+            ],
+        )
+
+    def test_csv_export_can_be_imported_back(self):
+        _, body = self.export()
+        other = User.objects.create_user(username="copy", password="password")
+        for name in ("Cash", "Bank"):
+            Account.objects.create(
+                user=other, account_name=name, type_acc="Wallet", balance=0
+            )
+        result = importers.import_rows(
+            other, importers.parse_csv(StringIO(body.decode()))
+        )
+        self.assertEqual((result.created, result.skipped), (4, 0))
+        for year, month in ((2025, 1), (2025, 2)):
+            self.assertEqual(
+                rollups.month_totals(other, year, month),
+                rollups.month_totals(self.user, year, month),
+            )
+
+    def test_ndjson_gzip_export(self):
+        response, body = self.export("?format=ndjson&gzip=1")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn("budgy-exportuser-ledger.ndjson.gz", response["Content-Disposition"])
+        lines = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        first = json.loads(lines[0])
+        self.assertEqual(
+            {key: first[key] for key in ("type", "amount", "account")},
+            {"type": "expense", "amount": "12.50", "account": "Cash"},
+        )
+        self.assertTrue(first["date"].startswith("2025-01-05T"))
+
+    def test_rejects_unknown_format_and_requires_login(self):
+        response = self.client.get(reverse("export_transactions_api") + "?format=xml")
+        self.assertEqual(response.status_code, 400)
+        self.client.logout()
+        response = self.client.get(reverse("export_transactions_api"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_reads_in_chunks_with_constant_queries(self):
+        for day in range(1, 21):
+            ledger.post_expense(
+                self.user, self.cash, Decimal("1"), f"2025-03-{day:02d}", "Food"
+            )
+        with self.assertNumQueries(2):  # ชื่อบัญชี + รายการ (iterator)
+            chunks = list(exporters.stream(self.user.pk, chunk_size=5))
+        # header + 24 แถว / 5 ต่อ chunk
+        self.assertEqual(len(chunks), 1 + 5)
+        self.assertEqual(b"".join(chunks).count(b"\n"), 25)
+
+    async def test_async_stream_matches_sync(self):
+        expected = await sync_to_async(
+            lambda: b"".join(exporters.stream(self.user.pk, "ndjson", chunk_size=3))
+        )()
+        chunks = [
+            chunk
+            async for chunk in exporters.astream(self.user.pk, "ndjson", chunk_size=3)
+        ]
+        self.assertEqual(b"".join(chunks), expected)
+
+    def test_command_writes_file_or_stdout(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ledger.csv.gz")
+            out = StringIO()
+            call_command(
+                "export_transactions", "exportuser", "--gzip", "--output", path,
+                stdout=out,
+            )
+            with gzip.open(path, "rt") as file:
+                self.assertEqual(len(file.read().splitlines()), 5)
+            self.assertIn("Wrote", out.getvalue())
+
+        out = StringIO()
+        call_command(
+            "export_transactions", "exportuser", "--format", "ndjson", stdout=out
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+        with self.assertRaises(CommandError):
+            call_command("export_transactions", "nobody", stdout=StringIO())
+
 
 class SettingsAndDeleteAccountTests(TestCase):
     """
@@ -943,6 +2948,28 @@ class SettingsAndDeleteAccountTests(TestCase):
         # user ถูกลบออกจากฐานข้อมูล
         self.assertFalse(User.objects.filter(id=self.user.id).exists())
 
+    def test_delete_account_removes_ledger_data(self):
+        cash = Account.objects.create(
+            user=self.user, account_name="Cash", type_acc="Wallet", balance=0
+        )
+        bank = Account.objects.create(
+            user=self.user, account_name="Bank", type_acc="Bank", balance=0
+        )
+        ledger.post_income(self.user, bank, Decimal("100"), "2025-01-05", "Salary")
+        ledger.post_transfer(self.user, bank, cash, Decimal("40"), "2025-01-06", "ATM")
+
+        self.client.post(reverse("delete_account"), data={"password": self.password})
+
+        for model in (
+            Transaction,
+            Account,
+            Category,
+            MonthReport,
+            CategoryMonthReport,
+            LedgerVersion,
+        ):
+            self.assertFalse(model.objects.filter(user_id=self.user.id).exists())
+
     def test_settings_update_username_invalid(self):
         response = self.client.post(
             reverse("settings", args=[self.user.id]),
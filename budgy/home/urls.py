@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import path, re_path
-from . import views
+from . import async_views, views
 from django.contrib.auth import views as auth_views
 
+# JSON APIs แบบอ่านอย่างเดียว: async views เมื่อ deploy ผ่าน ASGI (ดู home/async_views.py)
+api_views = async_views if settings.ASYNC_JSON_API else views
+
 
 urlpatterns = [
     # error handling for when no user_id is provided
@@ -26,8 +30,9 @@ urlpatterns = [
         name="transaction_transfer",
     ),
     path("<int:user_id>/stats/", views.stats_page, name="stats"),
-    path("api/stats/summary/", views.stats_summary_api, name="stats_summary_api"),
-    path("api/stats/yearly/", views.stats_yearly_api, name="stats_yearly_api"),
+    path("api/stats/summary/", api_views.stats_summary_api, name="stats_summary_api"),
+    path("api/stats/yearly/", api_views.stats_yearly_api, name="stats_yearly_api"),
+    path("api/stats/batch/", api_views.stats_batch_api, name="stats_batch_api"),
     
     path("<int:user_id>/settings/", views.settings_page, name="settings"),
     path('password_change/', auth_views.PasswordChangeView.as_view(template_name='home/password_change.html', success_url='/settings/'), name='password_change'),
@@ -40,12 +45,30 @@ urlpatterns = [
     path("api/accounts/update/<int:account_id>/", views.update_account_api, name="update_account_api"),
 
     path("contact/", views.contact, name="contact"),
-    path("api/spending/", views.spending_api, name="spending_api"),
-    path("api/accounts/", views.accounts_api, name="accounts_api"),
+    path("api/spending/", api_views.spending_api, name="spending_api"),
+    path(
+        "api/spending/overview/",
+        api_views.spending_overview_api,
+        name="spending_overview_api",
+    ),
+    path("api/accounts/", api_views.accounts_api, name="accounts_api"),
+    path(
+        "api/transactions/import/",
+        views.import_transactions_api,
+        name="import_transactions_api",
+    ),
+    path(
+        "api/transactions/export/",
+        views.export_transactions_api,
+        name="export_transactions_api",
+    ),
     
     #MASCOT
     path('pet/chat/', views.pet_chat_api, name='pet_chat_api'),
-    path('pet/status/', views.pet_status_api, name='pet_status_api'),
+    path('pet/status/', api_views.pet_status_api, name='pet_status_api'),
+    path('pet/status/stream/', views.pet_status_stream, name='pet_status_stream'),
+
+    re_path(r"^metrics/?$", views.metrics_view, name="metrics"),
 
     # catch-all for any other paths without user_id
     re_path(r"^([a-zA-Z]+)/$", views.landing_page, name="landing"),
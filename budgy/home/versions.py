@@ -0,0 +1,168 @@
+"""
+Ledger version ต่อ user สำหรับ conditional GET (ETag / Last-Modified)
+
+LedgerVersion.version ขยับทุกครั้งที่ Transaction / Account / Category ของ user
+เปลี่ยน (signals ใน home/signals.py และ bulk import / reconcile เรียก bump() เอง)
+และขยับใน transaction เดียวกับการเขียน จึงเห็นพร้อมกับข้อมูลเสมอ
+
+@ledger_condition ใช้ Django condition() ตอบ 304 Not Modified จาก version
+(PK lookup ครั้งเดียว) ก่อนจะเข้า view ที่ต้อง query/aggregate จริง
+view ที่อ่าน finance snapshot ส่ง for_request(request) ให้ snapshot.get() เพื่อให้
+body สร้างจาก version และเดือนเดียวกับที่อยู่ใน ETag
+
+SSE ของ mascot เช็ก version ทุกไม่กี่วินาทีต่อ tab จึงอ่านจาก cache (acached)
+แทน database: bump() ลบค่าใน cache ให้อ่านใหม่ครั้งเดียวหลังมีการเขียน
+(cache แบบ locmem เป็นของแต่ละ process ค่าที่ worker อื่นเขียนจะเห็นช้าสุด
+LEDGER_VERSION_CACHE_TIMEOUT วินาที)
+"""
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import periods
+from .models import LedgerVersion
+
+DEFAULT_CACHE_TIMEOUT = 60
+
+
+def _cache_key(user_id):
+    return f"ledger_version:{user_id}"
+
+
+def bump(user_id, create=True):
+    """
+    ขยับ version ของ user (สร้างแถวถ้ายังไม่มี)
+    create=False สำหรับตอนลบ: ถ้าแถวถูกลบไปแล้ว (ลบ user ทั้งคน) ไม่ต้องสร้างใหม่
+    """
+    forget(user_id)
+    now = timezone.now()
+    rows = LedgerVersion.objects.filter(user_id=user_id)
+    if rows.update(version=F("version") + 1, updated_at=now) or not create:
+        return
+    try:
+        with transaction.atomic():
+            LedgerVersion.objects.create(user_id=user_id, version=1, updated_at=now)
+    except IntegrityError:
+        # request อื่นสร้างแถวนี้ไปก่อนแล้ว
+        rows.update(version=F("version") + 1, updated_at=now)
+
+
+def current(user):
+    """คืน (version, updated_at) ของ user; ยังไม่เคยเขียนอะไรเลย = (0, date_joined)"""
+    stamp = (
+        LedgerVersion.objects.filter(user_id=user.pk)
+        .values_list("version", "updated_at")
+        .first()
+    )
+    return stamp or (0, user.date_joined)
+
+
+async def acurrent(user):
+    """current() สำหรับ async views (เช่น SSE ของ mascot)"""
+    stamp = await (
+        LedgerVersion.objects.filter(user_id=user.pk)
+        .values_list("version", "updated_at")
+        .afirst()
+    )
+    return stamp or (0, user.date_joined)
+
+
+def forget(user_id):
+    """
+    ลบ version ที่ cache ไว้: ลบทันที และลบซ้ำหลัง commit
+    (กัน SSE ที่อ่านค่าก่อน commit แล้วเขียนค่าเก่ากลับเข้า cache)
+    """
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+async def acached(user):
+    """
+    version ของ user จาก cache สำหรับ SSE ที่เช็กซ้ำทุกไม่กี่วินาที
+    คืน (version, from_db): อ่าน database เฉพาะตอนไม่มีใน cache (หลัง bump/หมดอายุ)
+    """
+    key = _cache_key(user.pk)
+    version = await cache.aget(key)
+    if version is not None:
+        return version, False
+    version, _ = await acurrent(user)
+    timeout = getattr(settings, "LEDGER_VERSION_CACHE_TIMEOUT", DEFAULT_CACHE_TIMEOUT)
+    await cache.aset(key, version, timeout)
+    return version, True
+
+
+def tag(user_id, version, period):
+    """ETag (และ event id ของ SSE) มีเดือนด้วย: ยอด "เดือนนี้" เปลี่ยนเมื่อขึ้นเดือนใหม่"""
+    year, month = period
+    return f"{user_id}-{version}-{year}{month:02d}"
+
+
+def _make_stamp(user, stamp):
+    # เดือนอ่านครั้งเดียวพร้อม version: ETag กับ body ใช้ค่าเดียวกันแม้คาบเที่ยงคืน
+    return (user.pk, *stamp, periods.current_month())
+
+
+def _stamp(request):
+    # etag_func และ last_modified_func ถูกเรียกแยกกัน: query ครั้งเดียวต่อ request
+    # (async views โหลดไว้ก่อนแล้วใน ledger_condition)
+    if not hasattr(request, "_ledger_stamp"):
+        request._ledger_stamp = _make_stamp(request.user, current(request.user))
+    return request._ledger_stamp
+
+
+def for_request(request):
+    """(version, (year, month)) ที่อยู่ใน ETag ของ request นี้"""
+    _, version, _, period = _stamp(request)
+    return version, period
+
+
+def _etag(request, *args, **kwargs):
+    user_id, version, _, period = _stamp(request)
+    return tag(user_id, version, period)
+
+
+def _last_modified(request, *args, **kwargs):
+    _, _, updated_at, _ = _stamp(request)
+    return updated_at
+
+
+def ledger_condition(view_func):
+    """
+    ETag / Last-Modified จาก ledger version และตอบ 304 ถ้า client มีข้อมูลล่าสุดแล้ว
+    ใช้ต่อจาก @login_required (ต้องมี request.user) ได้ทั้ง sync และ async views
+    """
+    conditional_view = condition(etag_func=_etag, last_modified_func=_last_modified)(
+        view_func
+    )
+
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # condition() เรียก etag_func แบบ sync: โหลด version ด้วย async ORM ไว้ก่อน
+            user = await request.auser()
+            request._ledger_stamp = _make_stamp(user, await acurrent(user))
+            response = await conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        # ให้ browser เก็บไว้แต่ต้องถาม server ทุกครั้ง (ส่ง If-None-Match มาเอง)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
@@ -1,29 +1,50 @@
 # import requests
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.models import User
 from django.utils.dateparse import parse_date
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.conf import settings
 from django.contrib import messages
-from django.views.decorators.csrf import csrf_exempt
-from django.utils import timezone
-from django.db.models import Sum
+from django.views.decorators.csrf import csrf_exempt, csrf_protect, ensure_csrf_cookie
+from django.db.models import Count, Sum
 from django.core.exceptions import ObjectDoesNotExist
 from datetime import datetime
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
-from .models import Transaction, Account, Category, MonthReport, Income, Expense
+from .models import Transaction, Account, Category
+import asyncio
 import calendar
+import hmac
 import json
-from django.views.decorators.http import require_POST
+import time
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_GET, require_POST
 from .forms import (
     UsernameUpdateForm,
     EmailUpdateForm,
     ProfilePictureUpdateForm,
     AccountDeleteForm,
 )
-from django.contrib.auth import logout, update_session_auth_hash
-from django.contrib.auth.forms import PasswordChangeForm
+from django.contrib.auth import logout
 from .models import Profile
+from . import (
+    exporters,
+    importers,
+    ledger,
+    metrics,
+    money,
+    pagination,
+    periods,
+    rollups,
+    snapshot,
+    versions,
+)
+
+# จำนวนปีสูงสุดที่ stats_yearly_api ยอมคืนในครั้งเดียว (?from=YYYY&to=YYYY)
+MAX_YEARLY_RANGE = 20
+# จำนวนเดือนสูงสุดที่ stats_batch_api ยอมคืนในครั้งเดียว
+MAX_BATCH_PERIODS = 60
 
 
 # Create your views here
@@ -38,37 +59,17 @@ def landing_page(request, user_id=None):
 def home_page(request, user_id):
     user = request.user
 
-    # --- 1. คำนวณยอดเงินคงเหลือทั้งหมด ---
-    # ดึงข้อมูล accounts ทั้งหมดของผู้ใช้ แล้วรวมยอด balance
-    # หากไม่มี account เลย ให้ค่าเป็น 0
-    total_balance = (
-        Account.objects.filter(user=user).aggregate(Sum("balance"))["balance__sum"] or 0
-    )
-
-    # --- 2. คำนวณยอดรวมของเดือนปัจจุบัน ---
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-
-    # ยอดรวมรายรับของเดือนปัจจุบัน
-    month_income = (
-        Income.objects.filter(
-            user=user, date__year=current_year, date__month=current_month
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    # ยอดรวมรายจ่ายของเดือนปัจจุบัน
-    month_expense = (
-        Expense.objects.filter(
-            user=user, date__year=current_year, date__month=current_month
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+    # --- 1-2. ยอดเงินคงเหลือทั้งหมด + รายรับ/รายจ่ายเดือนปัจจุบัน ---
+    # อ่านจาก finance snapshot ที่ cache ไว้ (ดู home/snapshot.py)
+    finance = snapshot.get(user)
+    total_balance = finance["total_balance"]
+    month_income = finance["month_income"]
+    month_expense = finance["month_expense"]
 
     # --- 3. คำนวณสัดส่วนรายจ่ายต่อรายรับ ---
     # ป้องกันการหารด้วยศูนย์ หากเดือนนี้ยังไม่มีรายรับ
     if month_income > 0:
-        expense_percentage = (month_expense / month_income) * 100
+        expense_percentage = money.percent(month_expense, month_income)
     else:
         expense_percentage = 0  # ถ้าไม่มีรายรับ ให้สัดส่วนเป็น 0
 
@@ -87,8 +88,9 @@ def home_page(request, user_id):
 def dashboard_today_page(request, user_id):
     user = request.user
     categories = Category.objects.filter(user=user)
-    accounts = Account.objects.filter(user=user).order_by("-id")  # ตัวอย่างเรียงล่าสุด
-    total_balance = sum(a.balance for a in accounts)
+    finance = snapshot.get(user)
+    accounts = finance["accounts"]  # เรียงล่าสุดก่อน
+    total_balance = finance["total_balance"]
 
     context = {
         "categories": categories,
@@ -100,56 +102,258 @@ def dashboard_today_page(request, user_id):
     return render(request, "home/dashboard.html", context)
 
 
-@login_required
-def spending_api(request):
+def _spending_queryset(request, user):
+    """
+    Transaction ของ user ตามช่วงที่เลือก (mode + date/month/year)
+    raise ValueError ถ้า month/year ไม่ถูกต้อง
+    """
     mode = request.GET.get("mode")
-    user = request.user
     spendings = Transaction.objects.filter(user=user)
 
+    # ใช้ช่วงเวลาแบบ half-open เพื่อให้ใช้ index (user, date) ได้
     if mode == "daily":
         date_str = request.GET.get("date")
         if date_str:
             selected_date = parse_date(date_str)
-            spendings = spendings.filter(date__date=selected_date)
+            if selected_date is None:
+                spendings = spendings.none()
+            else:
+                spendings = spendings.filter(
+                    **periods.date_filter(periods.day_range(selected_date))
+                )
     elif mode == "monthly":
         month_str = request.GET.get("month")  # YYYY-MM
         if month_str:
-            year, month = map(int, month_str.split("-"))
-            spendings = spendings.filter(date__year=year, date__month=month)
+            year, month = periods.parse_month(month_str)
+            spendings = spendings.filter(
+                **periods.date_filter(periods.month_range(year, month))
+            )
     elif mode == "yearly":
         year_str = request.GET.get("year")
         if year_str:
-            spendings = spendings.filter(date__year=int(year_str))
+            year = periods.parse_year(year_str)
+            spendings = spendings.filter(
+                **periods.date_filter(periods.year_range(year))
+            )
+    return spendings
 
-    # แปลงเป็น list JSON
-    data = [
+
+# helper ของ spending/accounts/stats APIs ใช้ร่วมกับ async views (home/async_views.py)
+# ส่วนที่ query แยกเป็น queryset ส่วนที่แปลงผลเป็น JSON แยกเป็นฟังก์ชันธรรมดา
+
+
+def _spending_rows(spendings):
+    return spendings.values("trans_id", "date", "category_trans", "amount", "trans_type")
+
+
+def _spending_json(rows):
+    return [
         {
-            "category": t.category_trans,
-            "amount": t.amount,
-            "type": t.trans_type,
+            "category": row["category_trans"],
+            "amount": money.as_number(row["amount"]),
+            "type": row["trans_type"],
         }
-        for t in spendings.order_by("-date")  # เรียงจากล่าสุด
+        for row in rows
     ]
 
-    return JsonResponse({"spendings": data})
+
+def _spending_page(request, spendings):
+    """หน้าหนึ่งของรายการ: คืน (list JSON, next_cursor) หรือ raise ValueError"""
+    limit = pagination.parse_limit(request.GET.get("limit"))
+    rows, next_cursor = pagination.keyset_page(
+        _spending_rows(spendings), request.GET.get("cursor"), limit
+    )
+    return _spending_json(rows), next_cursor
+
+
+def _spending_groups(spendings):
+    """grouped query เดียว: ยอดและจำนวนต่อชนิด/category"""
+    return (
+        spendings.values("trans_type", "category_trans")
+        .annotate(total=Sum("amount"), count=Count("trans_id"))
+        .order_by("trans_type", "-total")
+    )
+
+
+def _spending_summary(spendings):
+    """
+    ยอดรวมต่อชนิดและต่อ category ของทั้งช่วง ด้วย grouped query เดียว
+    คืน {"totals": {"income", "expense", "count"}, "categories": [...]}
+    """
+    return _summarize_groups(_spending_groups(spendings))
+
+
+def _summarize_groups(groups):
+    totals = {"income": 0, "expense": 0, "count": 0}
+    categories = []
+    for group in groups:
+        if group["trans_type"] in ("income", "expense"):
+            totals[group["trans_type"]] += group["total"]
+        totals["count"] += group["count"]
+        categories.append(
+            {
+                "category": group["category_trans"],
+                "type": group["trans_type"],
+                "total": money.as_number(group["total"]),
+                "count": group["count"],
+            }
+        )
+    totals["income"] = money.as_number(totals["income"])
+    totals["expense"] = money.as_number(totals["expense"])
+    return {"totals": totals, "categories": categories}
 
 
 @login_required
+@versions.ledger_condition
+def spending_api(request):
+    """
+    รายการของช่วงเวลาที่เลือก ทีละหน้า (เรียงจากล่าสุด)
+    รับ parameter: mode + date/month/year, ?limit= และ ?cursor= (next_cursor ของหน้าก่อน)
+    หน้าแรก (ไม่มี cursor) ส่งยอดรวมทั้งช่วงใน header X-Total-Income / X-Total-Expense
+    ?summary=1 คืนเฉพาะยอดรวมต่อชนิด/ต่อ category ไม่ส่งรายการ
+    """
+    try:
+        spendings = _spending_queryset(request, request.user)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if request.GET.get("summary") == "1":
+        return JsonResponse(_spending_summary(spendings))
+
+    try:
+        data, next_cursor = _spending_page(request, spendings)
+    except ValueError:
+        return _invalid_page()
+
+    # ยอดรวมทั้งช่วงคำนวณที่ server ครั้งเดียวตอนหน้าแรก (client ไม่ต้องรวมเองทุกหน้า)
+    totals = None
+    if not request.GET.get("cursor"):
+        totals = _spending_summary(spendings)["totals"]
+    return _spending_response(data, next_cursor, totals)
+
+
+def _invalid_page():
+    return JsonResponse({"error": "Invalid cursor or limit"}, status=400)
+
+
+def _spending_response(data, next_cursor, totals=None):
+    response = JsonResponse({"spendings": data, "next_cursor": next_cursor})
+    if totals is not None:
+        response["X-Total-Income"] = str(totals["income"])
+        response["X-Total-Expense"] = str(totals["expense"])
+        response["X-Total-Count"] = str(totals["count"])
+    return response
+
+
+@login_required
+@versions.ledger_condition
+def spending_overview_api(request):
+    """
+    Dashboard โหลดครั้งเดียว: ยอดรวม (summary) + หน้าแรกของรายการใน response เดียว
+    หน้าถัดไปใช้ spending_api พร้อม next_cursor
+    """
+    try:
+        spendings = _spending_queryset(request, request.user)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        data, next_cursor = _spending_page(request, spendings)
+    except ValueError:
+        return _invalid_page()
+
+    return JsonResponse(
+        {
+            **_spending_summary(spendings),
+            "spendings": data,
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@login_required
+@versions.ledger_condition
 def accounts_api(request):
-    user = request.user
-    accounts = Account.objects.filter(user=user).order_by("-id")[:3]
+    finance = snapshot.get(request.user, *versions.for_request(request))
+    return JsonResponse(_accounts_data(finance))
+
 
+def _accounts_data(finance):
     data = [
         {
-            "name": acc.account_name,
-            "balance": acc.balance,
+            "name": acc["name"],
+            "balance": money.as_number(acc["balance"]),
         }
-        for acc in accounts
+        for acc in finance["accounts"][:3]
     ]
+    return {"accounts": data, "total_balance": money.as_number(finance["total_balance"])}
+
+
+@login_required(login_url="/login/")
+@csrf_protect
+@require_POST
+def import_transactions_api(request):
+    """
+    Bulk import จาก bank statement (multipart: file, format?, account?)
+    เขียนรายการได้ทีละมาก จึงตรวจ CSRF เสมอ (CsrfViewMiddleware ยังปิดอยู่):
+    ส่ง csrftoken cookie (ได้จากหน้า accounts) พร้อม header X-CSRFToken
+    format: csv / ofx / qif (ถ้าไม่ส่งจะเดาจากนามสกุลไฟล์)
+    account: ชื่อบัญชีที่ใช้กับแถวที่ไม่ได้ระบุบัญชี (OFX/QIF ต้องส่งเสมอ)
+    """
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"error": "No file uploaded."}, status=400)
 
-    total_balance = sum(acc.balance for acc in Account.objects.filter(user=user))
+    file_format = (request.POST.get("format") or "").lower() or importers.guess_format(
+        upload.name
+    )
+    if file_format not in importers.FORMATS:
+        return JsonResponse({"error": "Unsupported file format."}, status=400)
+
+    default_account = None
+    account_name = request.POST.get("account")
+    if account_name:
+        default_account = Account.objects.filter(
+            user=request.user, account_name=account_name
+        ).first()
+        if default_account is None:
+            return JsonResponse(
+                {"error": f"Account '{account_name}' does not exist."}, status=400
+            )
 
-    return JsonResponse({"accounts": data, "total_balance": total_balance})
+    try:
+        rows = importers.parse(importers.text_stream(upload), file_format)
+        result = importers.import_rows(request.user, rows, default_account)
+    except importers.ImportFileError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(result.as_dict())
+
+
+@login_required
+@require_GET
+def export_transactions_api(request):
+    """
+    Export รายการทั้งหมดของ user แบบ stream (home/exporters.py)
+    รับ parameter: ?format=csv|ndjson (ค่าเริ่มต้น csv) และ ?gzip=1 (ไฟล์ .gz)
+    """
+    file_format = request.GET.get("format", "csv").lower()
+    if file_format not in exporters.FORMATS:
+        return JsonResponse({"error": "Unsupported export format."}, status=400)
+    compress = request.GET.get("gzip") == "1"
+
+    # ASGI ต้องใช้ async iterator ไม่อย่างนั้น Django จะอ่านทั้งไฟล์เข้า memory ก่อนส่ง
+    stream = exporters.astream if isinstance(request, ASGIRequest) else exporters.stream
+    response = StreamingHttpResponse(
+        stream(request.user.pk, file_format, compress),
+        content_type=(
+            "application/gzip" if compress else exporters.CONTENT_TYPES[file_format]
+        ),
+    )
+    name = exporters.filename(request.user.username, file_format, compress)
+    response["Content-Disposition"] = f'attachment; filename="{name}"'
+    response["Cache-Control"] = "no-store"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @login_required(login_url="/login/")
@@ -217,7 +421,7 @@ def transaction_income_page(request, user_id):
             date = parse_date(date_str)  # convert string to date
 
             try:
-                amount = float(request.POST["amount"])
+                amount = money.to_money(request.POST["amount"])
                 if amount <= 0:
                     messages.error(request, "Amount must be positive.")
                     return redirect(
@@ -233,11 +437,6 @@ def transaction_income_page(request, user_id):
             name_category = add_cat_name
             account_name = request.POST["account"]
 
-            # fetch category from database by user, category_name and type
-            category_check = Category.objects.filter(
-                user=user_now, category_name=name_category, trans_type=transaction_type
-            )
-
             # fetch account if error then show message
             try:
                 account = Account.objects.get(user=user_now, account_name=account_name)
@@ -247,28 +446,16 @@ def transaction_income_page(request, user_id):
                     reverse("transaction_income", kwargs={"user_id": user_now.id})
                 )
 
-            # Check if this category exist
-            if not category_check.exists():
-                category = Category.objects.create(
-                    user=user_now,
-                    category_name=name_category,
-                    trans_type=transaction_type,
-                )
-            else:
-                category = category_check.first()
-
-            # create transaction income model
-            income = Income.objects.create(
-                user=user_now,
-                trans_type=transaction_type,
-                date=date,
-                amount=amount,
-                category_trans=name_category,
-                to_account=account,
+            # fetch category or create if not exist (query เดียวถ้ามีอยู่แล้ว)
+            Category.objects.filter(
+                user=user_now, category_name=name_category, trans_type=transaction_type
+            ).first() or Category.objects.create(
+                user=user_now, category_name=name_category, trans_type=transaction_type
             )
 
-            account.balance += float(amount)
-            account.save()
+            # create transaction income model
+            # (รายการ + ยอดบัญชี + MonthReport อยู่ใน transaction เดียวกัน)
+            ledger.post_income(user_now, account, amount, date, name_category)
 
         return redirect(
             reverse("transaction_income", kwargs={"user_id": request.user.id})
@@ -308,7 +495,7 @@ def transaction_expense_page(request, user_id):
 
             # Amount must be positive.
             try:
-                amount = float(request.POST["amount"])
+                amount = money.to_money(request.POST["amount"])
                 if amount <= 0:
                     messages.error(request, "Amount must be positive.")
                     return redirect(
@@ -326,7 +513,7 @@ def transaction_expense_page(request, user_id):
             account_name = request.POST["account"]
 
             # fetch category or create if not exist
-            category = Category.objects.filter(
+            Category.objects.filter(
                 user=user_now, category_name=name_category, trans_type=transaction_type
             ).first() or Category.objects.create(
                 user=user_now, category_name=name_category, trans_type=transaction_type
@@ -341,19 +528,8 @@ def transaction_expense_page(request, user_id):
                     reverse("transaction_expense", kwargs={"user_id": user_now.id})
                 )
 
-            # create expense
-            Expense.objects.create(
-                user=user_now,
-                trans_type=transaction_type,
-                date=date,
-                amount=amount,
-                category_trans=name_category,
-                from_account=account,
-            )
-
-            # update account balance
-            account.balance -= amount
-            account.save()
+            # create expense + update account balance
+            ledger.post_expense(user_now, account, amount, date, name_category)
 
         # redirect หลัง POST
         return redirect(reverse("transaction_expense", kwargs={"user_id": user_now.id}))
@@ -390,7 +566,7 @@ def transaction_transfer_page(request, user_id):
             date = parse_date(date_str)  # convert string to date
 
             try:
-                amount = float(request.POST["amount"])
+                amount = money.to_money(request.POST["amount"])
                 if amount <= 0:
                     messages.error(request, "Amount must be positive.")
                     return redirect(
@@ -409,64 +585,35 @@ def transaction_transfer_page(request, user_id):
             from_account = request.POST["from_account"]
             to_account = request.POST["to_account"]
 
-            # fetch category from database by user, category_name and type
-
-            category_check = Category.objects.filter(
-                user=user_now, category_name=name_category, trans_type=transaction_type
-            )
-
-            # fetch accounts if error then show message
-            try:
-                from_account = Account.objects.get(
-                    user=user_now, account_name=from_account
+            # fetch both accounts in one query, if error then show message
+            accounts = {
+                account.account_name: account
+                for account in Account.objects.filter(
+                    user=user_now, account_name__in=[from_account, to_account]
                 )
-                to_account = Account.objects.get(user=user_now, account_name=to_account)
-            except ObjectDoesNotExist:
+            }
+            if from_account not in accounts or to_account not in accounts:
                 messages.error(
                     request, "Account either not specified or does not exists."
                 )
                 return redirect(
                     reverse("transaction_transfer", kwargs={"user_id": user_now.id})
                 )
+            from_account = accounts[from_account]
+            to_account = accounts[to_account]
 
-            # Check if this category exist
-            if not category_check.exists():
-                category = Category.objects.create(
-                    user=user_now,
-                    category_name=name_category,
-                    trans_type=transaction_type,
-                )
-            else:
-                category = category_check.first()
-
-            # create transaction income model
-            expense = Expense.objects.create(
-                user=user_now,
-                trans_type="expense",
-                date=date,
-                amount=amount,
-                category_trans=name_category,
-                from_account=from_account,
+            # fetch category or create if not exist (query เดียวถ้ามีอยู่แล้ว)
+            Category.objects.filter(
+                user=user_now, category_name=name_category, trans_type=transaction_type
+            ).first() or Category.objects.create(
+                user=user_now, category_name=name_category, trans_type=transaction_type
             )
 
-            income = Income.objects.create(
-                user=user_now,
-                trans_type="income",
-                date=date,
-                amount=amount,
-                category_trans=name_category,
-                to_account=to_account,
+            # create transaction expense + income (คู่โอน) และปรับยอดทั้งสองบัญชี
+            ledger.post_transfer(
+                user_now, from_account, to_account, amount, date, name_category
             )
 
-            if from_account != to_account:
-                from_account.balance -= float(amount)
-
-                from_account.save()
-
-                to_account.balance += float(amount)
-
-                to_account.save()
-
             return redirect(
                 reverse("transaction_transfer", kwargs={"user_id": request.user.id})
             )
@@ -482,20 +629,22 @@ def stats_page(request, user_id):
     View นี้จะทำหน้าที่ render หน้า HTML หลักของ Stats
     และส่งข้อมูลพื้นฐานเช่น ปีที่มี Transaction ไปให้ Template
     """
-    user = request.user
-    # ดึงปีทั้งหมดที่มีการทำรายการ เพื่อไปสร้างเป็นตัวเลือกใน dropdown
-    # เรียงจากปีล่าสุดไปหาเก่าสุด
-    years_with_transactions = Transaction.objects.filter(user=user).dates(
-        "date", "year", order="DESC"
-    )
-
-    # ดึงเดือนและปีทั้งหมดที่มีรายการ expense เพื่อใช้ในหน้า Compare
-    expense_months = Expense.objects.filter(user=user).dates(
-        "date", "month", order="DESC"
-    )
+    # เดือนที่มีรายรับ/รายจ่าย จาก MonthReport (ดู rollups.active_months)
+    # เรียงจากล่าสุดไปหาเก่าสุด
+    months = rollups.active_months(request.user)
+
+    # ปีทั้งหมดที่มีรายการ สำหรับ dropdown
+    years = sorted({year for year, _, _, _ in months}, reverse=True)
+
+    # เดือนที่มีรายการ expense สำหรับหน้า Compare
+    expense_months = [
+        datetime(year, month, 1)
+        for year, month, _, expense_count in months
+        if expense_count
+    ]
 
     context = {
-        "years": [d.year for d in years_with_transactions],
+        "years": years,
         "expense_months": [
             {"value": d.strftime("%Y-%m"), "text": d.strftime("%B %Y")}
             for d in expense_months
@@ -505,73 +654,173 @@ def stats_page(request, user_id):
 
 
 @login_required
+@versions.ledger_condition
 def stats_summary_api(request):
     """
     API View สำหรับส่งข้อมูล Pie Chart (Income หรือ Expense)
     รับ parameter: ?year=YYYY&month=MM&type=income
     """
-    user = request.user
+    try:
+        year, month, trans_type = _stats_summary_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # อ่านยอดต่อ category จาก CategoryMonthReport (O(จำนวน category))
+    summary = rollups.category_totals(request.user, year, month, trans_type)
+    return JsonResponse(_stats_summary_data(summary))
+
+
+def _stats_summary_params(request):
+    """(year, month, trans_type) จาก query string หรือ raise ValueError(ข้อความ error)"""
     year = request.GET.get("year")
     month = request.GET.get("month")
     trans_type = request.GET.get("type")  # 'income' or 'expense'
 
     if not all([year, month, trans_type]):
-        return JsonResponse({"error": "Missing parameters"}, status=400)
+        raise ValueError("Missing parameters")
+
+    trans_type = "income" if trans_type == "income" else "expense"
+    try:
+        return int(year), int(month), trans_type
+    except ValueError:
+        raise ValueError("Invalid parameters")
 
-    model = Income if trans_type == "income" else Expense
 
-    # Query ข้อมูลและจัดกลุ่มตาม category
-    summary = (
-        model.objects.filter(user=user, date__year=year, date__month=month)
-        .values("category_trans")
-        .annotate(total=Sum("amount"))
-        .order_by("-total")
-    )
+def _stats_summary_data(summary):
+    overall_total = sum(total for _, total in summary)
+    return {
+        "labels": [category for category, _ in summary],
+        "values": [money.as_number(total) for _, total in summary],
+        "overall_total": money.as_number(overall_total),
+    }
 
-    overall_total = sum(item["total"] for item in summary)
 
-    data = {
-        "labels": [item["category_trans"] for item in summary],
-        "values": [item["total"] for item in summary],
-        "overall_total": overall_total,
+@login_required
+@versions.ledger_condition
+def stats_batch_api(request):
+    """
+    API View สำหรับ Compare: ยอดต่อ category ของหลายเดือนใน request เดียว
+    รับ parameter: ?period=YYYY-MM[:type]&period=... หรือ ?from=YYYY-MM&to=YYYY-MM
+    (&type=income|expense ใช้กับเดือนที่ไม่ได้ระบุ type ค่าเริ่มต้นคือ expense)
+    """
+    try:
+        requested = _stats_batch_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # ทุกเดือนอ่านจาก CategoryMonthReport ด้วย query เดียว
+    summaries = rollups.period_category_totals(request.user, requested)
+    return JsonResponse(_stats_batch_data(requested, summaries))
+
+
+def _batch_trans_type(value):
+    if value not in ("income", "expense"):
+        raise ValueError("Invalid type")
+    return value
+
+
+def _stats_batch_params(request):
+    """[(year, month, trans_type), ...] ตามลำดับที่ขอ หรือ raise ValueError"""
+    trans_type = _batch_trans_type(request.GET.get("type", "expense"))
+    values = request.GET.getlist("period")
+    first, last = request.GET.get("from"), request.GET.get("to")
+
+    if values and (first or last):
+        raise ValueError("Use either period or from/to")
+    if values:
+        if len(values) > MAX_BATCH_PERIODS:
+            raise ValueError("Too many periods")
+        requested = []
+        for value in values:
+            month, _, period_type = value.partition(":")
+            requested.append(
+                (
+                    *periods.parse_month(month),
+                    _batch_trans_type(period_type) if period_type else trans_type,
+                )
+            )
+        return requested
+    if not (first and last):
+        raise ValueError("Missing parameters")
+
+    # เดือนเป็นเลขต่อเนื่อง: year * 12 + (month - 1)
+    first_year, first_month = periods.parse_month(first)
+    last_year, last_month = periods.parse_month(last)
+    start = first_year * 12 + first_month - 1
+    end = last_year * 12 + last_month - 1
+    if not 0 <= end - start < MAX_BATCH_PERIODS:
+        raise ValueError("Invalid month range")
+    return [
+        (index // 12, index % 12 + 1, trans_type) for index in range(start, end + 1)
+    ]
+
+
+def _stats_batch_data(periods, summaries):
+    return {
+        "periods": [
+            {
+                "period": f"{year}-{month:02d}",
+                "type": trans_type,
+                **_stats_summary_data(summaries[(year, month, trans_type)]),
+            }
+            for year, month, trans_type in periods
+        ]
     }
-    return JsonResponse(data)
 
 
 @login_required
+@versions.ledger_condition
 def stats_yearly_api(request):
     """
     API View สำหรับส่งข้อมูล Line Chart (Statistics)
-    รับ parameter: ?year=YYYY
+    รับ parameter: ?year=YYYY หรือ ?from=YYYY&to=YYYY (หลายปีในครั้งเดียว)
     """
-    user = request.user
-    year = request.GET.get("year")
+    try:
+        first_year, last_year, ranged = _stats_yearly_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-    if not year:
-        return JsonResponse({"error": "Year parameter is required"}, status=400)
+    # อ่านยอดรายเดือนจาก MonthReport ของทุกปีในช่วงด้วย query เดียว
+    years = rollups.year_totals(request.user, first_year, last_year)
+    return JsonResponse(_stats_yearly_data(years, first_year, ranged))
 
-    income_data = []
-    expense_data = []
+
+def _stats_yearly_params(request):
+    """(first_year, last_year, ranged) จาก ?year= หรือ ?from=&to= หรือ raise ValueError"""
+    year = request.GET.get("year")
+    year_from = request.GET.get("from")
+    year_to = request.GET.get("to")
+
+    if year_from or year_to:
+        try:
+            first_year = periods.parse_year(year_from or year_to)
+            last_year = periods.parse_year(year_to or year_from)
+        except ValueError:
+            raise ValueError("Invalid year range")
+        if first_year > last_year or last_year - first_year >= MAX_YEARLY_RANGE:
+            raise ValueError("Invalid year range")
+        return first_year, last_year, True
+    if year:
+        year = periods.parse_year(year)
+        return year, year, False
+    raise ValueError("Year parameter is required")
+
+
+def _stats_yearly_data(years, first_year, ranged):
     month_labels = [calendar.month_name[i] for i in range(1, 13)]
 
-    for month in range(1, 13):
-        income_total = (
-            Income.objects.filter(
-                user=user, date__year=year, date__month=month
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-        expense_total = (
-            Expense.objects.filter(
-                user=user, date__year=year, date__month=month
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-        income_data.append(income_total)
-        expense_data.append(expense_total)
+    # Decimal -> ตัวเลขสำหรับ Chart.js
+    years = {
+        y: {key: [money.as_number(v) for v in values] for key, values in totals.items()}
+        for y, totals in years.items()
+    }
 
-    data = {"labels": month_labels, "income": income_data, "expense": expense_data}
-    return JsonResponse(data)
+    if ranged:
+        return {
+            "labels": month_labels,
+            "years": {str(y): totals for y, totals in years.items()},
+        }
+    return {"labels": month_labels, **years[first_year]}
 
 
 @login_required(login_url="/login/")
@@ -640,8 +889,8 @@ def delete_account_page(request):
             if user.check_password(password):
                 # ก่อนลบ ให้ทำการ logout เพื่อเคลียร์ session
                 logout(request)
-                # ทำการลบ user
-                user.delete()
+                # ทำการลบ user (ไม่ปรับ rollups / version ทีละรายการระหว่าง cascade)
+                ledger.delete_users([user.pk])
                 messages.success(request, "Your account has been permanently deleted.")
                 return redirect(
                     "login"
@@ -656,7 +905,26 @@ def contact(request):
     return render(request, "home/contact.html")
 
 
+def metrics_view(request):
+    """
+    metrics รูปแบบ Prometheus text (home/metrics.py) สำหรับ scrape
+    ถ้าตั้ง METRICS_TOKEN ต้องส่ง Authorization: Bearer <token>
+    ถ้าไม่ได้ตั้ง เปิดให้เฉพาะ staff ที่ login อยู่ (หรือตอน DEBUG) นอกนั้นตอบ 404
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        if not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            return HttpResponse(status=401)
+    elif not (settings.DEBUG or request.user.is_staff):
+        # fail closed: traffic / error rate / เวลา DB ต่อ endpoint ไม่ใช่ข้อมูลสาธารณะ
+        return HttpResponse(status=404)
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @login_required(login_url="/login/")
+@ensure_csrf_cookie
 def account_management_page(request, user_id):
     user = request.user
 
@@ -664,7 +932,7 @@ def account_management_page(request, user_id):
     if request.method == "POST":
         account_name = request.POST.get("account_name")
         try:
-            balance = float(request.POST.get("balance", 0))
+            balance = money.to_money(request.POST.get("balance", 0))
         except (ValueError, TypeError):
             messages.error(request, "Invalid balance format.")
             return redirect("account_management", user_id=user.id)
@@ -681,6 +949,7 @@ def account_management_page(request, user_id):
                 user=user,
                 account_name=account_name,
                 balance=balance,
+                opening_balance=balance,
                 type_acc="Default",
             )
             messages.success(request, f"Account '{account_name}' created successfully.")
@@ -755,11 +1024,6 @@ def delete_account_view(request, user_id, account_id):
 
 # ----------------------------Mascot---------------------------
 
-import random
-from django.views.decorators.http import require_GET
-from django.db.models import Sum
-from datetime import datetime
-
 
 @login_required
 @require_GET
@@ -773,41 +1037,28 @@ def pet_chat_api(request):
 
 @login_required(login_url="/login/")
 @require_GET
+@versions.ledger_condition
 def pet_status_api(request):
+    # ยอดเงินรวมทุกบัญชี + รายรับ / รายจ่าย เดือนปัจจุบัน (จาก snapshot ที่ cache ไว้)
+    finance = snapshot.get(request.user, *versions.for_request(request))
+    return JsonResponse(_pet_status(finance))
 
-    user = request.user
-    now = datetime.now()
-    year, month = now.year, now.month
 
-    # ยอดเงินรวมทุกบัญชี
-    total_balance = (
-        Account.objects.filter(user=user).aggregate(Sum("balance"))["balance__sum"]
-        or 0.0
-    )
-
-    # รายรับ / รายจ่าย เดือนปัจจุบัน
-    month_income = (
-        Income.objects.filter(user=user, date__year=year, date__month=month).aggregate(
-            Sum("amount")
-        )["amount__sum"]
-        or 0.0
-    )
-    month_expense = (
-        Expense.objects.filter(user=user, date__year=year, date__month=month).aggregate(
-            Sum("amount")
-        )["amount__sum"]
-        or 0.0
-    )
+def _pet_status(finance):
+    """สถานะการเงินของ mascot จาก finance snapshot (ใช้ร่วมกับ pet_status_stream)"""
+    total_balance = finance["total_balance"]
+    month_income = finance["month_income"]
+    month_expense = finance["month_expense"]
 
     # % รายจ่ายต่อรายรับ
     if month_income > 0:
-        expense_percentage = (month_expense / month_income) * 100
+        expense_percentage = money.percent(month_expense, month_income)
     else:
         expense_percentage = 0.0
 
     # อารมณ์ตาม savings rate
     if month_income > 0:
-        saving_rate = ((month_income - month_expense) / month_income) * 100
+        saving_rate = money.percent(month_income - month_expense, month_income)
     else:
         # ไม่มีรายรับ
         if month_expense == 0:
@@ -832,12 +1083,80 @@ def pet_status_api(request):
         advice = "ใช้จ่ายได้โอเคอยู่ แต่ลองเก็บเพิ่มอีกนิดจะดีมากเลย 😊"
 
     data = {
-        "total_balance": round(total_balance, 2),
-        "month_income": round(month_income, 2),
-        "month_expense": round(month_expense, 2),
+        "total_balance": money.as_number(total_balance),
+        "month_income": money.as_number(month_income),
+        "month_expense": money.as_number(month_expense),
         "expense_percentage": round(expense_percentage, 2),
         "saving_rate": round(saving_rate, 2),
         "advice": advice,
         "status": status,  # happy / neutral / danger
     }
-    return JsonResponse(data)
+    return data
+
+
+@login_required(login_url="/login/")
+@require_GET
+async def pet_status_stream(request):
+    """
+    Server-Sent Events ของสถานะ mascot (แทนการ poll pet_status_api ทุก 60 วินาที)
+
+    ทุก PET_STATUS_STREAM_INTERVAL วินาทีเช็ก ledger version จาก cache
+    (versions.acached: อ่าน database เฉพาะหลังมีการเขียน) และส่ง event "status"
+    เฉพาะเมื่อ version หรือเดือนเปลี่ยน ระหว่างนั้นส่ง comment กัน proxy ตัด
+    connection แล้วปิดเองเมื่อครบ PET_STATUS_STREAM_TIMEOUT วินาที
+    (EventSource ต่อใหม่เองพร้อม Last-Event-ID)
+    tick ที่ใช้ database คืน DB connection ทันที ไม่ถือไว้ตลอดอายุ stream
+
+    ต้องรันผ่าน ASGI (budgy/asgi.py): ภายใต้ WSGI stream จะกิน worker ไว้ทั้ง
+    connection จึงตอบ 204 ให้ browser เลิกต่อแล้วกลับไป poll แทน
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    response = StreamingHttpResponse(
+        _pet_status_events(user, request.headers.get("Last-Event-ID")),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx: อย่า buffer event
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _release_connection():
+    # ASGI ให้แต่ละ request มี thread (และ DB connection) ของตัวเอง: stream ที่เปิดค้าง
+    # หลายนาทีจะถือ connection ไว้ทั้งหมดถ้าไม่คืน (persistent connection ปิด,
+    # pool ได้ connection คืน) ใน transaction (เช่น TestCase) ปิดไม่ได้ ปล่อยไว้
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+async def _pet_status_events(user, last_event_id=None):
+    interval = settings.PET_STATUS_STREAM_INTERVAL
+    deadline = time.monotonic() + settings.PET_STATUS_STREAM_TIMEOUT
+    # บอก EventSource ให้รอ interval ก่อนต่อใหม่ (หน่วย ms)
+    yield f"retry: {int(interval * 1000)}\n\n"
+    # connection ที่เปิดตอนโหลด session/user
+    await sync_to_async(_release_connection)()
+
+    sent = last_event_id
+    while True:
+        version, used_db = await versions.acached(user)
+        period = periods.current_month()
+        # id เดียวกับ ETag ของ pet_status_api: ขึ้นเดือนใหม่ก็ส่งใหม่
+        event_id = versions.tag(user.pk, version, period)
+        if event_id != sent:
+            data = _pet_status(await snapshot.aget(user, version, period))
+            used_db = True
+            event = f"id: {event_id}\nevent: status\ndata: {json.dumps(data)}\n\n"
+        else:
+            event = ": keep-alive\n\n"
+        if used_db:
+            await sync_to_async(_release_connection)()
+        yield event
+        sent = event_id
+
+        if time.monotonic() + interval > deadline:
+            return
+        await asyncio.sleep(interval)
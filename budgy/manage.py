@@ -6,6 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
+    # tests ใช้ settings เร็ว (in-memory DB, MD5 hasher) ดู budgy/settings_test.py
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'budgy.settings_test')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'budgy.settings')
     try:
         from django.core.management import execute_from_command_line